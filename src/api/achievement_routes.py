@@ -7,7 +7,12 @@ Handles all achievement-related endpoints using the new system.
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
 from datetime import datetime
-from api.models import db, User, UserAchievement, UserProgress
+from api.models import db, UserAchievement
+from api.coins import credit
+from api.achievements import (ACHIEVEMENTS, BY_ID, resolve, stored_names, load_progress,
+                              is_unlocked, claimed_ids, achievement_list)
+from api.idempotency import idempotent
+from api.identity import current_user
 
 # Create blueprint
 achievement_bp = Blueprint('achievements', __name__)
@@ -20,7 +25,7 @@ def get_current_user_optional():
         verify_jwt_in_request(optional=True)
         user_id = get_jwt_identity()
         if user_id:
-            return User.query.get(user_id)
+            return current_user()
         return None
     except:
         return None
@@ -41,108 +46,9 @@ def get_achievements():
         user = get_current_user_optional()
         
         if user:
-            # Get user's progress
-            progress = user.progress or UserProgress(user_id=user.id)
-            
-            # Calculate achievements based on actual stats
-            achievements = [
-                {
-                    'id': 'first_steps',
-                    'name': 'First Steps',
-                    'description': 'Complete your first workout',
-                    'icon': '🏃',
-                    'category': 'workouts',
-                    'progress': min(progress.workouts_completed, 1),
-                    'target': 1,
-                    'unlocked': progress.workouts_completed >= 1,
-                    'reward': 50
-                },
-                {
-                    'id': 'week_warrior',
-                    'name': 'Week Warrior',
-                    'description': 'Work out 7 days in a row',
-                    'icon': '🔥',
-                    'category': 'streak',
-                    'progress': min(user.streak_days, 7),
-                    'target': 7,
-                    'unlocked': user.streak_days >= 7,
-                    'reward': 100
-                },
-                {
-                    'id': 'century_club',
-                    'name': 'Century Club',
-                    'description': 'Complete 100 workouts',
-                    'icon': '💯',
-                    'category': 'workouts',
-                    'progress': min(progress.workouts_completed, 100),
-                    'target': 100,
-                    'unlocked': progress.workouts_completed >= 100,
-                    'reward': 500
-                },
-                {
-                    'id': 'marathon_master',
-                    'name': 'Marathon Master',
-                    'description': 'Play 50 games total',
-                    'icon': '🏅',
-                    'category': 'games',
-                    'progress': min(progress.total_games_played, 50),
-                    'target': 50,
-                    'unlocked': progress.total_games_played >= 50,
-                    'reward': 300
-                },
-                {
-                    'id': 'strength_supreme',
-                    'name': 'Strength Supreme',
-                    'description': 'Complete 50 workouts',
-                    'icon': '💪',
-                    'category': 'workouts',
-                    'progress': min(progress.workouts_completed, 50),
-                    'target': 50,
-                    'unlocked': progress.workouts_completed >= 50,
-                    'reward': 250
-                },
-                {
-                    'id': 'avatar_creator',
-                    'name': 'Avatar Creator',
-                    'description': 'Create 5 unique avatars',
-                    'icon': '🎨',
-                    'category': 'avatars',
-                    'progress': min(progress.avatars_created, 5),
-                    'target': 5,
-                    'unlocked': progress.avatars_created >= 5,
-                    'reward': 150
-                },
-                {
-                    'id': 'legend_status',
-                    'name': 'Legend Status',
-                    'description': 'Reach level 10',
-                    'icon': '⭐',
-                    'category': 'level',
-                    'progress': min(user.level, 10),
-                    'target': 10,
-                    'unlocked': user.level >= 10,
-                    'reward': 1000
-                },
-                {
-                    'id': 'fashionista',
-                    'name': 'Fashionista',
-                    'description': 'Unlock 10 items',
-                    'icon': '👗',
-                    'category': 'items',
-                    'progress': min(progress.items_unlocked, 10),
-                    'target': 10,
-                    'unlocked': progress.items_unlocked >= 10,
-                    'reward': 200
-                }
-            ]
-            
-            # Get claimed achievements from database
-            claimed = UserAchievement.query.filter_by(user_id=user.id).all()
-            claimed_names = {ach.achievement_name for ach in claimed if ach.is_completed}
-            
-            # Mark which ones have been claimed
-            for achievement in achievements:
-                achievement['claimed'] = achievement['id'] in claimed_names
+            # Stored progress (kept up to date by stat events)
+            achievements = achievement_list(load_progress(user))
+            progress = user.progress
             
             return jsonify({
                 'success': True,
@@ -154,8 +60,8 @@ def get_achievements():
                     'xp': user.xp,
                     'coins': user.coins,
                     'streak_days': user.streak_days,
-                    'workouts_completed': progress.workouts_completed,
-                    'games_played': progress.total_games_played
+                    'workouts_completed': (progress.workouts_completed or 0) if progress else 0,
+                    'games_played': (progress.total_games_played or 0) if progress else 0
                 }
             }), 200
         else:
@@ -193,13 +99,13 @@ def get_achievement(achievement_id):
     """Get a specific achievement with current progress."""
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        progress = user.progress or UserProgress(user_id=user_id)
         
-        # Check if achievement exists in database
-        achievement = UserAchievement.query.filter_by(
-            user_id=user_id,
-            achievement_name=achievement_id
+        # Check if achievement exists in database (old ids resolve to the current one)
+        definition = resolve(achievement_id)
+        names = stored_names(definition) if definition else [achievement_id]
+        achievement = UserAchievement.query.filter(
+            UserAchievement.user_id == user_id,
+            UserAchievement.achievement_name.in_(names)
         ).first()
         
         if not achievement:
@@ -223,106 +129,53 @@ def get_achievement(achievement_id):
 
 @achievement_bp.route('/achievements/claim/<achievement_id>', methods=['POST'])
 @jwt_required()
+@idempotent
 def claim_achievement(achievement_id):
     """
     Claim reward for a completed achievement.
-    Awards coins using the centralized User.add_coins() method.
+    Definitions come from the achievement registry (api/achievements.py);
+    coins are awarded through the coin ledger.
     """
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        progress = user.progress or UserProgress(user_id=user_id)
-        
-        # Achievement definitions with completion checks
-        achievements = {
-            'first_steps': {
-                'name': 'First Steps',
-                'reward': 50,
-                'check': lambda: progress.workouts_completed >= 1
-            },
-            'week_warrior': {
-                'name': 'Week Warrior',
-                'reward': 100,
-                'check': lambda: user.streak_days >= 7
-            },
-            'century_club': {
-                'name': 'Century Club',
-                'reward': 500,
-                'check': lambda: progress.workouts_completed >= 100
-            },
-            'marathon_master': {
-                'name': 'Marathon Master',
-                'reward': 300,
-                'check': lambda: progress.total_games_played >= 50
-            },
-            'strength_supreme': {
-                'name': 'Strength Supreme',
-                'reward': 250,
-                'check': lambda: progress.workouts_completed >= 50
-            },
-            'avatar_creator': {
-                'name': 'Avatar Creator',
-                'reward': 150,
-                'check': lambda: progress.avatars_created >= 5
-            },
-            'legend_status': {
-                'name': 'Legend Status',
-                'reward': 1000,
-                'check': lambda: user.level >= 10
-            },
-            'fashionista': {
-                'name': 'Fashionista',
-                'reward': 200,
-                'check': lambda: progress.items_unlocked >= 10
-            }
-        }
+        user = current_user()
         
-        achievement = achievements.get(achievement_id)
+        achievement = resolve(achievement_id)
         if not achievement:
             return jsonify({
                 'success': False,
                 'message': 'Achievement not found'
             }), 404
         
+        existing = load_progress(user, seed=True).get(achievement.id)
+        
         # Check if achievement requirements are met
-        if not achievement['check']():
+        if not is_unlocked(achievement, existing):
             return jsonify({
                 'success': False,
                 'message': 'Achievement requirements not yet met'
             }), 400
         
         # Check if already claimed
-        existing = UserAchievement.query.filter_by(
-            user_id=user_id,
-            achievement_name=achievement_id
-        ).first()
-        
-        if existing and existing.is_completed:
+        if existing.is_completed:
             return jsonify({
                 'success': False,
                 'message': 'Achievement already claimed'
             }), 400
         
-        # 💰 Award coins using centralized system
-        reward_coins = achievement['reward']
-        user.add_coins(reward_coins, source='achievement')
+        # 💰 Award coins using centralized system (once per achievement)
+        reward_coins = achievement.reward
+        reward = credit(user, reward_coins, source='achievement',
+                        idempotency_key=f'achievement:{achievement.id}')
+        if reward.replayed:
+            db.session.rollback()
+            return jsonify({
+                'success': False,
+                'message': 'Achievement already claimed'
+            }), 400
         
-        # Create or update achievement record
-        if not existing:
-            new_achievement = UserAchievement(
-                user_id=user_id,
-                achievement_name=achievement_id,
-                achievement_description=achievement['name'],
-                progress=100,
-                target=100,
-                is_completed=True,
-                completed_date=datetime.utcnow()
-            )
-            db.session.add(new_achievement)
-        else:
-            existing.is_completed = True
-            existing.progress = 100
-            existing.completed_date = datetime.utcnow()
+        # Mark the reward as claimed
+        existing.is_completed = True
+        existing.completed_date = datetime.utcnow()
         
         db.session.commit()
         
@@ -330,8 +183,8 @@ def claim_achievement(achievement_id):
             'success': True,
             'message': f"🎉 Achievement unlocked! +{reward_coins} coins!",
             'achievement': {
-                'id': achievement_id,
-                'name': achievement['name'],
+                'id': achievement.id,
+                'name': achievement.name,
                 'reward': reward_coins
             },
             'user_stats': {
@@ -462,15 +315,11 @@ def get_achievement_stats():
     """Get achievement statistics for the user."""
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        progress = user.progress or UserProgress(user_id=user_id)
+        user = current_user()
         
         # Count completed achievements
-        total_achievements = 8  # Total number of achievements
-        completed_achievements = UserAchievement.query.filter_by(
-            user_id=user_id,
-            is_completed=True
-        ).count()
+        total_achievements = len(ACHIEVEMENTS)
+        completed_achievements = len(claimed_ids(user_id) & BY_ID.keys())
         
         return jsonify({
             'success': True,
@@ -0,0 +1,321 @@
+# src/api/achievements.py
+"""
+Achievement registry for PixelPlay.
+The single list of achievements every route uses. Definitions are compiled
+once at import into an evaluator over a user's stat vector:
+
+    (workouts_completed, streak_days, total_games_played,
+     avatars_created, level, items_unlocked)
+
+so checking every achievement for a user is one pass over two flat tuples
+(which stat each achievement reads, and its target) instead of building
+dicts and lambdas per request. evaluate_users() does the same for many
+users, with their stat vectors loaded in one query.
+
+Progress is event driven: when a counter changes (api/events.py) only the
+achievements reading that counter are advanced, and their progress is
+upserted into user_achievements right before the transaction commits.
+Reading achievements is then one indexed fetch of the user's rows.
+UserAchievement.is_completed still means "reward claimed"; unlocked is
+progress >= target.
+"""
+
+from collections import namedtuple
+from datetime import datetime
+from operator import itemgetter, ge
+from sqlalchemy import case, event, func, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from api.models import db, User, UserProgress, UserAchievement
+from api.events import (subscribe, GamePlayed, WorkoutCompleted, LevelUp, ItemUnlocked,
+                        AvatarCreated, StreakChanged)
+
+# Stat vector layout
+STATS = ('workouts_completed', 'streak_days', 'total_games_played',
+         'avatars_created', 'level', 'items_unlocked')
+
+Achievement = namedtuple('Achievement', [
+    'id', 'name', 'description', 'icon', 'category', 'stat', 'target', 'reward'])
+
+ACHIEVEMENTS = (
+    Achievement('first_steps', 'First Steps', 'Complete your first workout', '🏃',
+                'workouts', 'workouts_completed', 1, 50),
+    Achievement('week_warrior', 'Week Warrior', 'Work out 7 days in a row', '🔥',
+                'streak', 'streak_days', 7, 100),
+    Achievement('century_club', 'Century Club', 'Complete 100 workouts', '💯',
+                'workouts', 'workouts_completed', 100, 500),
+    Achievement('marathon_master', 'Marathon Master', 'Play 50 games total', '🏅',
+                'games', 'total_games_played', 50, 300),
+    Achievement('strength_supreme', 'Strength Supreme', 'Complete 50 workouts', '💪',
+                'workouts', 'workouts_completed', 50, 250),
+    Achievement('avatar_creator', 'Avatar Creator', 'Create 5 unique avatars', '🎨',
+                'avatars', 'avatars_created', 5, 150),
+    Achievement('legend_status', 'Legend Status', 'Reach level 10', '⭐',
+                'level', 'level', 10, 1000),
+    Achievement('fashionista', 'Fashionista', 'Unlock 10 items', '👗',
+                'items', 'items_unlocked', 10, 200),
+)
+
+# Old ids still accepted by the claim routes
+ALIASES = {'first_workout': 'first_steps'}
+
+# Staged progress for the current transaction: {user_id: {stat: value}}
+PROGRESS_KEY = 'achievement_progress'
+
+# Progress of an achievement that has no user_achievements row yet
+ComputedProgress = namedtuple('ComputedProgress', ['progress', 'is_completed'])
+
+
+# ===============================
+# ⚙️ COMPILED EVALUATOR
+# ===============================
+
+BY_ID = {achievement.id: achievement for achievement in ACHIEVEMENTS}
+_TARGETS = tuple(achievement.target for achievement in ACHIEVEMENTS)
+_STAT_INDEX = {achievement.id: STATS.index(achievement.stat) for achievement in ACHIEVEMENTS}
+# Picks each achievement's stat out of a stat vector, in ACHIEVEMENTS order
+_gather = itemgetter(*(_STAT_INDEX[achievement.id] for achievement in ACHIEVEMENTS))
+_BY_STAT = {stat: tuple(a for a in ACHIEVEMENTS if a.stat == stat) for stat in STATS}
+# Stats that can go down (a streak breaks); the rest only ever count up
+DECREASING_STATS = ('streak_days',)
+_CURRENT_VALUE_IDS = tuple(a.id for a in ACHIEVEMENTS if a.stat in DECREASING_STATS)
+
+
+def resolve(achievement_id):
+    """Definition for an id (or an old alias), None if unknown."""
+    return BY_ID.get(ALIASES.get(achievement_id, achievement_id))
+
+
+def stored_names(achievement):
+    """Every achievement_name a claim of this achievement may be stored under."""
+    return [achievement.id] + [old for old, new in ALIASES.items() if new == achievement.id]
+
+
+def stat_vector(user, progress=None):
+    """Stat vector for a loaded user (missing progress counts as zeros)."""
+    progress = progress if progress is not None else user.progress
+    return (
+        (progress.workouts_completed if progress else 0) or 0,
+        user.streak_days or 0,
+        (progress.total_games_played if progress else 0) or 0,
+        (progress.avatars_created if progress else 0) or 0,
+        user.level or 0,
+        (progress.items_unlocked if progress else 0) or 0
+    )
+
+
+def evaluate(vector):
+    """
+    Check every achievement against one stat vector.
+    Returns: (progress, unlocked) tuples, in ACHIEVEMENTS order
+    (progress is the stat capped at the target).
+    """
+    values = _gather(vector)
+    return tuple(zip(map(min, values, _TARGETS), map(ge, values, _TARGETS)))
+
+
+def _stat_vector_query():
+    return db.session.query(
+        User.id, UserProgress.workouts_completed, User.streak_days,
+        UserProgress.total_games_played, UserProgress.avatars_created,
+        User.level, UserProgress.items_unlocked
+    ).outerjoin(UserProgress, UserProgress.user_id == User.id)
+
+
+def _vectors(rows):
+    return [(row[0], tuple(value or 0 for value in row[1:])) for row in rows]
+
+
+def load_stat_vectors(user_ids):
+    """
+    Stat vectors for many users from one User + UserProgress query.
+    Returns: {user_id: vector}
+    """
+    return dict(_vectors(_stat_vector_query().filter(User.id.in_(list(user_ids))).all()))
+
+
+def stat_vector_page(after_id=0, limit=1000):
+    """
+    The next page of users after `after_id`, ordered by id (keyset
+    pagination, so every page is an index range scan however deep it is).
+    Returns: [(user_id, vector), ...]
+    """
+    return _vectors(_stat_vector_query().filter(User.id > after_id)
+                    .order_by(User.id).limit(limit).all())
+
+
+def evaluate_users(user_ids):
+    """
+    Evaluate all achievements for many users in one pass.
+    Returns: {user_id: ((progress, unlocked), ...)} in ACHIEVEMENTS order
+    """
+    vectors = load_stat_vectors(user_ids)
+    return dict(zip(vectors, map(evaluate, vectors.values())))
+
+
+def claimed_ids(user_id):
+    """Ids of the achievements this user has claimed (aliases resolved)."""
+    names = db.session.query(UserAchievement.achievement_name).filter(
+        UserAchievement.user_id == user_id,
+        UserAchievement.is_completed.is_(True)
+    ).all()
+    return {ALIASES.get(name, name) for name, in names}
+
+
+# ===============================
+# 📈 EVENT-DRIVEN PROGRESS
+# ===============================
+
+def stage_progress(user_id, session=None, **stats):
+    """
+    Record new stat values for the current transaction; the achievements
+    reading them are upserted before it commits.
+    """
+    if user_id is None:
+        return
+    session = session or db.session
+    staged = session.info.setdefault(PROGRESS_KEY, {})
+    staged.setdefault(int(user_id), {}).update(stats)
+
+
+@subscribe(GamePlayed, WorkoutCompleted, LevelUp, ItemUnlocked, AvatarCreated, StreakChanged)
+def _advance(domain_event):
+    # Every event is (user_id, <stat>=new value)
+    stage_progress(domain_event.user_id, **{domain_event._fields[1]: domain_event[1]})
+
+
+def _progress_row(user_id, achievement, progress, now):
+    return {
+        'user_id': user_id,
+        'achievement_name': achievement.id,
+        'achievement_description': achievement.name,
+        'progress': progress,
+        'target': achievement.target,
+        'is_completed': False,
+        'created_at': now
+    }
+
+
+def progress_rows(staged, now=None):
+    """user_achievements rows for staged {user_id: {stat: value}} changes."""
+    now = now or datetime.utcnow()
+    return [
+        _progress_row(user_id, achievement, min(value or 0, achievement.target), now)
+        for user_id, stats in staged.items()
+        for stat, value in stats.items()
+        for achievement in _BY_STAT[stat]
+    ]
+
+
+def evaluated_rows(page, now=None):
+    """
+    user_achievements rows for every achievement of a page of
+    (user_id, vector) pairs. Needs no database, so the backfill command
+    runs it in worker processes.
+    """
+    now = now or datetime.utcnow()
+    return [
+        _progress_row(user_id, achievement, progress, now)
+        for user_id, vector in page
+        for achievement, (progress, unlocked) in zip(ACHIEVEMENTS, evaluate(vector))
+    ]
+
+
+def upsert_progress(session, rows):
+    """
+    INSERT ... ON CONFLICT (user_id, achievement_name) DO UPDATE progress.
+    Progress on counters never goes down (so events applied out of order
+    can't undo each other); achievements on stats that can drop, like the
+    streak, follow the current value, as a recompute would. Claimed state is
+    left alone.
+    """
+    if not rows:
+        return
+    is_postgres = session.get_bind().dialect.name == 'postgresql'
+    statement = (postgresql if is_postgres else sqlite).insert(UserAchievement)
+    highest = func.greatest if is_postgres else func.max
+    progress = case(
+        # (=/OR rather than IN: IN lists can't be expanded in an executemany)
+        (or_(*(UserAchievement.achievement_name == achievement_id
+               for achievement_id in _CURRENT_VALUE_IDS)), statement.excluded.progress),
+        else_=highest(UserAchievement.progress, statement.excluded.progress))
+    session.execute(statement.on_conflict_do_update(
+        index_elements=[UserAchievement.user_id, UserAchievement.achievement_name],
+        set_={
+            'progress': progress,
+            'target': statement.excluded.target,
+            'achievement_description': statement.excluded.achievement_description
+        }
+    ), rows)
+
+
+@event.listens_for(db.session, 'before_commit')
+def _persist_progress(session):
+    staged = session.info.pop(PROGRESS_KEY, None)
+    if staged:
+        upsert_progress(session, progress_rows(staged))
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _discard_progress(session, previous_transaction):
+    session.info.pop(PROGRESS_KEY, None)
+
+
+# ===============================
+# 📖 READING PROGRESS
+# ===============================
+
+def _load_rows(user_id):
+    rows = UserAchievement.query.filter_by(user_id=user_id).all()
+    return {ALIASES.get(row.achievement_name, row.achievement_name): row for row in rows}
+
+
+def load_progress(user, seed=False):
+    """
+    The user's achievement rows by id (one indexed fetch).
+    Achievements with no stored row yet (users who never had progress
+    recorded, or a newly added achievement) are computed from the user's
+    current stats. Reads get them in memory only; with seed=True (the claim
+    routes) they are inserted in the current transaction, left for the
+    caller to commit. `flask backfill-achievements` seeds every user.
+    Returns: {achievement_id: UserAchievement or ComputedProgress}
+    """
+    rows = _load_rows(user.id)
+    missing = [achievement for achievement in ACHIEVEMENTS if achievement.id not in rows]
+    if not missing:
+        return rows
+
+    values = dict(zip(ACHIEVEMENTS, evaluate(stat_vector(user))))
+    if seed:
+        now = datetime.utcnow()
+        seeded = [_progress_row(user.id, achievement, values[achievement][0], now)
+                  for achievement in missing]
+        upsert_progress(db.session, seeded)
+        return _load_rows(user.id)
+
+    for achievement in missing:
+        rows[achievement.id] = ComputedProgress(values[achievement][0], False)
+    return rows
+
+
+def is_unlocked(achievement, row):
+    return row is not None and (row.progress or 0) >= achievement.target
+
+
+def achievement_list(rows):
+    """Serialized achievements for a user's rows (from load_progress)."""
+    achievements = []
+    for achievement in ACHIEVEMENTS:
+        row = rows.get(achievement.id)
+        achievements.append({
+            'id': achievement.id,
+            'name': achievement.name,
+            'description': achievement.description,
+            'icon': achievement.icon,
+            'category': achievement.category,
+            'progress': min(row.progress or 0, achievement.target) if row else 0,
+            'target': achievement.target,
+            'unlocked': is_unlocked(achievement, row),
+            'reward': achievement.reward,
+            'claimed': bool(row and row.is_completed)
+        })
+    return achievements
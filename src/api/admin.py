@@ -1,7 +1,7 @@
 
 import os
 from flask_admin import Admin
-from .models import db, User
+from .models import db, User, GameCatalog
 from flask_admin.contrib.sqla import ModelView
 
 
@@ -12,6 +12,8 @@ def setup_admin(app):
 
     # Add your models here, for example this is how we add a the User model to the admin
     admin.add_view(ModelView(User, db.session))
+    # GameHub games (added/edited games show up without a redeploy)
+    admin.add_view(ModelView(GameCatalog, db.session))
 
     # You can duplicate that line to add mew models
     # admin.add_view(ModelView(YourModelName, db.session))
@@ -14,10 +14,14 @@ from datetime import datetime
 from flask import Blueprint, request, jsonify, redirect, url_for, current_app
 from flask_jwt_extended import (
     jwt_required, create_access_token,
-    get_jwt_identity, create_refresh_token, get_jwt
+    get_jwt_identity, create_refresh_token, get_jwt, get_current_user
 )
 from authlib.integrations.flask_client import OAuth
 from api.models import db, User
+from api.passwords import password_hasher, HashingBusy
+from api.revocation import revocation_store
+from api.identity import current_user
+from api.stats_token import issue_stats_token, read_stats_token
 
 # Create authentication blueprint (a section of the app)
 auth = Blueprint('auth', __name__)
@@ -25,8 +29,6 @@ auth = Blueprint('auth', __name__)
 # OAuth setup (for "Login with Google")
 oauth = OAuth()
 
-# Token blacklist (canceled tickets go here)
-blacklisted_tokens = set()
 
 
 def init_oauth(app):
@@ -67,6 +69,16 @@ def init_oauth(app):
 # 📝 TRADITIONAL AUTHENTICATION
 # ===============================
 
+def hashing_busy_response(e):
+    """503 + Retry-After when the password hashing pool is full."""
+    response = jsonify({
+        'success': False,
+        'message': f'{e} ⏳'
+    })
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+
 @auth.route('/register', methods=['POST'])
 def register():
     """
@@ -129,6 +141,7 @@ def register():
             'message': 'Welcome to PixelPlay! 🎉',
             'access_token': access_token,
             'refresh_token': refresh_token,
+            'stats_token': issue_stats_token(new_user),
             'user': {
                 'id': new_user.id,
                 'email': new_user.email,
@@ -139,6 +152,10 @@ def register():
             }
         }), 201
 
+    except HashingBusy as e:
+        db.session.rollback()
+        return hashing_busy_response(e)
+
     except Exception as e:
         db.session.rollback()
         print(f"❌ Registration error: {str(e)}")
@@ -203,6 +220,7 @@ def login():
             'message': 'Welcome back! 👋',
             'access_token': access_token,
             'refresh_token': refresh_token,
+            'stats_token': issue_stats_token(user),
             'user': {
                 'id': user.id,
                 'email': user.email,
@@ -213,6 +231,9 @@ def login():
             }
         }), 200
 
+    except HashingBusy as e:
+        return hashing_busy_response(e)
+
     except Exception as e:
         print(f"❌ Login error: {str(e)}")
         return jsonify({
@@ -330,7 +351,8 @@ def google_callback():
 
         # 🚀 Send user back to frontend with tokens
         frontend_url = os.getenv('FRONTEND_URL', 'http://localhost:3000')
-        return redirect(f"{frontend_url}/auth/callback?access_token={access_token}&refresh_token={refresh_token}")
+        stats_token = issue_stats_token(user) or ''
+        return redirect(f"{frontend_url}/auth/callback?access_token={access_token}&refresh_token={refresh_token}&stats_token={stats_token}")
 
     except Exception as e:
         print(f"❌ Google callback error: {str(e)}")
@@ -354,7 +376,7 @@ def refresh():
     """
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = current_user()
 
         if not user or not user.is_active:
             return jsonify({
@@ -369,7 +391,8 @@ def refresh():
 
         return jsonify({
             'success': True,
-            'access_token': new_token
+            'access_token': new_token,
+            'stats_token': issue_stats_token(user)
         }), 200
 
     except Exception as e:
@@ -388,11 +411,10 @@ def logout():
     Like turning in your ticket at the exit!
     """
     try:
-        # Get token ID and add to blacklist
-        jti = get_jwt()['jti']
-        blacklisted_tokens.add(jti)
+        # Revoke the token until it expires (checked by the JWT blocklist loader)
+        revocation_store.revoke(get_jwt())
 
-        print(f"👋 User logged out (token blacklisted)")
+        print(f"👋 User logged out (token revoked)")
 
         return jsonify({
             'success': True,
@@ -412,10 +434,30 @@ def verify_token():
     """
     ✅ Check if a token is still valid
     Like checking if your ticket hasn't expired!
+
+    Send a stats token in X-Stats-Token to skip the database: the account
+    comes from the cached identity and level/xp/coins from the token.
     """
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        identity = get_current_user()
+        stats = read_stats_token(user_id)
+
+        if stats is not None and identity.is_active:
+            return jsonify({
+                'success': True,
+                'valid': True,
+                'user': {
+                    'id': identity.id,
+                    'email': identity.email,
+                    'name': identity.email.split('@')[0],
+                    'level': stats['level'],
+                    'xp': stats['xp'],
+                    'coins': stats['coins']
+                }
+            }), 200
+
+        user = current_user()
 
         if not user or not user.is_active:
             return jsonify({
@@ -433,7 +475,8 @@ def verify_token():
                 'level': user.level,
                 'xp': user.xp,
                 'coins': user.coins
-            }
+            },
+            'stats_token': issue_stats_token(user)
         }), 200
 
     except Exception as e:
@@ -456,8 +499,7 @@ def get_profile():
     Like looking at your player card!
     """
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = current_user()
 
         if not user:
             return jsonify({
@@ -486,7 +528,7 @@ def update_profile():
     """
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = current_user()
 
         if not user:
             return jsonify({
@@ -559,7 +601,7 @@ def change_password():
     """
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = current_user()
 
         if not user:
             return jsonify({
@@ -578,8 +620,8 @@ def change_password():
                 'message': 'Both current and new password required! 🔒'
             }), 400
 
-        # Verify current password
-        if not user.check_password(current_password):
+        # Verify current password (no rehash, it's replaced below)
+        if not password_hasher.verify(user.password_hash, current_password):
             return jsonify({
                 'success': False,
                 'message': 'Current password is wrong! 🔒'
@@ -603,6 +645,10 @@ def change_password():
             'message': 'Password changed successfully! ✅'
         }), 200
 
+    except HashingBusy as e:
+        db.session.rollback()
+        return hashing_busy_response(e)
+
     except Exception as e:
         db.session.rollback()
         print(f"❌ Password change error: {str(e)}")
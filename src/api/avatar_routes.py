@@ -8,7 +8,12 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
 import json
-from api.models import db, User, UserAvatar, UnlockedItem, UserProgress, ItemCatalog, SavedAvatarPreset
+from api.models import db, UserAvatar, UnlockedItem, UserProgress, SavedAvatarPreset
+from api.item_catalog import catalog
+from api.ownership import owns_catalog_item, owned_bitmaps, has_bit
+from api.coins import spend
+from api.idempotency import idempotent
+from api.identity import current_user
 
 # ===================================
 # CREATE BLUEPRINTS
@@ -206,17 +211,27 @@ def get_all_avatars():
 @items_bp.route('/unlocked', methods=['GET'])
 @jwt_required()
 def get_unlocked_items():
-    """Get all items user has unlocked."""
+    """
+    Get all items user has unlocked.
+    Catalog names/rarities come from the in-memory catalog (one query in total).
+    """
     try:
         user_id = get_jwt_identity()
         style = request.args.get('style')
         
-        query = UnlockedItem.query.filter_by(user_id=user_id)
+        query = db.session.query(
+            UnlockedItem.avatar_style,
+            UnlockedItem.item_category,
+            UnlockedItem.item_value,
+            UnlockedItem.unlocked_at,
+            UnlockedItem.is_equipped
+        ).filter(UnlockedItem.user_id == user_id)
         
         if style:
-            query = query.filter_by(avatar_style=style)
+            query = query.filter(UnlockedItem.avatar_style == style)
         
         items = query.all()
+        snapshot = catalog()
         
         # Organize items by category
         organized = {}
@@ -224,13 +239,7 @@ def get_unlocked_items():
             if item.item_category not in organized:
                 organized[item.item_category] = []
             
-            # Get item details from catalog
-            catalog_item = ItemCatalog.query.filter_by(
-                avatar_style=item.avatar_style,
-                item_category=item.item_category,
-                item_value=item.item_value
-            ).first()
-            
+            catalog_item = snapshot.find(item.avatar_style, item.item_category, item.item_value)
             organized[item.item_category].append({
                 'value': item.item_value,
                 'name': catalog_item.item_name if catalog_item else item.item_value,
@@ -262,7 +271,7 @@ def unlock_item():
     """
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = current_user()
         data = request.get_json()
         
         style = data.get('style')
@@ -279,11 +288,7 @@ def unlock_item():
             }), 400
         
         # Check if item exists in catalog
-        catalog_item = ItemCatalog.query.filter_by(
-            avatar_style=style,
-            item_category=category,
-            item_value=value
-        ).first()
+        catalog_item = catalog().find(style, category, value)
         
         if not catalog_item:
             return jsonify({
@@ -292,14 +297,7 @@ def unlock_item():
             }), 404
         
         # Check if already unlocked
-        existing = UnlockedItem.query.filter_by(
-            user_id=user_id,
-            avatar_style=style,
-            item_category=category,
-            item_value=value
-        ).first()
-        
-        if existing:
+        if owns_catalog_item(user, catalog_item.id):
             return jsonify({
                 'success': False,
                 'message': 'Item already unlocked'
@@ -307,13 +305,20 @@ def unlock_item():
         
         # If purchasing, check coins and deduct
         if unlock_method == 'purchase' and cost > 0:
-            if not user.can_afford(cost):
+            payment = spend(user, cost, source='unlock',
+                            idempotency_key=f'unlock:{catalog_item.id}')
+            if not payment.ok:
                 return jsonify({
                     'success': False,
-                    'message': f'Not enough coins. Need {cost}, have {user.coins}'
+                    'message': f'Not enough coins. Need {cost}, have {payment.balance}'
                 }), 403
-            
-            user.spend_coins(cost)
+            if payment.replayed:
+                # A concurrent request already unlocked it
+                db.session.rollback()
+                return jsonify({
+                    'success': False,
+                    'message': 'Item already unlocked'
+                }), 400
         
         # Unlock the item
         new_item = UnlockedItem(
@@ -363,30 +368,14 @@ def unlock_item():
 def get_item_catalog():
     """Get available items from catalog based on user level."""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = current_user()
         style = request.args.get('style')
         
-        # Build query
-        query = ItemCatalog.query.filter(
-            ItemCatalog.unlock_level <= user.level  # Using User.level!
-        )
-        
-        if style:
-            query = query.filter_by(avatar_style=style)
+        # Items up to the user's level, already in catalog order
+        catalog_items = catalog().up_to_level(user.level, style)  # Using User.level!
         
-        catalog_items = query.order_by(
-            ItemCatalog.unlock_level,
-            ItemCatalog.rarity,
-            ItemCatalog.item_name
-        ).all()
-        
-        # Get unlocked items
-        unlocked = UnlockedItem.query.filter_by(user_id=user_id).all()
-        unlocked_set = {
-            (item.avatar_style, item.item_category, item.item_value)
-            for item in unlocked
-        }
+        # Unlocked items (bit test against the ownership bitmap)
+        owned = owned_bitmaps(user)['owned_catalog_items']
         
         # Format response
         items = [{
@@ -399,7 +388,7 @@ def get_item_catalog():
             'unlock_cost': item.unlock_cost,
             'rarity': item.rarity,
             'is_default': bool(item.is_default),
-            'is_unlocked': (item.avatar_style, item.item_category, item.item_value) in unlocked_set
+            'is_unlocked': has_bit(owned, item.id)
         } for item in catalog_items]
         
         return jsonify({
@@ -430,7 +419,7 @@ def get_progress():
     """
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = current_user()
         progress = user.progress or UserProgress(user_id=user_id)
         
         return jsonify({
@@ -464,14 +453,14 @@ def get_progress():
 
 @progress_bp.route('/points', methods=['POST'])
 @jwt_required()
+@idempotent
 def add_points():
     """
     Add XP to user (alternative endpoint).
     Uses User.add_xp() from the centralized system.
     """
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = current_user()
         data = request.get_json()
         
         points = data.get('points')
@@ -510,6 +499,7 @@ def add_points():
 
 @progress_bp.route('/daily-reward', methods=['POST'])
 @jwt_required()
+@idempotent
 def claim_daily_reward():
     """
     Claim daily reward.
@@ -517,7 +507,7 @@ def claim_daily_reward():
     """
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = current_user()
         progress = user.progress or UserProgress(user_id=user_id)
         if not progress.user_id:
             db.session.add(progress)
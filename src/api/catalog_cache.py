@@ -0,0 +1,86 @@
+# src/api/catalog_cache.py
+"""
+Versioned in-memory copies of PixelPlay's small, read-mostly catalogs
+(the item catalog and the GameHub game catalog).
+
+- Each worker holds an immutable snapshot built from the catalog's rows
+- Inserts/updates/deletes on the catalog model bump the version after they
+  commit; the next read sees the new version and swaps in a fresh snapshot
+- Also reloaded every reload_seconds so each gunicorn worker picks up
+  catalog edits made by the other workers
+
+A catalog supplies only its row loader (rows -> read-only tuples) and its
+snapshot class, see api/item_catalog.py and api/game_catalog.py.
+"""
+
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+from api.models import db
+
+
+class VersionedCatalogCache:
+    """Holds the current snapshot and swaps it when the version changes."""
+
+    def __init__(self, model, load_rows, snapshot_class, reload_seconds=600):
+        """
+        Args:
+            model: the catalog's model; its writes mark the snapshot stale
+            load_rows: function returning the catalog as read-only tuples
+            snapshot_class: built as snapshot_class(rows, version)
+            reload_seconds: max age of a snapshot
+        """
+        self.load_rows = load_rows
+        self.snapshot_class = snapshot_class
+        self.reload_seconds = reload_seconds
+        self.version = 0
+        self._snapshot = None
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+        # Set in session.info when the current transaction touched the catalog
+        self.changed_key = f'{model.__tablename__}_changed'
+        for change in ('after_insert', 'after_update', 'after_delete'):
+            event.listen(model, change, self._catalog_changed)
+        event.listen(db.session, 'after_commit', self._bump_if_changed)
+        event.listen(db.session, 'after_soft_rollback', self._discard_change)
+
+    def load(self):
+        """Read the whole catalog into a new snapshot."""
+        version = self.version
+        snapshot = self.snapshot_class(self.load_rows(), version)
+        with self._lock:
+            self._snapshot = snapshot
+            self._loaded_at = time.monotonic()
+        return snapshot
+
+    def bump_version(self):
+        """Mark the loaded snapshot as stale (reloaded on next read)."""
+        with self._lock:
+            self.version += 1
+
+    def snapshot(self):
+        """Current catalog snapshot (no DB read unless it's stale)."""
+        snapshot = self._snapshot
+        if (snapshot is None
+                or snapshot.version != self.version
+                or time.monotonic() - self._loaded_at > self.reload_seconds):
+            snapshot = self.load()
+        return snapshot
+
+    # ===============================
+    # 🔄 VERSIONING
+    # ===============================
+
+    def _catalog_changed(self, mapper, connection, row):
+        session = object_session(row)
+        if session is not None:
+            session.info[self.changed_key] = True
+
+    def _bump_if_changed(self, session):
+        if session.info.pop(self.changed_key, False):
+            self.bump_version()
+
+    def _discard_change(self, session, previous_transaction):
+        session.info.pop(self.changed_key, None)
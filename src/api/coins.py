@@ -0,0 +1,175 @@
+# src/api/coins.py
+"""
+Coin ledger for PixelPlay.
+Every change to users.coins goes through here, as one conditional UPDATE
+(applied by the database against the current balance, so concurrent
+purchases can't double spend) plus one append-only coin_ledger row.
+
+- spend(): UPDATE users SET coins = coins - :n WHERE coins >= :n RETURNING coins
+- credit(): UPDATE users SET coins = coins + :n RETURNING coins
+- Idempotency: a mutation with an idempotency_key is applied at most once
+  per user. The ledger insert is ON CONFLICT DO NOTHING; if the key already
+  exists, the balance change is reversed and the original entry is returned
+  (replayed=True)
+- Loaded User objects get the new balance via set_committed_value, so the
+  ORM never writes back a stale coins value
+"""
+
+from collections import namedtuple
+from datetime import datetime
+from sqlalchemy import insert, select, update, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm.attributes import set_committed_value
+from api.models import db, User, CoinTransaction
+
+# ok: the change was applied (or had already been applied, see replayed)
+# balance: users.coins afterwards
+CoinResult = namedtuple('CoinResult', ['ok', 'balance', 'transaction_id', 'replayed'])
+
+
+# ===============================
+# 🔧 HELPERS
+# ===============================
+
+def _supports_returning():
+    from api.session_ingest import supports_single_round_trip
+    return supports_single_round_trip()
+
+
+def _ledger_insert(user_id, amount, balance, source, idempotency_key, now):
+    """INSERT coin_ledger row; with a key, ON CONFLICT DO NOTHING RETURNING id."""
+    values = dict(user_id=user_id, amount=amount, balance_after=balance, source=source,
+                  idempotency_key=idempotency_key, created_at=now)
+    if idempotency_key is None:
+        return insert(CoinTransaction).values(**values).returning(CoinTransaction.id)
+
+    dialect = postgresql if db.session.get_bind().dialect.name == 'postgresql' else sqlite
+    return dialect.insert(CoinTransaction).values(**values).on_conflict_do_nothing(
+        index_elements=[CoinTransaction.user_id, CoinTransaction.idempotency_key]
+    ).returning(CoinTransaction.id)
+
+
+def _existing_entry(user_id, idempotency_key):
+    if idempotency_key is None:
+        return None
+    return db.session.execute(
+        select(CoinTransaction.id, CoinTransaction.amount)
+        .where(CoinTransaction.user_id == user_id,
+               CoinTransaction.idempotency_key == idempotency_key)
+    ).first()
+
+
+def _balance(user_id):
+    return db.session.execute(select(User.coins).where(User.id == user_id)).scalar()
+
+
+def _sync_user(user_id, balance):
+    """Push the new balance into a loaded User (without marking it dirty)."""
+    user = db.session.identity_map.get(db.session.identity_key(User, user_id))
+    if user is not None:
+        set_committed_value(user, 'coins', balance)
+
+    # Core UPDATE skips the mapper events the dashboard listens to
+    from api.dashboard import patch_snapshot
+    patch_snapshot(user_id, user={'coins': balance})
+
+
+def _change_balance(user_id, delta, now):
+    """Conditional UPDATE ... RETURNING coins (None if funds/user missing)."""
+    statement = update(User).where(User.id == user_id)
+    if delta < 0:
+        statement = statement.where(User.coins >= -delta)
+    return db.session.execute(
+        statement.values(coins=User.coins + delta, updated_at=now).returning(User.coins),
+        execution_options={'synchronize_session': False}
+    ).scalar_one_or_none()
+
+
+# ===============================
+# 💰 LEDGER OPERATIONS
+# ===============================
+
+def _apply(user, delta, source, idempotency_key):
+    state = inspect(user) if isinstance(user, User) else None
+
+    # Users that were never saved have no row to update yet
+    if state is not None and state.transient:
+        if (user.coins or 0) + delta < 0:
+            return CoinResult(False, user.coins or 0, None, False)
+        user.coins = (user.coins or 0) + delta
+        return CoinResult(True, user.coins, None, False)
+    if state is not None and state.pending:
+        db.session.flush()
+
+    user_id = user.id if isinstance(user, User) else int(user)
+    now = datetime.utcnow()
+
+    if not _supports_returning():
+        return _apply_orm(user_id, delta, source, idempotency_key, now)
+
+    balance = _change_balance(user_id, delta, now)
+    if balance is None:
+        # Not enough coins (or no such user); a finished replay still counts
+        existing = _existing_entry(user_id, idempotency_key)
+        if existing:
+            return CoinResult(True, _balance(user_id), existing.id, True)
+        return CoinResult(False, _balance(user_id), None, False)
+
+    result = record_change(user_id, delta, balance, source, idempotency_key, now)
+    _sync_user(user_id, result.balance)
+    return result
+
+
+def _apply_orm(user_id, delta, source, idempotency_key, now):
+    """ORM fallback for databases without UPDATE ... RETURNING."""
+    existing = _existing_entry(user_id, idempotency_key)
+    user = db.session.get(User, user_id)
+    if existing:
+        return CoinResult(True, user.coins if user else 0, existing.id, True)
+    if user is None or user.coins + delta < 0:
+        return CoinResult(False, user.coins if user else 0, None, False)
+
+    user.coins += delta
+    entry = CoinTransaction(user_id=user_id, amount=delta, balance_after=user.coins,
+                            source=source, idempotency_key=idempotency_key, created_at=now)
+    db.session.add(entry)
+    db.session.flush()
+    return CoinResult(True, user.coins, entry.id, False)
+
+
+def spend(user, amount, source='purchase', idempotency_key=None):
+    """
+    Take coins from a user if (and only if) they have enough.
+    Args: user (User or id), amount > 0, ledger source, optional idempotency key
+    Returns: CoinResult (ok=False means not enough coins)
+    """
+    return _apply(user, -abs(amount), source, idempotency_key)
+
+
+def credit(user, amount, source='reward', idempotency_key=None):
+    """
+    Give coins to a user.
+    Returns: CoinResult
+    """
+    return _apply(user, abs(amount), source, idempotency_key)
+
+
+def record_change(user_id, amount, balance, source, idempotency_key=None, now=None):
+    """
+    Ledger row for a balance change made by another statement (e.g. the
+    level-up coins in session_ingest's UPDATE users). If the idempotency key
+    was already used, the change is undone and the original entry returned.
+    Returns: CoinResult
+    """
+    now = now or datetime.utcnow()
+    transaction_id = db.session.execute(
+        _ledger_insert(user_id, amount, balance, source, idempotency_key, now)
+    ).scalar()
+
+    if transaction_id is None:
+        # Key already used: undo the change and report the original entry
+        balance = _change_balance(user_id, -amount, now)
+        existing = _existing_entry(user_id, idempotency_key)
+        return CoinResult(True, balance, existing.id if existing else None, True)
+
+    return CoinResult(True, balance, transaction_id, False)
@@ -1,6 +1,8 @@
 
 import click
-from api.models import db, User
+import time
+from sqlalchemy import event
+from api.models import db, User, GameSession, GameSessionDaily, CoinTransaction, UserAchievement
 
 """
 In this file, you can add as many commands as you want using the @app.cli.command decorator
@@ -31,4 +33,362 @@ def setup_commands(app):
 
     @app.cli.command("insert-test-data")
     def insert_test_data():
-        pass
\ No newline at end of file
+        pass
+
+    """
+    Benchmark the game session write path: queries per session before
+    (ORM load/mutate/commit + reloading the user) and after (session_ingest).
+    Runs against a throwaway user that is removed afterwards.
+    $ flask benchmark-session-ingest 200
+    """
+    @app.cli.command("benchmark-session-ingest")
+    @click.argument("count", default=100)
+    def benchmark_session_ingest(count):
+        from api.session_ingest import ingest_session, supports_single_round_trip
+
+        counter = {'queries': 0}
+
+        def count_query(conn, cursor, statement, parameters, context, executemany):
+            counter['queries'] += 1
+
+        def legacy_path(user_id, n):
+            GameSession.record_session_orm(user_id, 'benchmark', score=n, xp_earned=10)
+            user = User.query.get(user_id)
+            return user.level, user.progress.total_games_played
+
+        def ingest_path(user_id, n):
+            return ingest_session(user_id, 'benchmark', score=n, xp_earned=10)['user_stats']
+
+        paths = [('before (ORM)', legacy_path)]
+        if supports_single_round_trip():
+            paths.append(('after (ingest)', ingest_path))
+        else:
+            print("⚠️ This database has no INSERT ... ON CONFLICT ... RETURNING, skipping ingest path")
+
+        user = User(email=f"benchmark_{int(time.time())}@test.com", password="benchmark")
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+        event.listen(db.engine, "before_cursor_execute", count_query)
+        try:
+            for label, record in paths:
+                db.session.expire_all()
+                counter['queries'] = 0
+                started = time.perf_counter()
+                for n in range(int(count)):
+                    record(user_id, n)
+                elapsed = time.perf_counter() - started
+                print(f"{label:16} {counter['queries'] / int(count):6.2f} queries/session "
+                      f"{elapsed * 1000 / int(count):8.3f} ms/session")
+        finally:
+            event.remove(db.engine, "before_cursor_execute", count_query)
+            GameSession.query.filter_by(user_id=user_id).delete()
+            GameSessionDaily.query.filter_by(user_id=user_id).delete()
+            CoinTransaction.query.filter_by(user_id=user_id).delete()
+            UserAchievement.query.filter_by(user_id=user_id).delete()
+            db.session.delete(User.query.get(user_id))
+            db.session.commit()
+
+    """
+    Compare every user's dashboard snapshot against a full recompute.
+    Pass --fix to rewrite the ones that drifted and save the missing ones
+    (reads don't save snapshots; writes and this command do).
+    $ flask check-dashboard-snapshots --fix
+    """
+    @app.cli.command("check-dashboard-snapshots")
+    @click.option("--fix", is_flag=True, help="Rewrite inconsistent snapshots, save missing ones")
+    def check_dashboard_snapshots(fix):
+        from api.dashboard import check_consistency
+
+        user_ids = db.session.scalars(db.select(User.id).order_by(User.id)).all()
+        inconsistent = 0
+        for user_id in user_ids:
+            mismatches = check_consistency(user_id, fix=fix)
+            if mismatches:
+                inconsistent += 1
+                fields = ', '.join(f"{m['section']}.{m['field'] or '*'}" for m in mismatches)
+                print(f"❌ User {user_id}: {fields}")
+
+        print(f"Checked {len(user_ids)} users, {inconsistent} inconsistent"
+              + (" (fixed)" if fix and inconsistent else ""))
+
+    """
+    Evaluate every achievement for every user and upsert user_achievements
+    (after adding or retuning an achievement). Users are read in keyset pages
+    by id; each page is evaluated in a worker process while the previous
+    page is written, and the last written user id is saved to a checkpoint
+    file so an interrupted run picks up where it stopped.
+    $ flask backfill-achievements
+    $ flask backfill-achievements --chunk-size 5000 --workers 8
+    $ flask backfill-achievements --restart    (ignore the checkpoint)
+    """
+    @app.cli.command("backfill-achievements")
+    @click.option("--chunk-size", default=2000, help="Users per page")
+    @click.option("--workers", default=None, type=int,
+                  help="Evaluation processes (default: CPU count, 0 = evaluate inline)")
+    @click.option("--checkpoint", "checkpoint_path", default=None,
+                  help="Checkpoint file (default: instance/achievement_backfill.json)")
+    @click.option("--restart", is_flag=True, help="Start from the first user")
+    def backfill_achievements(chunk_size, workers, checkpoint_path, restart):
+        import json
+        import os
+        from concurrent.futures import ProcessPoolExecutor
+        from api.achievements import stat_vector_page, evaluated_rows, upsert_progress
+
+        checkpoint_path = checkpoint_path or os.path.join(
+            app.instance_path, 'achievement_backfill.json')
+        workers = os.cpu_count() if workers is None else workers
+
+        state = {'last_user_id': 0, 'users': 0}
+        if not restart and os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as f:
+                state = json.load(f)
+            print(f"↩️ Resuming after user {state['last_user_id']} "
+                  f"({state['users']} users already done)")
+
+        remaining = db.session.query(db.func.count(User.id)).filter(
+            User.id > state['last_user_id']).scalar()
+        print(f"🏆 Backfilling achievements for {remaining} users "
+              f"(pages of {chunk_size}, {workers or 'no'} worker processes)")
+
+        started = time.perf_counter()
+        done = 0
+
+        def write(rows, last_user_id, users):
+            nonlocal done
+            upsert_progress(db.session, rows)
+            db.session.commit()
+            done += users
+            state['last_user_id'] = last_user_id
+            state['users'] += users
+            os.makedirs(os.path.dirname(checkpoint_path) or '.', exist_ok=True)
+            with open(checkpoint_path, 'w') as f:
+                json.dump(state, f)
+            elapsed = time.perf_counter() - started
+            print(f"  {done}/{remaining} users  {done / elapsed:,.0f} users/s  "
+                  f"(last id {last_user_id})")
+
+        def pages():
+            after_id = state['last_user_id']
+            while True:
+                page = stat_vector_page(after_id, chunk_size)
+                if not page:
+                    return
+                after_id = page[-1][0]
+                yield page
+
+        if workers:
+            # Evaluate page N in the pool while page N - 1 is being written
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = None
+                for page in pages():
+                    future = pool.submit(evaluated_rows, page)
+                    if pending:
+                        write(pending[0].result(), *pending[1:])
+                    pending = (future, page[-1][0], len(page))
+                if pending:
+                    write(pending[0].result(), *pending[1:])
+        else:
+            for page in pages():
+                write(evaluated_rows(page), page[-1][0], len(page))
+
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        elapsed = time.perf_counter() - started
+        print(f"✅ Backfilled {done} users in {elapsed:.1f}s")
+
+    """
+    Build the item ownership bitmaps of users who don't have them yet (read
+    routes compute them in memory until then). Users are read in keyset
+    pages by id, one transaction per page.
+    $ flask backfill-ownership-bitmaps
+    $ flask backfill-ownership-bitmaps --chunk-size 500
+    """
+    @app.cli.command("backfill-ownership-bitmaps")
+    @click.option("--chunk-size", default=200, help="Users per page")
+    def backfill_ownership_bitmaps(chunk_size):
+        from api.ownership import ensure_ownership
+
+        unbuilt = db.or_(User.owned_catalog_items.is_(None), User.owned_shop_items.is_(None))
+        after_id, built = 0, 0
+        started = time.perf_counter()
+        while True:
+            users = (User.query.filter(unbuilt, User.id > after_id)
+                     .order_by(User.id).limit(chunk_size).all())
+            if not users:
+                break
+            for user in users:
+                ensure_ownership(user)
+            db.session.commit()
+            after_id, built = users[-1].id, built + len(users)
+            print(f"  {built} users (last id {after_id})")
+
+        print(f"✅ Built ownership bitmaps for {built} users "
+              f"in {time.perf_counter() - started:.1f}s")
+
+    """
+    Hash and verify throwaway passwords through the configured password
+    hasher (same method, pool size and host-wide slots as the web workers)
+    and print its latency and queue metrics, e.g. to size
+    PASSWORD_HASH_CONCURRENCY for a machine.
+    $ flask password-hashing-stats
+    $ flask password-hashing-stats --samples 50 --threads 8
+    """
+    @app.cli.command("password-hashing-stats")
+    @click.option("--samples", default=10, help="Passwords to hash (and verify)")
+    @click.option("--threads", default=1, help="Concurrent callers, like request threads")
+    def password_hashing_stats(samples, threads):
+        import json
+        import secrets
+        from concurrent.futures import ThreadPoolExecutor
+        from api.passwords import password_hasher
+
+        def round_trip(_):
+            password = secrets.token_urlsafe(12)
+            return password_hasher.verify(password_hasher.hash(password), password)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, threads)) as pool:
+            verified = sum(pool.map(round_trip, range(samples)))
+        print(f"🔐 {verified}/{samples} hashes verified in {time.perf_counter() - started:.2f}s")
+        print(json.dumps(password_hasher.stats(), indent=2))
+
+    """
+    Delete expired Idempotency-Key responses (also done as new keys come in).
+    $ flask purge-idempotency-keys
+    """
+    @app.cli.command("purge-idempotency-keys")
+    def purge_idempotency_keys():
+        from api.idempotency import purge_expired
+        print(f"🧹 Deleted {purge_expired()} expired idempotency keys")
+
+    """
+    Delete revoked tokens that have expired anyway (workers also do this
+    every so many logouts).
+    $ flask purge-revoked-tokens
+    """
+    @app.cli.command("purge-revoked-tokens")
+    def purge_revoked_tokens():
+        from api.revocation import purge_expired
+        print(f"🧹 Deleted {purge_expired()} expired revoked tokens")
+
+    """
+    Rebuild the game_session_daily rollup from the raw game_sessions rows.
+    Runs as one DELETE + INSERT ... SELECT ... GROUP BY inside the database.
+    $ flask backfill-session-rollup            (every user)
+    $ flask backfill-session-rollup --user 42  (one user)
+    """
+    @app.cli.command("backfill-session-rollup")
+    @click.option("--user", "user_id", type=int, default=None, help="Only rebuild this user")
+    def backfill_session_rollup(user_id):
+        day = db.func.date(GameSession.played_at)
+        rollup = db.select(
+            GameSession.user_id,
+            GameSession.game_id,
+            day,
+            db.func.count(GameSession.id),
+            db.func.coalesce(db.func.sum(GameSession.xp_earned), 0),
+            db.func.coalesce(db.func.sum(GameSession.duration_minutes), 0),
+            db.func.coalesce(db.func.sum(GameSession.score), 0),
+            db.func.coalesce(db.func.max(GameSession.score), 0),
+            db.func.sum(db.case((GameSession.completed, 1), else_=0)),
+            db.func.now()
+        ).where(GameSession.played_at.isnot(None)).group_by(
+            GameSession.user_id, GameSession.game_id, day)
+
+        delete = db.delete(GameSessionDaily)
+        if user_id is not None:
+            rollup = rollup.where(GameSession.user_id == user_id)
+            delete = delete.where(GameSessionDaily.user_id == user_id)
+
+        started = time.perf_counter()
+        db.session.execute(delete)
+        result = db.session.execute(db.insert(GameSessionDaily).from_select(
+            ['user_id', 'game_id', 'day', 'sessions', 'xp_earned', 'minutes_played',
+             'score_sum', 'score_max', 'completions', 'updated_at'],
+            rollup
+        ))
+        db.session.commit()
+
+        print(f"✅ Rebuilt {result.rowcount} daily rollup rows "
+              f"in {time.perf_counter() - started:.2f}s")
+
+    """
+    Query-plan regression check for the hot route queries.
+    Runs EXPLAIN on each one (EXPLAIN QUERY PLAN on SQLite, EXPLAIN with
+    sequential scans disabled on PostgreSQL) and exits non-zero if any of
+    them still has to scan a whole table.
+    $ flask explain-hot-queries
+    """
+    @app.cli.command("explain-hot-queries")
+    def explain_hot_queries():
+        import json
+        from datetime import datetime, timedelta
+        from api.models import (UnlockedItem, UserAvatar, UserAchievement, Game,
+                                UserDashboardSnapshot, UserGameFlag)
+        from api.game_catalog import user_games_query
+        from api.session_history import history_query, NO_FILTERS
+
+        user_id, since = 1, datetime.utcnow() - timedelta(days=30)
+        queries = {
+            'recent sessions': db.select(GameSession)
+                .where(GameSession.user_id == user_id)
+                .order_by(GameSession.played_at.desc(), GameSession.id.desc()).limit(5),
+            'sessions in window': db.select(GameSession)
+                .where(GameSession.user_id == user_id, GameSession.played_at >= since),
+            'daily rollup window': db.select(GameSessionDaily)
+                .where(GameSessionDaily.user_id == user_id,
+                       GameSessionDaily.day >= since.date()),
+            'owned item': db.select(UnlockedItem)
+                .where(UnlockedItem.user_id == user_id, UnlockedItem.item_catalog_id == 1),
+            'current avatar': db.select(UserAvatar)
+                .where(UserAvatar.user_id == user_id, UserAvatar.is_current == True),
+            'achievement by name': db.select(UserAchievement)
+                .where(UserAchievement.user_id == user_id,
+                       UserAchievement.achievement_name == 'first_steps'),
+            'game by name': db.select(Game)
+                .where(Game.user_id == user_id, Game.name == 'memory'),
+            'dashboard snapshot': db.select(UserDashboardSnapshot.payload)
+                .where(UserDashboardSnapshot.user_id == user_id),
+            'user game flags': db.select(UserGameFlag.kind, UserGameFlag.game_id)
+                .where(UserGameFlag.user_id == user_id),
+            'who favorited game': db.select(UserGameFlag.user_id)
+                .where(UserGameFlag.game_id == 'memory', UserGameFlag.kind == 'favorite'),
+            'gamehub user games': user_games_query(user_id, ['memory-match', 'ninja']),
+            'session history page': history_query(user_id, NO_FILTERS, (datetime.utcnow(), 1000))
+                .limit(21),
+        }
+
+        connection = db.session.connection()
+        dialect = connection.dialect
+        if dialect.name == 'postgresql':
+            # Tiny tables make seq scans "cheaper"; this checks an index exists
+            connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+
+        def plan_nodes(node):
+            yield node
+            for child in node.get('Plans', []):
+                yield from plan_nodes(child)
+
+        failures = 0
+        for name, query in queries.items():
+            sql = str(query.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+            if dialect.name == 'postgresql':
+                plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}").scalar()
+                plan = json.loads(plan) if isinstance(plan, str) else plan
+                steps = [f"{node['Node Type']} {node.get('Index Name') or node.get('Relation Name', '')}"
+                         for node in plan_nodes(plan[0]['Plan'])]
+                scans = [step for step in steps if step.startswith('Seq Scan')]
+            else:
+                steps = [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+                scans = [step for step in steps if step.startswith('SCAN ')]
+
+            failures += bool(scans)
+            print(f"{'❌' if scans else '✅'} {name:22} {' | '.join(steps)}")
+
+        db.session.rollback()
+
+        if failures:
+            raise click.ClickException(f"{failures} hot queries scan a whole table")
+        print("All hot queries use an index")
@@ -0,0 +1,409 @@
+# src/api/dashboard.py
+"""
+Dashboard snapshots for PixelPlay.
+Keeps a materialized copy of each user's /api/dashboard/stats payload in
+user_dashboard_snapshots, so loading the dashboard is one primary-key read
+instead of User + UserProgress + game flags + a recent sessions query.
+
+The payload is split into sections (user, progress, game_stats,
+recent_sessions). Writes tell the snapshot what changed in one of two ways:
+- Patches: new values the writer already has in hand. The session ingest
+  passes its RETURNING rows and new sessions, the coin ledger its new
+  balance, and ORM flushes of User/UserProgress the values they just wrote
+- Dirty sections: anything a writer can't describe (the game flag writes, ORM
+  changes to expired attributes, batches recorded without session ids) gets
+  the section recomputed from the source tables
+Right before the transaction commits, the stored payload is read, dirty
+sections are recomputed, patches are merged in, and the result is written
+back with an UPDATE that only matches if nobody else changed the snapshot
+since the read (no row lock). If that misses, or there is no snapshot yet,
+the whole payload is rebuilt under the row lock instead. Either way it
+commits (or rolls back) with the change.
+"""
+
+from datetime import datetime, date
+from sqlalchemy import event, inspect, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from api.models import (db, User, UserProgress, UserGameFlag, GameSession,
+                        UserDashboardSnapshot)
+
+SECTIONS = ('user', 'progress', 'game_stats', 'recent_sessions')
+
+# Number of sessions shown under "recent activity"
+RECENT_SESSIONS_LIMIT = 5
+
+# Dirty sections for the current transaction live in session.info under this key
+DIRTY_KEY = 'dashboard_dirty'
+# Patches for the current transaction: {user_id: {'user': {...}, 'progress':
+# {...}, 'recent_sessions': [newest first], 'completed_games': [...]}}
+PATCH_KEY = 'dashboard_patches'
+# Freshly computed user sections, {user_id: section}, for after_commit
+# listeners (stats tokens, api/stats_token.py)
+COMMITTED_KEY = 'dashboard_committed'
+
+# Columns each section depends on (an UPDATE touching none of them is ignored)
+USER_FIELDS = ('level', 'xp', 'coins', 'streak_days', 'last_activity', 'last_activity_date')
+PROGRESS_FIELDS = ('total_games_played', 'workouts_completed', 'items_unlocked',
+                   'avatars_created', 'daily_reward_streak', 'last_daily_reward')
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+# ===============================
+# 🧮 COMPUTING SECTIONS
+# ===============================
+
+def user_section(values):
+    """The user section from a mapping of USER_FIELDS values."""
+    return {
+        'level': values['level'],
+        'xp': values['xp'],
+        'coins': values['coins'],
+        'streak_days': values['streak_days'],
+        'last_activity': _isoformat(values['last_activity']),
+        'last_activity_date': _isoformat(values['last_activity_date'])
+    }
+
+
+def progress_section(values):
+    """The progress section from a mapping of PROGRESS_FIELDS values (None: no row)."""
+    if values is None:
+        return {'total_games_played': 0, 'workouts_completed': 0, 'items_unlocked': 0,
+                'avatars_created': 0, 'daily_reward_streak': 0, 'last_daily_reward': None}
+    return {
+        'total_games_played': values['total_games_played'],
+        'workouts_completed': values['workouts_completed'],
+        'items_unlocked': values['items_unlocked'],
+        'avatars_created': values['avatars_created'],
+        'daily_reward_streak': values['daily_reward_streak'] or 0,
+        'last_daily_reward': _isoformat(values['last_daily_reward'])
+    }
+
+
+def _compute_stat_sections(session, user_id):
+    """The user and progress sections from one joined query."""
+    row = session.execute(
+        select(
+            *(getattr(User, field) for field in USER_FIELDS),
+            *(getattr(UserProgress, field) for field in PROGRESS_FIELDS),
+            UserProgress.user_id.label('has_progress')
+        )
+        .outerjoin(UserProgress, UserProgress.user_id == User.id)
+        .where(User.id == user_id)
+    ).first()
+    if row is None:
+        return None
+
+    return {
+        'user': user_section(row._mapping),
+        'progress': progress_section(row._mapping if row.has_progress is not None else None)
+    }
+
+
+def _compute_game_stats(session, user_id):
+    games = UserGameFlag.game_lists(user_id, session=session)
+    return {
+        'completed_games': games['completed'],
+        'favorite_games': games['favorite'],
+        'unlocked_games': games['unlocked']
+    }
+
+
+def _compute_recent_sessions(session, user_id):
+    sessions = session.scalars(
+        select(GameSession)
+        .where(GameSession.user_id == user_id)
+        .order_by(GameSession.played_at.desc(), GameSession.id.desc())
+        .limit(RECENT_SESSIONS_LIMIT)
+    ).all()
+    return [s.serialize() for s in sessions]
+
+
+def compute_snapshot(user_id, sections=SECTIONS, session=None):
+    """
+    Recompute snapshot sections straight from the source tables.
+    The user and progress sections come from one query, so either of them
+    being requested refreshes both.
+    Returns: dict of section -> data, or None if the user doesn't exist.
+    """
+    session = session or db.session
+    payload = {}
+    if {'user', 'progress'} & set(sections):
+        stat_sections = _compute_stat_sections(session, user_id)
+        if stat_sections is None:
+            return None
+        payload.update(stat_sections)
+    if 'game_stats' in sections:
+        payload['game_stats'] = _compute_game_stats(session, user_id)
+    if 'recent_sessions' in sections:
+        payload['recent_sessions'] = _compute_recent_sessions(session, user_id)
+    return payload
+
+
+def build_stats(payload):
+    """Turn a snapshot payload into the /api/dashboard/stats 'stats' dict."""
+    user = payload['user']
+    progress = payload['progress']
+    game_stats = payload['game_stats']
+    last_daily_reward = progress['last_daily_reward']
+
+    return {
+        # 👤 User stats (PRIMARY)
+        'level': user['level'],
+        'xp': user['xp'],
+        'coins': user['coins'],
+        'streak_days': user['streak_days'],
+        'last_activity': user['last_activity'],
+        'last_activity_date': user['last_activity_date'],
+
+        # 📊 Activity counts
+        'total_games_played': progress['total_games_played'],
+        'workouts_completed': progress['workouts_completed'],
+        'items_unlocked': progress['items_unlocked'],
+        'avatars_created': progress['avatars_created'],
+
+        # 🎮 Game-specific
+        'completed_games': game_stats['completed_games'],
+        'favorite_games': game_stats['favorite_games'],
+        'unlocked_games': game_stats['unlocked_games'],
+
+        # 🎁 Daily rewards (claimability depends on today, so it's derived here)
+        'can_claim_daily_reward': (
+            last_daily_reward is None
+            or date.today() > date.fromisoformat(last_daily_reward)),
+        'daily_reward_streak': progress['daily_reward_streak'],
+
+        # 📈 Recent activity
+        'recent_sessions': payload['recent_sessions']
+    }
+
+
+# ===============================
+# 📖 READING SNAPSHOTS
+# ===============================
+
+def _write_snapshot(session, user_id, payload):
+    """INSERT ... ON CONFLICT DO UPDATE the whole snapshot payload."""
+    now = datetime.utcnow()
+    dialect = postgresql if session.get_bind().dialect.name == 'postgresql' else sqlite
+    statement = dialect.insert(UserDashboardSnapshot).values(
+        user_id=user_id, payload=payload, updated_at=now)
+    session.execute(statement.on_conflict_do_update(
+        index_elements=[UserDashboardSnapshot.user_id],
+        set_={'payload': payload, 'updated_at': now}
+    ))
+
+
+def get_snapshot(user_id):
+    """
+    Get a user's dashboard payload (one primary-key read).
+    Users without a snapshot yet get it computed, not saved: their next
+    write builds it, or `flask check-dashboard-snapshots --fix`.
+    Returns: payload dict, or None if the user doesn't exist.
+    """
+    payload = db.session.execute(
+        select(UserDashboardSnapshot.payload)
+        .where(UserDashboardSnapshot.user_id == user_id)
+    ).scalar_one_or_none()
+    if payload is not None:
+        return payload
+    return compute_snapshot(user_id)
+
+
+def check_consistency(user_id, fix=False):
+    """
+    Compare a user's stored snapshot with a full recompute.
+    Returns: list of {'section', 'field', 'snapshot', 'actual'} mismatches
+    (empty when consistent). With fix=True the snapshot is rewritten.
+    """
+    stored = db.session.get(UserDashboardSnapshot, user_id)
+    actual = compute_snapshot(user_id)
+    if actual is None:
+        return []
+    snapshot = stored.payload if stored else {}
+
+    mismatches = []
+    for section in SECTIONS:
+        expected, found = actual[section], snapshot.get(section)
+        if isinstance(expected, dict) and isinstance(found, dict):
+            for field, value in expected.items():
+                if found.get(field) != value:
+                    mismatches.append({'section': section, 'field': field,
+                                       'snapshot': found.get(field), 'actual': value})
+        elif expected != found:
+            mismatches.append({'section': section, 'field': None,
+                               'snapshot': found, 'actual': expected})
+
+    if mismatches and fix:
+        _write_snapshot(db.session, user_id, actual)
+        db.session.commit()
+
+    return mismatches
+
+
+# ===============================
+# 🔄 KEEPING SNAPSHOTS IN SYNC
+# ===============================
+
+def mark_dirty(user_id, *sections, session=None):
+    """
+    Flag snapshot sections as changed in the current transaction.
+    They are recomputed right before it commits.
+    """
+    if user_id is None:
+        return
+    session = session or db.session
+    dirty = session.info.setdefault(DIRTY_KEY, {})
+    dirty.setdefault(int(user_id), set()).update(sections or SECTIONS)
+
+
+def patch_snapshot(user_id, user=None, progress=None, new_sessions=(), completed_games=(),
+                   session=None):
+    """
+    Stage values the writer already knows, merged into the snapshot right
+    before the transaction commits (no recompute):
+    - user / progress: fields of those sections (e.g. from RETURNING)
+    - new_sessions: serialized GameSessions just recorded, oldest first
+    - completed_games: game ids just flagged as completed
+    """
+    if user_id is None:
+        return
+    session = session or db.session
+    patch = session.info.setdefault(PATCH_KEY, {}).setdefault(int(user_id), {})
+    if user:
+        patch.setdefault('user', {}).update(user)
+    if progress:
+        patch.setdefault('progress', {}).update(progress)
+    if new_sessions:
+        patch['recent_sessions'] = list(reversed(new_sessions)) + patch.get('recent_sessions', [])
+    if completed_games:
+        patch.setdefault('completed_games', []).extend(completed_games)
+
+
+def _apply_patch(payload, patch, recomputed):
+    """Merge a patch into a payload, except for sections that were just recomputed."""
+    for section in ('user', 'progress'):
+        if section in patch and section not in recomputed:
+            payload[section] = {**payload[section], **patch[section]}
+    if 'recent_sessions' in patch and 'recent_sessions' not in recomputed:
+        payload['recent_sessions'] = (
+            patch['recent_sessions'] + payload['recent_sessions'])[:RECENT_SESSIONS_LIMIT]
+    if 'completed_games' in patch and 'game_stats' not in recomputed:
+        completed = list(payload['game_stats']['completed_games'])
+        completed += [game_id for game_id in dict.fromkeys(patch['completed_games'])
+                      if game_id not in completed]
+        payload['game_stats'] = {**payload['game_stats'], 'completed_games': completed}
+
+
+def _update_snapshot(session, user_id, sections, patch):
+    """
+    Bring one user's snapshot up to date inside the committing transaction.
+    Returns: the new payload, or None if the user doesn't exist.
+    """
+    stored = session.execute(
+        select(UserDashboardSnapshot.payload, UserDashboardSnapshot.updated_at)
+        .where(UserDashboardSnapshot.user_id == user_id)
+    ).first()
+
+    if stored is not None and set(SECTIONS) <= stored.payload.keys():
+        payload = dict(stored.payload)
+        fresh = compute_snapshot(user_id, sections, session=session) if sections else {}
+        if fresh is None:
+            return None
+        payload.update(fresh)
+        _apply_patch(payload, patch, fresh.keys())
+
+        # Only if the snapshot is still the one we read
+        written = session.execute(
+            update(UserDashboardSnapshot)
+            .where(UserDashboardSnapshot.user_id == user_id,
+                   UserDashboardSnapshot.updated_at == stored.updated_at)
+            .values(payload=payload, updated_at=datetime.utcnow())
+        ).rowcount
+        if written:
+            return payload
+
+    # No snapshot yet, or another transaction changed it since we read it:
+    # rebuild the whole payload from the source tables under the row lock
+    session.execute(
+        select(UserDashboardSnapshot.user_id)
+        .where(UserDashboardSnapshot.user_id == user_id)
+        .with_for_update()
+    )
+    payload = compute_snapshot(user_id, session=session)
+    if payload is not None:
+        _write_snapshot(session, user_id, payload)
+    return payload
+
+
+def _fields_changed(target, fields):
+    state = inspect(target)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+
+def _flushed_values(target, fields):
+    """The values just written for fields, or None if any is expired/unloaded."""
+    values = inspect(target).dict
+    if all(field in values for field in fields):
+        return values
+    return None
+
+
+@event.listens_for(User, 'after_update')
+def _user_updated(mapper, connection, user):
+    if _fields_changed(user, USER_FIELDS):
+        session = inspect(user).session
+        values = _flushed_values(user, USER_FIELDS)
+        if values is None:
+            mark_dirty(user.id, 'user', session=session)
+        else:
+            patch_snapshot(user.id, user=user_section(values), session=session)
+
+
+def _progress_written(progress):
+    session = inspect(progress).session
+    values = _flushed_values(progress, PROGRESS_FIELDS)
+    if values is None:
+        mark_dirty(progress.user_id, 'progress', session=session)
+    else:
+        patch_snapshot(progress.user_id, progress=progress_section(values), session=session)
+
+
+@event.listens_for(UserProgress, 'after_insert')
+def _progress_created(mapper, connection, progress):
+    _progress_written(progress)
+
+
+@event.listens_for(UserProgress, 'after_update')
+def _progress_updated(mapper, connection, progress):
+    if _fields_changed(progress, PROGRESS_FIELDS):
+        _progress_written(progress)
+
+
+@event.listens_for(GameSession, 'after_insert')
+def _session_recorded(mapper, connection, game_session):
+    mark_dirty(game_session.user_id, 'recent_sessions', session=inspect(game_session).session)
+
+
+@event.listens_for(db.session, 'before_commit')
+def _refresh_dirty_snapshots(session):
+    # Flush first so pending ORM changes fire their mapper events
+    session.flush()
+    dirty = session.info.pop(DIRTY_KEY, None) or {}
+    patches = session.info.pop(PATCH_KEY, None) or {}
+
+    for user_id in dirty.keys() | patches.keys():
+        sections = dirty.get(user_id, set())
+        patch = patches.get(user_id, {})
+        payload = _update_snapshot(session, user_id, sections, patch)
+        if payload is not None and ({'user', 'progress'} & sections or 'user' in patch):
+            session.info.setdefault(COMMITTED_KEY, {})[user_id] = payload['user']
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _discard_dirty(session, previous_transaction):
+    session.info.pop(DIRTY_KEY, None)
+    session.info.pop(PATCH_KEY, None)
+    session.info.pop(COMMITTED_KEY, None)
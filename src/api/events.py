@@ -0,0 +1,42 @@
+# src/api/events.py
+"""
+Domain events for PixelPlay.
+The User/UserProgress mutation methods (and the SQL session ingest path)
+emit an event whenever a tracked counter changes, carrying the counter's new
+value. Other modules subscribe to the events they care about instead of
+recomputing everything from the stat tables on read (e.g. achievements
+only advance the ones that depend on the counter that changed).
+
+Subscribers run synchronously inside the caller's transaction, so anything
+they stage commits or rolls back together with the change.
+"""
+
+from collections import namedtuple
+
+GamePlayed = namedtuple('GamePlayed', ['user_id', 'total_games_played'])
+WorkoutCompleted = namedtuple('WorkoutCompleted', ['user_id', 'workouts_completed'])
+LevelUp = namedtuple('LevelUp', ['user_id', 'level'])
+ItemUnlocked = namedtuple('ItemUnlocked', ['user_id', 'items_unlocked'])
+AvatarCreated = namedtuple('AvatarCreated', ['user_id', 'avatars_created'])
+StreakChanged = namedtuple('StreakChanged', ['user_id', 'streak_days'])
+
+EVENT_TYPES = (GamePlayed, WorkoutCompleted, LevelUp, ItemUnlocked, AvatarCreated, StreakChanged)
+
+_subscribers = {event_type: [] for event_type in EVENT_TYPES}
+
+
+def subscribe(*event_types):
+    """Decorator: call the function with every event of these types."""
+    def register(handler):
+        for event_type in event_types:
+            _subscribers[event_type].append(handler)
+        return handler
+    return register
+
+
+def emit(event):
+    """Deliver an event to its subscribers (events without a user are dropped)."""
+    if event.user_id is None:
+        return
+    for handler in _subscribers[type(event)]:
+        handler(event)
@@ -0,0 +1,239 @@
+# src/api/game_catalog.py
+"""
+GameHub game catalog for PixelPlay.
+The games live in the game_catalog table (so a game can be added from the
+admin panel without a redeploy) and each worker keeps an immutable snapshot
+of it, versioned and reloaded like the item catalog (api/catalog_cache.py).
+
+Each user's progress on the catalog games (completed, favorite, times
+played, personal best, last played) is read with one joined query and
+cached per user until their next game write: a recorded session, a Game row
+change or a completed/favorite flag change evicts the entry after commit.
+Entries also expire after GAMEHUB_USER_CACHE_SECONDS, so other workers'
+writes show up on this worker too.
+"""
+
+import os
+from collections import namedtuple
+from types import MappingProxyType
+from sqlalchemy import event, and_
+from sqlalchemy.orm import object_session, aliased
+from sqlalchemy.dialects import postgresql, sqlite
+from api.models import db, GameCatalog, Game, GameSession, UserGameFlag
+from api.response_cache import InProcessLRUBackend
+from api.catalog_cache import VersionedCatalogCache
+
+# User ids whose cached game progress is stale once the transaction commits
+STALE_KEY = 'user_games_stale'
+
+# Seeded into an empty catalog
+DEFAULT_GAMES = [
+    {'id': 'memory-match', 'name': 'Memory Match', 'description': 'Test your memory!',
+     'category': 'Puzzle', 'icon': '🧠', 'min_level': 1, 'xp_reward': '10-50', 'sort_order': 1},
+    {'id': 'word-search', 'name': 'Word Search', 'description': 'Find hidden words',
+     'category': 'Puzzle', 'icon': '📝', 'min_level': 1, 'xp_reward': '15-40', 'sort_order': 2},
+    {'id': 'ninja', 'name': 'Ninja Runner', 'description': 'Jump and dodge!',
+     'category': 'Action', 'icon': '🥷', 'min_level': 3, 'xp_reward': '20-60', 'sort_order': 3},
+    {'id': 'rhythm', 'name': 'Rhythm Master', 'description': 'Hit the beat!',
+     'category': 'Music', 'icon': '🎵', 'min_level': 4, 'xp_reward': '15-45', 'sort_order': 4},
+    {'id': 'magic', 'name': 'Magic Quest', 'description': 'Cast spells!',
+     'category': 'Adventure', 'icon': '🔮', 'min_level': 5, 'xp_reward': '25-70', 'sort_order': 5},
+]
+
+
+class CatalogGame(namedtuple('CatalogGame', [
+        'id', 'name', 'description', 'category', 'icon', 'min_level',
+        'xp_reward', 'sort_order'])):
+    """Read-only copy of a GameCatalog row."""
+
+    __slots__ = ()
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'description': self.description,
+            'category': self.category,
+            'icon': self.icon,
+            'min_level': self.min_level,
+            'xp_reward': self.xp_reward
+        }
+
+
+# One user's progress on one catalog game
+GameProgress = namedtuple('GameProgress', [
+    'completed', 'is_favorite', 'times_played', 'personal_best', 'last_played'])
+
+NO_PROGRESS = GameProgress(False, False, 0, 0, None)
+
+
+# ===============================
+# 📚 CATALOG SNAPSHOT
+# ===============================
+
+class GameCatalogSnapshot:
+    """Immutable copy of the active games, in display order."""
+
+    def __init__(self, games, version):
+        self.version = version
+        self.games = tuple(sorted(games, key=lambda game: (game.sort_order, game.min_level, game.name)))
+        self.ids = tuple(game.id for game in self.games)
+        self.by_id = MappingProxyType({game.id: game for game in self.games})
+
+    def __len__(self):
+        return len(self.games)
+
+    def get(self, game_id):
+        return self.by_id.get(game_id)
+
+
+def load_games():
+    """The active games as CatalogGames."""
+    rows = db.session.query(
+        GameCatalog.id, GameCatalog.name, GameCatalog.description, GameCatalog.category,
+        GameCatalog.icon, GameCatalog.min_level, GameCatalog.xp_reward, GameCatalog.sort_order
+    ).filter(GameCatalog.is_active.is_(True)).all()
+    return [CatalogGame(
+        id=row.id,
+        name=row.name,
+        description=row.description or '',
+        category=row.category or '',
+        icon=row.icon or '🎮',
+        min_level=row.min_level if row.min_level is not None else 1,
+        xp_reward=row.xp_reward or '',
+        sort_order=row.sort_order or 0
+    ) for row in rows]
+
+
+# Process-wide catalog used by the routes
+game_catalog = VersionedCatalogCache(
+    GameCatalog, load_games, GameCatalogSnapshot,
+    reload_seconds=int(os.getenv('GAME_CATALOG_RELOAD_SECONDS', 600)))
+
+
+def games():
+    """Shortcut for the current game catalog snapshot."""
+    return game_catalog.snapshot()
+
+
+def seed_defaults():
+    """
+    Insert the DEFAULT_GAMES that aren't in the catalog yet (ON CONFLICT DO
+    NOTHING, so concurrent workers can all call it at startup).
+    Returns: number of games added
+    """
+    existing = set(db.session.scalars(db.select(GameCatalog.id)))
+    missing = [dict(game, is_active=True) for game in DEFAULT_GAMES if game['id'] not in existing]
+    if not missing:
+        return 0
+
+    dialect = postgresql if db.session.get_bind().dialect.name == 'postgresql' else sqlite
+    db.session.execute(
+        dialect.insert(GameCatalog).on_conflict_do_nothing(index_elements=[GameCatalog.id]),
+        missing)
+    db.session.commit()
+    game_catalog.bump_version()
+    return len(missing)
+
+
+# ===============================
+# 👤 PER-USER GAME PROGRESS
+# ===============================
+
+user_games_cache = InProcessLRUBackend(
+    max_entries=int(os.getenv('GAMEHUB_USER_CACHE_SIZE', 2048)))
+USER_GAMES_TTL = int(os.getenv('GAMEHUB_USER_CACHE_SECONDS', 300))
+
+
+def user_games_query(user_id, game_ids):
+    """
+    The user's Game row and completed/favorite flags for each catalog game:
+    game_catalog LEFT JOIN games (ix_games_user_name) LEFT JOIN the two
+    flag rows (user_game_flags primary key).
+    """
+    completed = aliased(UserGameFlag)
+    favorite = aliased(UserGameFlag)
+
+    def flag_join(flag, kind):
+        return and_(flag.user_id == user_id, flag.kind == kind, flag.game_id == GameCatalog.id)
+
+    return (
+        db.select(GameCatalog.id, Game.times_played, Game.personal_best, Game.last_played,
+                  completed.game_id.is_not(None), favorite.game_id.is_not(None))
+        .select_from(GameCatalog)
+        .outerjoin(Game, and_(Game.user_id == user_id, Game.name == GameCatalog.id))
+        .outerjoin(completed, flag_join(completed, 'completed'))
+        .outerjoin(favorite, flag_join(favorite, 'favorite'))
+        .where(GameCatalog.id.in_(game_ids))
+    )
+
+
+def load_user_games(user_id, snapshot):
+    """
+    Progress on every catalog game, from one query.
+    Returns: {game_id: GameProgress}
+    """
+    progress = dict.fromkeys(snapshot.ids, NO_PROGRESS)
+    if not snapshot.ids:
+        return progress
+
+    rows = db.session.execute(user_games_query(int(user_id), snapshot.ids)).all()
+    for game_id, times_played, personal_best, last_played, completed, favorite in rows:
+        # A user can have more than one Game row per game; fold them
+        seen = progress[game_id]
+        last_played = max(filter(None, (seen.last_played, last_played)), default=None)
+        progress[game_id] = GameProgress(
+            completed=bool(completed),
+            is_favorite=bool(favorite),
+            times_played=seen.times_played + (times_played or 0),
+            personal_best=max(seen.personal_best, personal_best or 0),
+            last_played=last_played
+        )
+    return progress
+
+
+def user_games(user_id):
+    """
+    (catalog snapshot, {game_id: GameProgress}) for a user.
+    Cached per user; no DB read on a hit.
+    """
+    snapshot = games()
+    key = str(int(user_id))
+    cached = user_games_cache.get(key)
+    if cached is not None and cached[0] == snapshot.version:
+        return snapshot, cached[1]
+
+    progress = MappingProxyType(load_user_games(user_id, snapshot))
+    user_games_cache.set(key, (snapshot.version, progress), USER_GAMES_TTL)
+    return snapshot, progress
+
+
+def forget_user_games(user_id, session=None):
+    """Drop the user's cached game progress once the current transaction commits."""
+    if user_id is None:
+        return
+    session = session or db.session
+    session.info.setdefault(STALE_KEY, set()).add(int(user_id))
+
+
+# ===============================
+# 🔄 INVALIDATION
+# ===============================
+
+@event.listens_for(GameSession, 'after_insert')
+@event.listens_for(Game, 'after_insert')
+@event.listens_for(Game, 'after_update')
+@event.listens_for(Game, 'after_delete')
+def _user_game_written(mapper, connection, target):
+    forget_user_games(target.user_id, session=object_session(target))
+
+
+@event.listens_for(db.session, 'after_commit')
+def _forget_stale_user_games(session):
+    for user_id in session.info.pop(STALE_KEY, ()):
+        user_games_cache.delete(str(user_id))
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _discard_stale_user_games(session, previous_transaction):
+    session.info.pop(STALE_KEY, None)
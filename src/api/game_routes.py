@@ -4,14 +4,43 @@ Game routes for PixelPlay application - UPDATED with Centralized Stat Tracking
 Handles ALL game-related functionality using the new stat tracking system.
 """
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, timedelta, date
-from api.models import db, User, Game, UserGameStats, GameSession, UserProgress
+from api.models import db, Game, UserGameStats, UserGameFlag, GameSession, UserProgress
+from api.idempotency import idempotent
+from api.identity import current_user
+from api.game_catalog import user_games, NO_PROGRESS
+from api.session_history import (DEFAULT_PAGE_SIZE, page_size, parse_filters, history_page,
+                                 iter_history)
 
 # Create blueprint
 game_bp = Blueprint('games', __name__)
 
+# Most sessions accepted in one /complete-sessions request
+MAX_SESSIONS_PER_BATCH = 50
+
+
+def calculate_session_xp(score, base_xp=10):
+    """XP for a session: base + bonus based on score (max 50 bonus XP)."""
+    bonus_xp = min(score // 10, 50)
+    return base_xp + bonus_xp
+
+
+def session_error(session):
+    """
+    What's wrong with a session from a request body, or None if it's valid.
+    score, duration_minutes and base_xp must be non-negative whole numbers
+    and completed must be true/false (bools aren't accepted as numbers).
+    """
+    for field, default in (('score', 0), ('duration_minutes', 0), ('base_xp', 10)):
+        value = session.get(field, default)
+        if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+            return f'{field} must be a non-negative integer'
+    if not isinstance(session.get('completed', False), bool):
+        return 'completed must be true or false'
+    return None
+
 
 # ===============================
 # 🎮 COMPLETE GAME SESSION (MAIN METHOD)
@@ -19,6 +48,7 @@ game_bp = Blueprint('games', __name__)
 
 @game_bp.route('/api/games/complete-session', methods=['POST'])
 @jwt_required()
+@idempotent
 def complete_game_session():
     """
     🎯 MAIN ENDPOINT: Record a completed game session.
@@ -51,9 +81,15 @@ def complete_game_session():
                 'message': 'game_id is required'
             }), 400
         
+        error = session_error(data)
+        if error:
+            return jsonify({
+                'success': False,
+                'message': error
+            }), 400
+        
         # Calculate XP (base + bonus based on score)
-        bonus_xp = min(score // 10, 50)  # Max 50 bonus XP
-        total_xp = base_xp + bonus_xp
+        total_xp = calculate_session_xp(score, base_xp)
         
         # 🎯 USE THE MAGIC METHOD - Updates EVERYTHING automatically!
         result = GameSession.record_session(
@@ -65,21 +101,14 @@ def complete_game_session():
             completed=completed
         )
         
-        # Get updated user data
-        user = User.query.get(user_id)
-        progress = user.progress
+        # Updated user stats come back from the ingest (no reload needed)
+        user_stats = result.pop('user_stats') or {}
         
         return jsonify({
             'success': True,
             'message': '🎮 Game session recorded!',
             'session': result,
-            'user_stats': {
-                'level': user.level,
-                'xp': user.xp,
-                'coins': user.coins,
-                'streak_days': user.streak_days,
-                'total_games_played': progress.total_games_played if progress else 0
-            }
+            'user_stats': user_stats
         }), 200
         
     except Exception as e:
@@ -91,6 +120,85 @@ def complete_game_session():
         }), 500
 
 
+@game_bp.route('/api/games/complete-sessions', methods=['POST'])
+@jwt_required()
+@idempotent
+def complete_game_sessions():
+    """
+    🎯 BULK ENDPOINT: Record several completed game sessions at once.
+    Useful for short games (memory-match, word-search) that finish many rounds.
+    All sessions are saved together and the stat updates are folded, so the
+    user, progress and game stats rows are each written once.
+    
+    Request Body:
+        - sessions: list of sessions, each with the same fields as
+          /api/games/complete-session (game_id, score, duration_minutes,
+          completed, base_xp)
+    
+    Returns:
+        New session ids, total XP/coins earned + updated user stats
+    """
+    try:
+        user_id = get_jwt_identity()
+        data = request.get_json() or {}
+        raw_sessions = data.get('sessions') if isinstance(data, dict) else data
+        
+        if not raw_sessions or not isinstance(raw_sessions, list):
+            return jsonify({
+                'success': False,
+                'message': 'sessions must be a non-empty list'
+            }), 400
+        
+        if len(raw_sessions) > MAX_SESSIONS_PER_BATCH:
+            return jsonify({
+                'success': False,
+                'message': f'At most {MAX_SESSIONS_PER_BATCH} sessions per request'
+            }), 400
+        
+        sessions = []
+        for index, raw in enumerate(raw_sessions):
+            if not isinstance(raw, dict) or not raw.get('game_id'):
+                return jsonify({
+                    'success': False,
+                    'message': 'game_id is required for every session'
+                }), 400
+            
+            error = session_error(raw)
+            if error:
+                return jsonify({
+                    'success': False,
+                    'message': f'Session {index}: {error}'
+                }), 400
+            
+            score = raw.get('score', 0)
+            sessions.append({
+                'game_id': raw['game_id'],
+                'score': score,
+                'duration_minutes': raw.get('duration_minutes', 0),
+                'completed': raw.get('completed', False),
+                'xp_earned': calculate_session_xp(score, raw.get('base_xp', 10))
+            })
+        
+        # 🎯 Record everything in one transaction
+        result = GameSession.record_sessions(user_id=user_id, sessions=sessions)
+        user_stats = result.pop('user_stats') or {}
+        
+        return jsonify({
+            'success': True,
+            'message': f"🎮 {result['sessions_recorded']} game sessions recorded!",
+            'result': result,
+            'user_stats': user_stats
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Error recording sessions: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'Error: {str(e)}'
+        }), 500
+
+
 # ===============================
 # USER GAME STATS ENDPOINTS
 # ===============================
@@ -108,13 +216,13 @@ def get_user_stats(user_id):
         if str(current_user_id) != str(user_id):
             return jsonify({'error': 'Unauthorized'}), 403
         
-        user = User.query.get(user_id)
+        user = current_user()
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
         # Get or create related stats
         progress = user.progress or UserProgress(user_id=user_id)
-        game_stats = user.game_stats or UserGameStats(user_id=user_id)
+        game_lists = UserGameFlag.game_lists(user_id)
         
         return jsonify({
             'success': True,
@@ -130,10 +238,10 @@ def get_user_stats(user_id):
                 'total_games_played': progress.total_games_played,
                 'workouts_completed': progress.workouts_completed,
                 
-                # From UserGameStats model
-                'unlocked_games': game_stats.unlocked_games or [],
-                'completed_games': game_stats.completed_games or [],
-                'favorite_games': game_stats.favorite_games or []
+                # From the game flags (one query)
+                'unlocked_games': game_lists['unlocked'],
+                'completed_games': game_lists['completed'],
+                'favorite_games': game_lists['favorite']
             }
         }), 200
         
@@ -189,77 +297,29 @@ def toggle_favorite_game(user_id):
 def get_gamehub_games():
     """
     Get all available games for GameHub with user's progress.
+    Games come from the in-memory game catalog; the user's progress is one
+    joined query, cached until their next game write (api/game_catalog.py).
     """
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        
-        # Game catalog (you can move this to database later)
-        available_games = [
-            {
-                'id': 'memory-match',
-                'name': 'Memory Match',
-                'description': 'Test your memory!',
-                'category': 'Puzzle',
-                'icon': '🧠',
-                'min_level': 1,
-                'xp_reward': '10-50'
-            },
-            {
-                'id': 'word-search',
-                'name': 'Word Search',
-                'description': 'Find hidden words',
-                'category': 'Puzzle',
-                'icon': '📝',
-                'min_level': 1,
-                'xp_reward': '15-40'
-            },
-            {
-                'id': 'ninja',
-                'name': 'Ninja Runner',
-                'description': 'Jump and dodge!',
-                'category': 'Action',
-                'icon': '🥷',
-                'min_level': 3,
-                'xp_reward': '20-60'
-            },
-            {
-                'id': 'rhythm',
-                'name': 'Rhythm Master',
-                'description': 'Hit the beat!',
-                'category': 'Music',
-                'icon': '🎵',
-                'min_level': 4,
-                'xp_reward': '15-45'
-            },
-            {
-                'id': 'magic',
-                'name': 'Magic Quest',
-                'description': 'Cast spells!',
-                'category': 'Adventure',
-                'icon': '🔮',
-                'min_level': 5,
-                'xp_reward': '25-70'
-            }
-        ]
-        
-        # Get user's game stats
-        game_stats = user.game_stats or UserGameStats(user_id=user_id)
+        user = current_user()
         
-        # Get user's individual game records
-        user_games = {g.name: g for g in Game.query.filter_by(user_id=user_id).all()}
+        # Catalog snapshot + the user's progress on it (cached per user)
+        catalog, progress = user_games(user_id)
         
         # Enrich games with user data
-        for game in available_games:
-            game_id = game['id']
-            user_game = user_games.get(game_id)
-            
-            game['locked'] = user.level < game['min_level']
-            game['completed'] = game_id in (game_stats.completed_games or [])
-            game['is_favorite'] = game_id in (game_stats.favorite_games or [])
-            game['times_played'] = user_game.times_played if user_game else 0
-            game['personal_best'] = user_game.personal_best if user_game else 0
-            game['last_played'] = user_game.last_played.isoformat() if user_game and user_game.last_played else None
+        available_games = []
+        for game in catalog.games:
+            user_game = progress.get(game.id, NO_PROGRESS)
+            available_games.append(dict(
+                game.to_dict(),
+                locked=user.level < game.min_level,
+                completed=user_game.completed,
+                is_favorite=user_game.is_favorite,
+                times_played=user_game.times_played,
+                personal_best=user_game.personal_best,
+                last_played=user_game.last_played.isoformat() if user_game.last_played else None
+            ))
         
         return jsonify({
             'success': True,
@@ -305,6 +365,7 @@ def get_game_details(game_id):
 
 @game_bp.route('/api/gamehub/games/<game_id>/play', methods=['POST'])
 @jwt_required()
+@idempotent
 def record_game_play(game_id):
     """
     Alternative endpoint for recording game play.
@@ -329,17 +390,17 @@ def record_game_play(game_id):
             completed=completed
         )
         
-        user = User.query.get(user_id)
+        user_stats = result.pop('user_stats') or {}
         
         return jsonify({
             'success': True,
             'message': 'Game session recorded!',
             'result': result,
             'user_stats': {
-                'level': user.level,
-                'xp': user.xp,
-                'coins': user.coins,
-                'streak_days': user.streak_days
+                'level': user_stats.get('level'),
+                'xp': user_stats.get('xp'),
+                'coins': user_stats.get('coins'),
+                'streak_days': user_stats.get('streak_days')
             }
         }), 200
         
@@ -389,6 +450,7 @@ def toggle_game_favorite(game_id):
 
 @game_bp.route('/api/users/<int:user_id>/habits/complete', methods=['POST'])
 @jwt_required()
+@idempotent
 def complete_habit_task(user_id):
     """
     Mark a habit task as complete.
@@ -407,7 +469,7 @@ def complete_habit_task(user_id):
         if not routine_id:
             return jsonify({'error': 'routine_id required'}), 400
         
-        user = User.query.get(user_id)
+        user = current_user()
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
@@ -463,7 +525,7 @@ def get_habit_stats(user_id):
         if current_user_id != user_id:
             return jsonify({'error': 'Unauthorized'}), 403
         
-        user = User.query.get(user_id)
+        user = current_user()
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
@@ -501,7 +563,7 @@ def reset_daily_habits(user_id):
         if current_user_id != user_id:
             return jsonify({'error': 'Unauthorized'}), 403
         
-        user = User.query.get(user_id)
+        user = current_user()
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
@@ -537,10 +599,11 @@ def get_recent_sessions(user_id):
         if str(current_user_id) != str(user_id):
             return jsonify({'error': 'Unauthorized'}), 403
         
-        limit = request.args.get('limit', 10, type=int)
+        # Capped - use /sessions/history to page further back
+        limit = page_size(request.args.get('limit', 10, type=int))
         
         sessions = GameSession.query.filter_by(user_id=user_id)\
-            .order_by(GameSession.played_at.desc())\
+            .order_by(GameSession.played_at.desc(), GameSession.id.desc())\
             .limit(limit)\
             .all()
         
@@ -551,4 +614,85 @@ def get_recent_sessions(user_id):
         
     except Exception as e:
         print(f"❌ Error fetching sessions: {e}")
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+
+@game_bp.route('/api/users/<int:user_id>/sessions/history', methods=['GET'])
+@jwt_required()
+def get_session_history(user_id):
+    """
+    Page through a user's game sessions, newest first.
+
+    Query params:
+        - cursor: next_cursor from the previous page (omit for the first page)
+        - limit: page size (default 20, max 100)
+        - game_id, from, to (ISO date/datetime), completed (true/false): filters
+    """
+    try:
+        current_user_id = get_jwt_identity()
+        
+        if str(current_user_id) != str(user_id):
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        try:
+            filters = parse_filters(request.args)
+            sessions, next_cursor = history_page(
+                user_id, filters,
+                cursor=request.args.get('cursor'),
+                limit=request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+            )
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        
+        return jsonify({
+            'success': True,
+            'sessions': sessions,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        }), 200
+        
+    except Exception as e:
+        print(f"❌ Error fetching session history: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+def stream_session_history(user_id, filters):
+    """Stream {"sessions": [...]} one history page at a time."""
+    dumps = current_app.json.dumps
+    first = True
+    yield '{"success": true, "sessions": ['
+    for sessions in iter_history(user_id, filters):
+        for game_session in sessions:
+            yield ('' if first else ', ') + dumps(game_session)
+            first = False
+    yield ']}'
+
+
+@game_bp.route('/api/users/<int:user_id>/sessions/history/export', methods=['GET'])
+@jwt_required()
+def export_session_history(user_id):
+    """
+    Download a user's whole (filtered) session history.
+    Streamed page by page, so memory use doesn't grow with the history.
+    Takes the same filters as /sessions/history.
+    """
+    try:
+        current_user_id = get_jwt_identity()
+        
+        if str(current_user_id) != str(user_id):
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        try:
+            filters = parse_filters(request.args)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        
+        return Response(
+            stream_with_context(stream_session_history(user_id, filters)),
+            status=200,
+            mimetype='application/json'
+        )
+        
+    except Exception as e:
+        print(f"❌ Error exporting session history: {e}")
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,175 @@
+# src/api/idempotency.py
+"""
+Idempotency-Key support for PixelPlay's reward-granting POST endpoints.
+Mobile clients retry requests when the network drops. If a retry carries the
+same Idempotency-Key header, it gets the stored response of the first
+attempt replayed (one SELECT) instead of running the whole transaction again.
+
+- Keys are scoped per user and expire after IDEMPOTENCY_KEY_TTL_HOURS
+  (expired rows are purged as new keys come in, or with
+  `flask purge-idempotency-keys`)
+- The first request claims the key before running, so a retry that arrives
+  while it is still in progress gets 409 instead of running in parallel
+- Reusing a key for a different request (method/path/body) gets 422
+- 5xx responses aren't stored, so the client can retry them with the same key
+- Requests without the header behave exactly as before
+"""
+
+import hashlib
+import itertools
+import os
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import request, jsonify, make_response, current_app
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import select, update, delete
+from sqlalchemy.dialects import postgresql, sqlite
+from api.models import db, IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+IDEMPOTENCY_KEY_TTL = timedelta(hours=int(os.getenv('IDEMPOTENCY_KEY_TTL_HOURS', 24)))
+
+# Expired keys are purged once every this many new keys (per worker)
+PURGE_EVERY = 500
+_claims = itertools.count(1)
+
+
+# ===============================
+# 🔧 HELPERS
+# ===============================
+
+def _fingerprint():
+    """sha256 of the request method, path and body."""
+    digest = hashlib.sha256()
+    digest.update(f'{request.method} {request.path}\n'.encode())
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def _error(message, status):
+    return jsonify({'success': False, 'message': message}), status
+
+
+def _lookup(user_id, key):
+    return db.session.execute(
+        select(IdempotencyKey.fingerprint, IdempotencyKey.status_code,
+               IdempotencyKey.response_body, IdempotencyKey.content_type,
+               IdempotencyKey.expires_at)
+        .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+    ).first()
+
+
+def _release(user_id, key):
+    """Forget a key (expired, or its request failed) so it can be used again."""
+    db.session.execute(delete(IdempotencyKey).where(
+        IdempotencyKey.user_id == user_id, IdempotencyKey.key == key))
+    db.session.commit()
+
+
+def _claim(user_id, key, fingerprint, now):
+    """
+    INSERT the key as in progress (ON CONFLICT DO NOTHING) and commit it, so
+    concurrent retries see it. Returns False if another request got it first.
+    """
+    dialect = postgresql if db.session.get_bind().dialect.name == 'postgresql' else sqlite
+    result = db.session.execute(dialect.insert(IdempotencyKey).values(
+        user_id=user_id, key=key, fingerprint=fingerprint,
+        created_at=now, expires_at=now + IDEMPOTENCY_KEY_TTL
+    ).on_conflict_do_nothing(index_elements=[IdempotencyKey.user_id, IdempotencyKey.key]))
+    db.session.commit()
+
+    if next(_claims) % PURGE_EVERY == 0:
+        purge_expired(now)
+    return result.rowcount == 1
+
+
+def _store(user_id, key, response):
+    db.session.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+        .values(status_code=response.status_code,
+                response_body=response.get_data(),
+                content_type=response.content_type)
+    )
+    db.session.commit()
+
+
+def _replay(row):
+    response = current_app.response_class(
+        row.response_body, status=row.status_code, content_type=row.content_type)
+    response.headers[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def purge_expired(now=None):
+    """
+    Delete expired keys.
+    Returns: number of rows deleted
+    """
+    result = db.session.execute(delete(IdempotencyKey).where(
+        IdempotencyKey.expires_at <= (now or datetime.utcnow())))
+    db.session.commit()
+    return result.rowcount
+
+
+# ===============================
+# 🔁 DECORATOR
+# ===============================
+
+def idempotent(view):
+    """
+    Make a POST endpoint replay its response for repeated Idempotency-Keys.
+    Goes below @jwt_required(), since keys are scoped to the current user.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return view(*args, **kwargs)
+
+        key = key.strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return _error(f'{HEADER} must be 1-{MAX_KEY_LENGTH} characters', 400)
+
+        user_id = int(get_jwt_identity())
+        fingerprint = _fingerprint()
+        now = datetime.utcnow()
+
+        row = _lookup(user_id, key)
+        if row is not None and row.expires_at <= now:
+            _release(user_id, key)
+            row = None
+        if row is None and not _claim(user_id, key, fingerprint, now):
+            # Another request claimed the key between our lookup and insert
+            row = _lookup(user_id, key)
+            if row is None:
+                return _error('A request with this Idempotency-Key is still in progress', 409)
+
+        if row is not None:
+            if row.fingerprint != fingerprint:
+                return _error(f'{HEADER} was already used for a different request', 422)
+            if row.status_code is None:
+                return _error('A request with this Idempotency-Key is still in progress', 409)
+            print(f"🔁 Replaying stored response for {request.path}")
+            return _replay(row)
+
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            db.session.rollback()
+            _release(user_id, key)
+            raise
+
+        # Whatever the view staged without committing (e.g. before returning
+        # a 4xx) is discarded, as it would be without this decorator; only
+        # the key row gets committed below
+        db.session.rollback()
+        if response.status_code >= 500:
+            _release(user_id, key)
+        else:
+            _store(user_id, key, response)
+        return response
+
+    return wrapper
@@ -0,0 +1,111 @@
+# src/api/identity.py
+"""
+Who is calling? Identity resolution for PixelPlay's authenticated routes.
+
+- current_user(): the caller's User with progress and game_stats eager
+  loaded in one query, memoized on flask.g, so a route that touches
+  user.progress / user.game_stats makes one round trip instead of three
+  (and helpers that call User.query.get for the same user hit the session's
+  identity map instead of the database)
+- identity_for(): the caller's immutable identity fields (id, email,
+  username, is_active) from a short-TTL per-worker cache. Registered as the
+  JWT user_lookup_loader, so every authenticated request checks the account
+  still exists without a query on a cache hit. Changes to those fields (or
+  deleting the user) evict the entry after commit
+"""
+
+import os
+from collections import namedtuple
+from flask import g
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event, select
+from sqlalchemy.orm import joinedload, object_session
+from api.models import db, User
+from api.response_cache import InProcessLRUBackend
+
+Identity = namedtuple('Identity', ['id', 'email', 'username', 'is_active'])
+
+IDENTITY_FIELDS = ('email', 'username', 'is_active')
+
+# User ids whose cached identity is stale once the transaction commits
+STALE_KEY = 'identity_stale'
+
+identity_cache = InProcessLRUBackend(max_entries=int(os.getenv('IDENTITY_CACHE_SIZE', 4096)))
+IDENTITY_CACHE_TTL = int(os.getenv('IDENTITY_CACHE_SECONDS', 60))
+
+
+def _remember(user):
+    identity = Identity(user.id, user.email, user.username, bool(user.is_active))
+    identity_cache.set(str(user.id), identity, IDENTITY_CACHE_TTL)
+    return identity
+
+
+def load_user(user_id):
+    """User + UserProgress + UserGameStats in one query (None if not found)."""
+    return db.session.execute(
+        select(User)
+        .options(joinedload(User.progress), joinedload(User.game_stats))
+        .where(User.id == int(user_id))
+    ).unique().scalar_one_or_none()
+
+
+def current_user():
+    """
+    The authenticated caller's User (None without a valid JWT or if the
+    account is gone). Loaded once per request.
+    """
+    if '_current_user' not in g:
+        user_id = get_jwt_identity()
+        user = load_user(user_id) if user_id is not None else None
+        if user is not None:
+            _remember(user)
+        g._current_user = user
+    return g._current_user
+
+
+def identity_for(user_id):
+    """Cached Identity for a user id, or None if there's no such user."""
+    identity = identity_cache.get(str(user_id))
+    if identity is not None:
+        return identity
+
+    row = db.session.execute(
+        select(User.id, User.email, User.username, User.is_active).where(User.id == int(user_id))
+    ).first()
+    if row is None:
+        return None
+    identity = Identity(row.id, row.email, row.username, bool(row.is_active))
+    identity_cache.set(str(row.id), identity, IDENTITY_CACHE_TTL)
+    return identity
+
+
+# ===============================
+# 🔄 INVALIDATION
+# ===============================
+
+def _stale(user):
+    session = object_session(user) or db.session
+    session.info.setdefault(STALE_KEY, set()).add(user.id)
+
+
+@event.listens_for(User, 'after_update')
+def _user_updated(mapper, connection, user):
+    state = db.inspect(user)
+    if any(state.attrs[field].history.has_changes() for field in IDENTITY_FIELDS):
+        _stale(user)
+
+
+@event.listens_for(User, 'after_delete')
+def _user_deleted(mapper, connection, user):
+    _stale(user)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _forget_stale(session):
+    for user_id in session.info.pop(STALE_KEY, ()):
+        identity_cache.delete(str(user_id))
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _discard_stale(session, previous_transaction):
+    session.info.pop(STALE_KEY, None)
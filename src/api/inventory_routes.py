@@ -8,7 +8,12 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
 from datetime import datetime
 import json
-from api.models import db, User, UserProgress, UnlockedItem, ItemCatalog, UserAchievement
+from api.models import db, UserProgress, UnlockedItem, ItemCatalog
+from api.ownership import owned_shop_item_ids, owns_shop_item
+from api.coins import spend, credit
+from api.achievements import resolve, load_progress, is_unlocked, achievement_list
+from api.idempotency import idempotent
+from api.identity import current_user
 
 # Create Blueprint
 inventory_bp = Blueprint('inventory', __name__)
@@ -52,10 +57,10 @@ def get_inventory():
         
         items = DEFAULT_ITEMS.copy()
         
-        # If user is logged in, mark owned items
-        if user_id:
-            owned_items = UnlockedItem.query.filter_by(user_id=user_id).all()
-            owned_ids = {item.item_catalog_id for item in owned_items if hasattr(item, 'item_catalog_id')}
+        # If user is logged in, mark owned items (from their ownership bitmap)
+        user = current_user() if user_id else None
+        if user:
+            owned_ids = owned_shop_item_ids(user)
             
             for item in items:
                 item['owned'] = item['id'] in owned_ids
@@ -91,12 +96,11 @@ def get_my_items():
     """Get all items owned by the current user."""
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = current_user()
         progress = user.progress or UserProgress(user_id=user_id)
         
-        # Get owned items
-        owned_items = UnlockedItem.query.filter_by(user_id=user_id).all()
-        owned_ids = {item.item_catalog_id for item in owned_items}
+        # Get owned items (from the ownership bitmap)
+        owned_ids = owned_shop_item_ids(user)
         
         # Filter for owned items
         my_items = [item for item in DEFAULT_ITEMS if item['id'] in owned_ids]
@@ -122,10 +126,11 @@ def get_my_items():
 
 @inventory_bp.route('/inventory/purchase/<int:item_id>', methods=['POST'])
 @jwt_required()
+@idempotent
 def purchase_item(item_id):
     """
     Purchase an item from the shop.
-    Uses User.coins and User.spend_coins() from the centralized system.
+    Coins are taken through the coin ledger (api.coins.spend), once per item.
     """
     try:
         user_id = get_jwt_identity()
@@ -139,7 +144,7 @@ def purchase_item(item_id):
             }), 404
         
         # Get user and progress
-        user = User.query.get(user_id)
+        user = current_user()
         progress = user.progress or UserProgress(user_id=user_id)
         if not progress.user_id:
             db.session.add(progress)
@@ -151,31 +156,27 @@ def purchase_item(item_id):
                 'message': f"Level {item['levelRequired']} required"
             }), 403
         
-        # Check if user has enough coins (using User.coins, not progress.total_points)
-        if not user.can_afford(item['price']):
-            return jsonify({
-                'success': False,
-                'message': f"Not enough coins. Need {item['price']}, have {user.coins}"
-            }), 403
-        
         # Check if already owned
-        existing = UnlockedItem.query.filter_by(
-            user_id=user_id,
-            item_catalog_id=item_id
-        ).first()
-        
-        if existing:
+        if owns_shop_item(user, item_id):
             return jsonify({
                 'success': False,
                 'message': 'Item already owned'
             }), 400
         
-        # 💰 Purchase the item (using centralized coin system)
-        if not user.spend_coins(item['price']):
+        # 💰 Purchase the item (atomic coin ledger, once per item)
+        payment = spend(user, item['price'], source='shop', idempotency_key=f'shop:{item_id}')
+        if not payment.ok:
+            return jsonify({
+                'success': False,
+                'message': f"Not enough coins. Need {item['price']}, have {payment.balance}"
+            }), 403
+        if payment.replayed:
+            # A concurrent request already bought it
+            db.session.rollback()
             return jsonify({
                 'success': False,
-                'message': 'Transaction failed'
-            }), 500
+                'message': 'Item already owned'
+            }), 400
         
         # Track unlocked item
         progress.unlock_item()
@@ -265,73 +266,10 @@ def get_achievements():
         
         if user_id:
             # Get user's real achievements
-            user = User.query.get(user_id)
-            progress = user.progress or UserProgress(user_id=user_id)
-            achievements = UserAchievement.query.filter_by(user_id=user_id).all()
+            user = current_user()
             
-            # Also calculate potential achievements based on stats
-            achievement_data = [
-                {
-                    'id': 'first_workout',
-                    'name': 'First Steps',
-                    'description': 'Complete your first workout',
-                    'icon': '🏃',
-                    'progress': min(progress.workouts_completed, 1),
-                    'target': 1,
-                    'unlocked': progress.workouts_completed >= 1,
-                    'reward': 50
-                },
-                {
-                    'id': 'week_warrior',
-                    'name': 'Week Warrior',
-                    'description': 'Maintain a 7-day streak',
-                    'icon': '🔥',
-                    'progress': min(user.streak_days, 7),
-                    'target': 7,
-                    'unlocked': user.streak_days >= 7,
-                    'reward': 100
-                },
-                {
-                    'id': 'century_club',
-                    'name': 'Century Club',
-                    'description': 'Complete 100 workouts',
-                    'icon': '💯',
-                    'progress': min(progress.workouts_completed, 100),
-                    'target': 100,
-                    'unlocked': progress.workouts_completed >= 100,
-                    'reward': 500
-                },
-                {
-                    'id': 'avatar_creator',
-                    'name': 'Avatar Creator',
-                    'description': 'Create 5 unique avatars',
-                    'icon': '🎨',
-                    'progress': min(progress.avatars_created, 5),
-                    'target': 5,
-                    'unlocked': progress.avatars_created >= 5,
-                    'reward': 150
-                },
-                {
-                    'id': 'legend_status',
-                    'name': 'Legend Status',
-                    'description': 'Reach level 10',
-                    'icon': '⭐',
-                    'progress': min(user.level, 10),
-                    'target': 10,
-                    'unlocked': user.level >= 10,
-                    'reward': 1000
-                },
-                {
-                    'id': 'fashionista',
-                    'name': 'Fashionista',
-                    'description': 'Unlock 10 items',
-                    'icon': '👗',
-                    'progress': min(progress.items_unlocked, 10),
-                    'target': 10,
-                    'unlocked': progress.items_unlocked >= 10,
-                    'reward': 200
-                }
-            ]
+            # Stored progress (kept up to date by stat events)
+            achievement_data = achievement_list(load_progress(user))
             
             return jsonify({
                 'success': True,
@@ -368,71 +306,53 @@ def get_achievements():
 
 @inventory_bp.route('/achievements/claim/<achievement_id>', methods=['POST'])
 @jwt_required()
+@idempotent
 def claim_achievement(achievement_id):
     """
     Claim reward for a completed achievement.
-    Awards coins using the centralized User.add_coins() method.
+    Definitions come from the achievement registry (api/achievements.py);
+    coins are awarded through the coin ledger.
     """
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        progress = user.progress or UserProgress(user_id=user_id)
+        user = current_user()
         
-        # Achievement definitions with rewards
-        achievements = {
-            'first_workout': {'name': 'First Steps', 'reward': 50, 'check': lambda: progress.workouts_completed >= 1},
-            'week_warrior': {'name': 'Week Warrior', 'reward': 100, 'check': lambda: user.streak_days >= 7},
-            'century_club': {'name': 'Century Club', 'reward': 500, 'check': lambda: progress.workouts_completed >= 100},
-            'avatar_creator': {'name': 'Avatar Creator', 'reward': 150, 'check': lambda: progress.avatars_created >= 5},
-            'legend_status': {'name': 'Legend Status', 'reward': 1000, 'check': lambda: user.level >= 10},
-            'fashionista': {'name': 'Fashionista', 'reward': 200, 'check': lambda: progress.items_unlocked >= 10}
-        }
-        
-        achievement = achievements.get(achievement_id)
+        achievement = resolve(achievement_id)
         if not achievement:
             return jsonify({
                 'success': False,
                 'message': 'Achievement not found'
             }), 404
         
+        existing = load_progress(user, seed=True).get(achievement.id)
+        
         # Check if achievement is completed
-        if not achievement['check']():
+        if not is_unlocked(achievement, existing):
             return jsonify({
                 'success': False,
                 'message': 'Achievement not yet completed'
             }), 400
         
         # Check if already claimed
-        existing = UserAchievement.query.filter_by(
-            user_id=user_id,
-            achievement_name=achievement_id
-        ).first()
+        if existing.is_completed:
+            return jsonify({
+                'success': False,
+                'message': 'Achievement already claimed'
+            }), 400
         
-        if existing and existing.is_completed:
+        # 💰 Award coins using centralized system (once per achievement)
+        reward_coins = achievement.reward
+        reward = credit(user, reward_coins, source='achievement',
+                        idempotency_key=f'achievement:{achievement.id}')
+        if reward.replayed:
+            db.session.rollback()
             return jsonify({
                 'success': False,
                 'message': 'Achievement already claimed'
             }), 400
         
-        # 💰 Award coins using centralized system
-        reward_coins = achievement['reward']
-        user.add_coins(reward_coins, source='achievement')
-        
-        # Create or update achievement record
-        if not existing:
-            new_achievement = UserAchievement(
-                user_id=user_id,
-                achievement_name=achievement_id,
-                achievement_description=achievement['name'],
-                progress=100,
-                target=100,
-                is_completed=True,
-                completed_date=datetime.utcnow()
-            )
-            db.session.add(new_achievement)
-        else:
-            existing.is_completed = True
-            existing.completed_date = datetime.utcnow()
+        # Mark the reward as claimed
+        existing.is_completed = True
+        existing.completed_date = datetime.utcnow()
         
         db.session.commit()
         
@@ -462,7 +382,7 @@ def get_inventory_stats():
     """Get inventory statistics for the user."""
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = current_user()
         progress = user.progress or UserProgress(user_id=user_id)
         
         # Count owned items
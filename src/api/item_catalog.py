@@ -0,0 +1,129 @@
+# src/api/item_catalog.py
+"""
+In-memory item catalog for PixelPlay.
+ItemCatalog is small, read-mostly master data, so each worker keeps an
+immutable snapshot of it instead of querying it on every request.
+
+- Loaded at startup, indexed by id, by (style, category, value), by
+  unlock level and by rarity
+- ItemCatalog inserts/updates/deletes bump a catalog version after they
+  commit; the next read sees the new version and swaps in a fresh snapshot
+- Also reloaded every ITEM_CATALOG_RELOAD_SECONDS so each gunicorn worker
+  picks up catalog edits made by the other workers
+  (versioning lives in api/catalog_cache.py, shared with the game catalog)
+"""
+
+import os
+from bisect import bisect_right
+from collections import namedtuple
+from types import MappingProxyType
+from api.models import db, ItemCatalog
+from api.catalog_cache import VersionedCatalogCache
+
+
+class CatalogItem(namedtuple('CatalogItem', [
+        'id', 'avatar_style', 'item_category', 'item_value', 'item_name',
+        'unlock_level', 'unlock_cost', 'is_default', 'rarity'])):
+    """Read-only copy of an ItemCatalog row."""
+
+    __slots__ = ()
+
+    @property
+    def key(self):
+        return (self.avatar_style, self.item_category, self.item_value)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'style': self.avatar_style,
+            'category': self.item_category,
+            'value': self.item_value,
+            'name': self.item_name,
+            'unlock_level': self.unlock_level,
+            'unlock_cost': self.unlock_cost,
+            'is_default': self.is_default,
+            'rarity': self.rarity
+        }
+
+
+def _display_order(item):
+    """Catalog order: unlock level, then rarity, then name."""
+    return (item.unlock_level, item.rarity or '', item.item_name)
+
+
+# ===============================
+# 📚 CATALOG SNAPSHOT
+# ===============================
+
+class CatalogSnapshot:
+    """Immutable, fully indexed copy of the item catalog."""
+
+    def __init__(self, items, version):
+        self.version = version
+        self.items = tuple(sorted(items, key=_display_order))
+        self.by_id = MappingProxyType({item.id: item for item in self.items})
+        self.by_key = MappingProxyType({item.key: item for item in self.items})
+        self.defaults = tuple(item for item in self.items if item.is_default)
+
+        by_rarity, by_style = {}, {}
+        for item in self.items:
+            by_rarity.setdefault(item.rarity, []).append(item)
+            by_style.setdefault(item.avatar_style, []).append(item)
+        self.by_rarity = MappingProxyType({r: tuple(i) for r, i in by_rarity.items()})
+
+        # Unlock level index: items in display order (already sorted by
+        # level first) plus their levels, for bisecting level ranges
+        self._by_style = {style: tuple(i) for style, i in by_style.items()}
+        self._levels = {None: [item.unlock_level for item in self.items]}
+        for style, style_items in self._by_style.items():
+            self._levels[style] = [item.unlock_level for item in style_items]
+
+    def __len__(self):
+        return len(self.items)
+
+    def get(self, item_id):
+        return self.by_id.get(item_id)
+
+    def find(self, style, category, value):
+        return self.by_key.get((style, category, value))
+
+    def up_to_level(self, level, style=None):
+        """Items unlockable at `level` (optionally one style), in catalog order."""
+        items = self.items if style is None else self._by_style.get(style, ())
+        levels = self._levels.get(style, [])
+        return items[:bisect_right(levels, level)]
+
+    def with_rarity(self, rarity):
+        return self.by_rarity.get(rarity, ())
+
+
+def load_items():
+    """The whole item catalog as CatalogItems."""
+    rows = db.session.query(
+        ItemCatalog.id, ItemCatalog.avatar_style, ItemCatalog.item_category,
+        ItemCatalog.item_value, ItemCatalog.item_name, ItemCatalog.unlock_level,
+        ItemCatalog.unlock_cost, ItemCatalog.is_default, ItemCatalog.rarity
+    ).all()
+    return [CatalogItem(
+        id=row.id,
+        avatar_style=row.avatar_style,
+        item_category=row.item_category,
+        item_value=row.item_value,
+        item_name=row.item_name,
+        unlock_level=row.unlock_level if row.unlock_level is not None else 1,
+        unlock_cost=row.unlock_cost or 0,
+        is_default=bool(row.is_default),
+        rarity=row.rarity
+    ) for row in rows]
+
+
+# Process-wide catalog used by the routes
+item_catalog = VersionedCatalogCache(
+    ItemCatalog, load_items, CatalogSnapshot,
+    reload_seconds=int(os.getenv('ITEM_CATALOG_RELOAD_SECONDS', 600)))
+
+
+def catalog():
+    """Shortcut for the current catalog snapshot."""
+    return item_catalog.snapshot()
+
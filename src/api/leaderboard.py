@@ -0,0 +1,419 @@
+# src/api/leaderboard.py
+"""
+Leaderboard index for PixelPlay.
+Keeps one sorted structure per leaderboard type (level, xp, streak, games) in
+memory, so top-N and "my rank" never sort the users table per request.
+
+- Built from the database on startup (one users + user_progress query)
+- Kept up to date by User.add_xp, User.update_streak,
+  UserProgress.record_game_played and the session ingest engine, which stage
+  changes on the DB session; they are applied only after the commit succeeds.
+  Renamed and deleted users are staged the same way by mapper events
+- Rebuilt every LEADERBOARD_REBUILD_SECONDS so each gunicorn worker also
+  picks up writes made by the other workers
+- Serialized /api/leaderboard responses are cached in leaderboard_cache and
+  invalidated when a change reaches the top CACHE_WINDOW entries of a board
+  (the most a request can list); changes further down don't show up in any
+  cached response
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left, insort
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+from api.models import db, User, UserProgress
+from api.response_cache import ResponseCache, create_backend
+
+# Supported leaderboard types (?type= on /api/leaderboard)
+LEADERBOARD_TYPES = ('level', 'xp', 'streak', 'games')
+
+# Pending changes for the current transaction live in session.info under this key
+PENDING_KEY = 'leaderboard_pending'
+
+# Most entries a /api/leaderboard response lists (its ?limit= cap)
+CACHE_WINDOW = 100
+
+
+# ===============================
+# 🌳 ORDER-STATISTIC SORTED LIST
+# ===============================
+
+class _SortedKeys:
+    """
+    Sorted list of unique keys with O(log n) insert, remove, rank and
+    rank-to-key lookup.
+
+    Keys are kept in small sorted buckets; a Fenwick tree over the bucket
+    sizes turns "how many keys come before this bucket" into O(log n).
+    """
+
+    BUCKET_SIZE = 512
+
+    def __init__(self, keys=()):
+        keys = sorted(keys)
+        size = self.BUCKET_SIZE
+        self._buckets = [keys[i:i + size] for i in range(0, len(keys), size)]
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        self._len = len(keys)
+        self._rebuild_tree()
+
+    def __len__(self):
+        return self._len
+
+    # Fenwick tree over bucket sizes
+    def _rebuild_tree(self):
+        self._tree = [0] * (len(self._buckets) + 1)
+        for i, bucket in enumerate(self._buckets):
+            self._tree_add(i, len(bucket))
+
+    def _tree_add(self, i, delta):
+        i += 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _tree_prefix(self, i):
+        """Number of keys in buckets [0, i)."""
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _tree_find(self, position):
+        """(bucket index, offset inside bucket) of the key at position."""
+        i, step = 0, 1
+        while step * 2 < len(self._tree):
+            step *= 2
+        while step:
+            if i + step < len(self._tree) and self._tree[i + step] <= position:
+                i += step
+                position -= self._tree[i]
+            step //= 2
+        return i, position
+
+    def add(self, key):
+        if not self._buckets:
+            self._buckets.append([key])
+            self._maxes.append(key)
+            self._rebuild_tree()
+            self._len = 1
+            return
+
+        i = min(bisect_left(self._maxes, key), len(self._buckets) - 1)
+        bucket = self._buckets[i]
+        insort(bucket, key)
+        self._maxes[i] = bucket[-1]
+        self._len += 1
+
+        if len(bucket) > 2 * self.BUCKET_SIZE:
+            half = len(bucket) // 2
+            self._buckets[i:i + 1] = [bucket[:half], bucket[half:]]
+            self._maxes[i:i + 1] = [bucket[half - 1], bucket[-1]]
+            self._rebuild_tree()
+        else:
+            self._tree_add(i, 1)
+
+    def remove(self, key):
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return False
+        bucket = self._buckets[i]
+        j = bisect_left(bucket, key)
+        if j == len(bucket) or bucket[j] != key:
+            return False
+
+        del bucket[j]
+        self._len -= 1
+        if bucket:
+            self._maxes[i] = bucket[-1]
+            self._tree_add(i, -1)
+        else:
+            del self._buckets[i]
+            del self._maxes[i]
+            self._rebuild_tree()
+        return True
+
+    def index(self, key):
+        """0-based position of key, or None if it isn't in the list."""
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return None
+        bucket = self._buckets[i]
+        j = bisect_left(bucket, key)
+        if j == len(bucket) or bucket[j] != key:
+            return None
+        return self._tree_prefix(i) + j
+
+    def slice(self, start, stop):
+        """Keys at positions [start, stop)."""
+        start, stop = max(start, 0), min(stop, self._len)
+        if start >= stop:
+            return []
+        i, j = self._tree_find(start)
+        keys = []
+        while len(keys) < stop - start and i < len(self._buckets):
+            keys.extend(self._buckets[i][j:j + (stop - start - len(keys))])
+            i, j = i + 1, 0
+        return keys
+
+
+# ===============================
+# 🏆 LEADERBOARD INDEX
+# ===============================
+
+def _sort_key(kind, entry):
+    """Sort key for an entry (best first, ties broken by user id)."""
+    if kind == 'level':
+        return (-entry['level'], -entry['xp'], entry['user_id'])
+    if kind == 'xp':
+        return (-entry['xp'], entry['user_id'])
+    if kind == 'streak':
+        return (-entry['streak_days'], entry['user_id'])
+    return (-entry['total_games_played'], entry['user_id'])
+
+
+def _is_ranked(kind, entry):
+    """The games board only lists users with a UserProgress row."""
+    return kind != 'games' or entry['total_games_played'] is not None
+
+
+class LeaderboardIndex:
+    """In-memory leaderboards for all users, one sorted list per type."""
+
+    def __init__(self, rebuild_seconds=300, cache=None, cache_window=CACHE_WINDOW):
+        self.rebuild_seconds = rebuild_seconds
+        self.cache = cache
+        self.cache_window = cache_window
+        self.built_at = None
+        self._lock = threading.RLock()
+        self._entries = {}
+        self._boards = {kind: _SortedKeys() for kind in LEADERBOARD_TYPES}
+
+    def rebuild(self):
+        """Reload every user's leaderboard fields from the database."""
+        rows = db.session.query(
+            User.id, User.username, User.level, User.xp, User.streak_days,
+            UserProgress.total_games_played, UserProgress.workouts_completed
+        ).outerjoin(UserProgress, UserProgress.user_id == User.id).all()
+
+        entries = {
+            row.id: {
+                'user_id': row.id,
+                'username': row.username,
+                'level': row.level,
+                'xp': row.xp,
+                'streak_days': row.streak_days,
+                'total_games_played': row.total_games_played,
+                'workouts_completed': row.workouts_completed or 0
+            } for row in rows
+        }
+        boards = {
+            kind: _SortedKeys(
+                _sort_key(kind, entry) for entry in entries.values()
+                if _is_ranked(kind, entry))
+            for kind in LEADERBOARD_TYPES
+        }
+
+        with self._lock:
+            self._entries = entries
+            self._boards = boards
+            self.built_at = time.monotonic()
+        self._invalidate_cache()
+
+    def _invalidate_cache(self):
+        if self.cache is not None:
+            self.cache.invalidate()
+
+    def _in_window(self, board, key):
+        """Is key among the top cache_window entries of board?"""
+        if key is None:
+            return False
+        position = board.index(key)
+        return position is not None and position < self.cache_window
+
+    def ensure_fresh(self):
+        """Rebuild if never built or older than rebuild_seconds."""
+        if self.built_at is None or time.monotonic() - self.built_at > self.rebuild_seconds:
+            self.rebuild()
+
+    def apply(self, changes):
+        """
+        Apply committed changes: {user_id: {field: new_value, ...}}, or
+        {user_id: None} for a deleted user.
+        Only the boards whose sort key changed are touched, and cached
+        responses are only dropped if the user is (or was) in a board's top
+        cache_window entries.
+        """
+        window_changed = False
+        with self._lock:
+            for user_id, fields in changes.items():
+                old = self._entries.get(user_id)
+                if fields is None:
+                    entry = None
+                else:
+                    entry = dict(old) if old else {
+                        'user_id': user_id,
+                        'username': None,
+                        'level': 1,
+                        'xp': 0,
+                        'streak_days': 0,
+                        'total_games_played': None,
+                        'workouts_completed': 0
+                    }
+                    entry.update(fields)
+                if entry == old:
+                    continue
+
+                for kind, board in self._boards.items():
+                    old_key = _sort_key(kind, old) if old and _is_ranked(kind, old) else None
+                    new_key = _sort_key(kind, entry) if entry and _is_ranked(kind, entry) else None
+                    window_changed = window_changed or self._in_window(board, old_key)
+                    if old_key != new_key:
+                        if old_key is not None:
+                            board.remove(old_key)
+                        if new_key is not None:
+                            board.add(new_key)
+                    window_changed = window_changed or self._in_window(board, new_key)
+
+                if entry is None:
+                    self._entries.pop(user_id, None)
+                else:
+                    self._entries[user_id] = entry
+
+        if window_changed:
+            self._invalidate_cache()
+
+    def top(self, kind, limit):
+        """Top `limit` entries for a leaderboard type, with ranks."""
+        with self._lock:
+            keys = self._boards[kind].slice(0, limit)
+            return [dict(self._entries[key[-1]], rank=rank)
+                    for rank, key in enumerate(keys, start=1)]
+
+    def rank_of(self, kind, user_id):
+        """1-based rank of a user, or None if they aren't on that board."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if not entry or not _is_ranked(kind, entry):
+                return None
+            position = self._boards[kind].index(_sort_key(kind, entry))
+            return position + 1 if position is not None else None
+
+    def around(self, kind, user_id, k):
+        """
+        A user's rank plus the k users directly above and below them.
+        Returns: (rank or None, [entries with ranks])
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if not entry or not _is_ranked(kind, entry):
+                return None, []
+            position = self._boards[kind].index(_sort_key(kind, entry))
+            if position is None:
+                return None, []
+
+            start = max(position - k, 0)
+            keys = self._boards[kind].slice(start, position + k + 1)
+            return position + 1, [dict(self._entries[key[-1]], rank=rank)
+                                  for rank, key in enumerate(keys, start=start + 1)]
+
+    def size(self, kind):
+        """Number of users on a leaderboard."""
+        with self._lock:
+            return len(self._boards[kind])
+
+
+# Serialized /api/leaderboard responses, keyed by (type, limit)
+leaderboard_cache = ResponseCache(
+    'leaderboard',
+    ttl=int(os.getenv('LEADERBOARD_CACHE_TTL', 30)),
+    backend=create_backend())
+
+# Process-wide index used by the routes
+leaderboard = LeaderboardIndex(
+    rebuild_seconds=int(os.getenv('LEADERBOARD_REBUILD_SECONDS', 300)),
+    cache=leaderboard_cache)
+
+
+# ===============================
+# 🔄 KEEPING THE INDEX IN SYNC
+# ===============================
+
+def stage_update(user_id, session=None, **fields):
+    """
+    Record a leaderboard change for the current transaction.
+    Applied to the index after commit, dropped on rollback.
+    """
+    if user_id is None:
+        return
+    session = session or db.session
+    pending = session.info.setdefault(PENDING_KEY, {})
+    if int(user_id) in pending and pending[int(user_id)] is None:
+        # Deleted in this transaction
+        return
+    pending.setdefault(int(user_id), {}).update(fields)
+
+
+def stage_removal(user_id, session=None):
+    """Take a deleted user off every board after commit."""
+    session = session or db.session
+    session.info.setdefault(PENDING_KEY, {})[int(user_id)] = None
+
+
+@event.listens_for(db.session, 'after_commit')
+def _apply_pending(session):
+    pending = session.info.pop(PENDING_KEY, None)
+    if pending and leaderboard.built_at is not None:
+        leaderboard.apply(pending)
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _discard_pending(session, previous_transaction):
+    session.info.pop(PENDING_KEY, None)
+
+
+@event.listens_for(User, 'after_insert')
+def _stage_new_user(mapper, connection, user):
+    stage_update(
+        user.id,
+        session=object_session(user),
+        username=user.username,
+        level=user.level,
+        xp=user.xp,
+        streak_days=user.streak_days
+    )
+
+
+@event.listens_for(User, 'after_update')
+def _stage_renamed_user(mapper, connection, user):
+    if db.inspect(user).attrs.username.history.has_changes():
+        stage_update(user.id, session=object_session(user), username=user.username)
+
+
+@event.listens_for(User, 'after_delete')
+def _stage_deleted_user(mapper, connection, user):
+    stage_removal(user.id, session=object_session(user))
+
+
+@event.listens_for(UserProgress, 'after_insert')
+def _stage_new_progress(mapper, connection, progress):
+    stage_update(
+        progress.user_id,
+        session=object_session(progress),
+        total_games_played=progress.total_games_played,
+        workouts_completed=progress.workouts_completed
+    )
+
+
+@event.listens_for(UserProgress, 'after_delete')
+def _stage_deleted_progress(mapper, connection, progress):
+    # No progress row: off the games board
+    stage_update(
+        progress.user_id,
+        session=object_session(progress),
+        total_games_played=None,
+        workouts_completed=0
+    )
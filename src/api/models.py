@@ -12,14 +12,35 @@ STAT TRACKING ORGANIZATION:
 
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.dialects.postgresql import JSON
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.dialects import postgresql, sqlite
+from api.passwords import password_hasher
 from datetime import datetime, date, timedelta
 import json
+from api.events import (emit, GamePlayed, WorkoutCompleted, LevelUp, ItemUnlocked,
+                        AvatarCreated, StreakChanged)
 
 # Initialize SQLAlchemy instance
 db = SQLAlchemy()
 
 
+def _stage_leaderboard(user_id, **fields):
+    """Queue a leaderboard index update (applied after the next commit)."""
+    from api.leaderboard import stage_update
+    stage_update(user_id, **fields)
+
+
+def _mark_dashboard(user_id, *sections):
+    """Flag dashboard snapshot sections changed by a Core statement."""
+    from api.dashboard import mark_dirty
+    mark_dirty(user_id, *sections)
+
+
+def _forget_user_games(user_id):
+    """Evict the user's cached GameHub progress after the next commit."""
+    from api.game_catalog import forget_user_games
+    forget_user_games(user_id)
+
+
 # ===================================
 # USER MODEL - PRIMARY STATS
 # ===================================
@@ -30,6 +51,10 @@ class User(db.Model):
     """
     __tablename__ = 'users'
 
+    # Leveling rules (shared with the SQL ingest path in session_ingest.py)
+    XP_PER_LEVEL = 100
+    COINS_PER_LEVEL = 50
+
     # Primary key
     id = db.Column(db.Integer, primary_key=True)
 
@@ -59,6 +84,11 @@ class User(db.Model):
         db.String(50), default="superhero", nullable=False)
     avatar_mood = db.Column(db.String(20), default="happy", nullable=False)
 
+    # 🎒 Item ownership bitmaps (bit n set = owns item id n), see api/ownership.py
+    # NULL until first built from the user's UnlockedItem rows
+    owned_catalog_items = db.Column(db.LargeBinary, nullable=True)  # ItemCatalog ids
+    owned_shop_items = db.Column(db.LargeBinary, nullable=True)  # Shop (DEFAULT_ITEMS) ids
+
     # 📊 LEGACY HABIT TRACKER FIELDS (can be deprecated if not used)
     habit_daily_points = db.Column(db.Integer, default=0)
     habit_completed_tasks = db.Column(JSON, default=list)
@@ -97,6 +127,8 @@ class User(db.Model):
         'GameSession', backref='user', lazy=True)
     game_stats = db.relationship(
         'UserGameStats', backref='user', uselist=False, cascade='all, delete-orphan')
+    dashboard_snapshot = db.relationship(
+        'UserDashboardSnapshot', uselist=False, cascade='all, delete-orphan')
 
     def __init__(self, email, password, username=None):
         self.email = email
@@ -105,14 +137,19 @@ class User(db.Model):
         self.created_at = datetime.utcnow()
         self.updated_at = datetime.utcnow()
         self.last_activity_date = date.today()  # Initialize activity tracking
+        self.owned_catalog_items = b''  # New users own nothing yet
+        self.owned_shop_items = b''
 
     def set_password(self, password):
-        """Hash and store password."""
-        self.password_hash = generate_password_hash(password)
+        """Hash and store password (in the hashing pool, see api/passwords.py)."""
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        """Check if provided password matches hash."""
-        return check_password_hash(self.password_hash, password)
+        """
+        Check if provided password matches hash.
+        A hash made with old parameters is replaced (the caller commits).
+        """
+        return password_hasher.verify_and_update(self, password)
 
     # 🎯 CENTRALIZED XP AND LEVELING
     def add_xp(self, amount, source="game"):
@@ -122,13 +159,16 @@ class User(db.Model):
         """
         self.xp += amount
         old_level = self.level
-        new_level = (self.xp // 100) + 1
+        new_level = (self.xp // self.XP_PER_LEVEL) + 1
 
         coins_earned = 0
         if new_level > old_level:
             self.level = new_level
-            coins_earned = (new_level - old_level) * 50
-            self.coins += coins_earned
+            coins_earned = (new_level - old_level) * self.COINS_PER_LEVEL
+            # Each level's reward is paid once (ledger key per level reached)
+            self.add_coins(coins_earned, source='level_up',
+                           idempotency_key=f'level_up:{new_level}')
+            emit(LevelUp(self.id, new_level))
             leveled_up = True
         else:
             leveled_up = False
@@ -136,6 +176,8 @@ class User(db.Model):
         # Update activity tracking
         self.update_activity()
 
+        _stage_leaderboard(self.id, xp=self.xp, level=self.level)
+
         return leveled_up, new_level, coins_earned
 
     # 🔥 CENTRALIZED STREAK TRACKING
@@ -151,6 +193,8 @@ class User(db.Model):
             # First activity ever
             self.streak_days = 1
             self.last_activity_date = today
+            _stage_leaderboard(self.id, streak_days=1)
+            emit(StreakChanged(self.id, 1))
             return True, 1
 
         days_since_activity = (today - self.last_activity_date).days
@@ -162,11 +206,15 @@ class User(db.Model):
             # Active yesterday, continue streak
             self.streak_days += 1
             self.last_activity_date = today
+            _stage_leaderboard(self.id, streak_days=self.streak_days)
+            emit(StreakChanged(self.id, self.streak_days))
             return True, self.streak_days
         else:
             # Streak broken (missed a day)
             self.streak_days = 1
             self.last_activity_date = today
+            _stage_leaderboard(self.id, streak_days=1)
+            emit(StreakChanged(self.id, 1))
             return False, 1
 
     def update_activity(self):
@@ -180,17 +228,19 @@ class User(db.Model):
         """Check if user can afford an item."""
         return self.coins >= cost
 
-    def spend_coins(self, amount):
-        """Spend coins if user has enough. Returns True if successful."""
-        if self.can_afford(amount):
-            self.coins -= amount
-            return True
-        return False
+    def spend_coins(self, amount, source="purchase", idempotency_key=None):
+        """
+        Spend coins if user has enough. Returns True if successful.
+        Goes through the coin ledger (atomic, see api/coins.py).
+        """
+        from api.coins import spend
+        result = spend(self, amount, source, idempotency_key)
+        return result.ok and not result.replayed
 
-    def add_coins(self, amount, source="reward"):
-        """Add coins to user account."""
-        self.coins += amount
-        return self.coins
+    def add_coins(self, amount, source="reward", idempotency_key=None):
+        """Add coins to user account (recorded in the coin ledger)."""
+        from api.coins import credit
+        return credit(self, amount, source, idempotency_key).balance
 
     # 📊 GET COMPLETE STATS
     def get_complete_stats(self):
@@ -282,6 +332,8 @@ class UserProgress(db.Model):
         """
         self.total_games_played += 1
         self.updated_at = datetime.utcnow()
+        _stage_leaderboard(self.user_id, total_games_played=self.total_games_played)
+        emit(GamePlayed(self.user_id, self.total_games_played))
 
         # Also update user's XP if provided
         if xp_earned > 0 and self.user:
@@ -307,6 +359,8 @@ class UserProgress(db.Model):
         """
         self.workouts_completed += 1
         self.updated_at = datetime.utcnow()
+        _stage_leaderboard(self.user_id, workouts_completed=self.workouts_completed)
+        emit(WorkoutCompleted(self.user_id, self.workouts_completed))
 
         # Update user's XP
         if self.user:
@@ -329,11 +383,13 @@ class UserProgress(db.Model):
         """Track that an item was unlocked."""
         self.items_unlocked += 1
         self.updated_at = datetime.utcnow()
+        emit(ItemUnlocked(self.user_id, self.items_unlocked))
 
     def create_avatar(self):
         """Track that an avatar was created."""
         self.avatars_created += 1
         self.updated_at = datetime.utcnow()
+        emit(AvatarCreated(self.user_id, self.avatars_created))
 
     # 🎁 DAILY REWARD SYSTEM
     def can_claim_daily_reward(self):
@@ -372,7 +428,8 @@ class UserProgress(db.Model):
 
         # Give coins to user
         if self.user:
-            self.user.add_coins(reward_coins, source="daily_reward")
+            self.user.add_coins(reward_coins, source="daily_reward",
+                                idempotency_key=f'daily_reward:{today.isoformat()}')
 
         return True, reward_coins, self.daily_reward_streak
 
@@ -406,10 +463,8 @@ class UserGameStats(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey(
         'users.id'), nullable=False, unique=True)
 
-    # Lists stored as JSON
-    unlocked_games = db.Column(JSON, default=list, nullable=False)
-    completed_games = db.Column(JSON, default=list, nullable=False)
-    favorite_games = db.Column(JSON, default=list, nullable=False)
+    # Unlocked / completed / favorite games live in user_game_flags
+    # (see UserGameFlag); the list properties below read them from there
 
     # Legacy fields (use UserProgress.total_games_played instead)
     total_games_played = db.Column(db.Integer, default=0, nullable=False)
@@ -425,44 +480,49 @@ class UserGameStats(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow,
                            onupdate=datetime.utcnow, nullable=False)
 
+    # 🎮 GAME FLAGS (one user_game_flags row each)
+    @property
+    def unlocked_games(self):
+        return UserGameFlag.game_ids(self.user_id, 'unlocked')
+
+    @property
+    def completed_games(self):
+        return UserGameFlag.game_ids(self.user_id, 'completed')
+
+    @property
+    def favorite_games(self):
+        return UserGameFlag.game_ids(self.user_id, 'favorite')
+
+    def game_lists(self):
+        """All of the user's flags in one query: {kind: [game ids]}."""
+        return UserGameFlag.game_lists(self.user_id)
+
+    def has_game(self, kind, game_id):
+        return UserGameFlag.has(self.user_id, kind, game_id)
+
     def unlock_game(self, game_id):
         """Unlock a game if not already unlocked."""
-        if not self.unlocked_games:
-            self.unlocked_games = []
-        if game_id not in self.unlocked_games:
-            self.unlocked_games = self.unlocked_games + [game_id]
-            return True
-        return False
+        return UserGameFlag.add(self.user_id, 'unlocked', game_id)
 
     def complete_game(self, game_id):
         """Mark a game as completed."""
-        if not self.completed_games:
-            self.completed_games = []
-        if game_id not in self.completed_games:
-            self.completed_games = self.completed_games + [game_id]
-            return True
-        return False
+        return UserGameFlag.add(self.user_id, 'completed', game_id)
 
     def toggle_favorite(self, game_id):
         """Toggle favorite status for a game. Returns new favorite state."""
-        if not self.favorite_games:
-            self.favorite_games = []
-
-        if game_id in self.favorite_games:
-            self.favorite_games = [
-                g for g in self.favorite_games if g != game_id]
+        if UserGameFlag.remove(self.user_id, 'favorite', game_id):
             return False
-        else:
-            self.favorite_games = self.favorite_games + [game_id]
-            return True
+        UserGameFlag.add(self.user_id, 'favorite', game_id)
+        return True
 
     def serialize(self):
+        games = self.game_lists()
         return {
             'id': self.id,
             'user_id': self.user_id,
-            'unlocked_games': self.unlocked_games or [],
-            'completed_games': self.completed_games or [],
-            'favorite_games': self.favorite_games or [],
+            'unlocked_games': games['unlocked'],
+            'completed_games': games['completed'],
+            'favorite_games': games['favorite'],
             'total_games_played': self.total_games_played,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
@@ -471,6 +531,94 @@ class UserGameStats(db.Model):
         return f'<UserGameStats user={self.user_id}>'
 
 
+# ===================================
+# USER GAME FLAGS MODEL
+# ===================================
+GAME_FLAG_KINDS = ('unlocked', 'completed', 'favorite')
+
+
+class UserGameFlag(db.Model):
+    """
+    One row per (user, kind, game): the user has unlocked, completed or
+    favorited that game. The primary key makes membership tests and toggles
+    a single index lookup/row write, and ix_user_game_flags_game_kind
+    answers "who favorited game X" without scanning users.
+    """
+    __tablename__ = 'user_game_flags'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    kind = db.Column(db.String(20), primary_key=True)
+    game_id = db.Column(db.String(100), primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_user_game_flags_game_kind', 'game_id', 'kind'),
+    )
+
+    @staticmethod
+    def insert_ignore(session=None):
+        """INSERT ... ON CONFLICT DO NOTHING (for one row or executemany)."""
+        session = session or db.session
+        dialect = postgresql if session.get_bind().dialect.name == 'postgresql' else sqlite
+        return dialect.insert(UserGameFlag).on_conflict_do_nothing()
+
+    @staticmethod
+    def add(user_id, kind, game_id):
+        """Set a flag. Returns True if it wasn't set before."""
+        result = db.session.execute(UserGameFlag.insert_ignore().values(
+            user_id=int(user_id), kind=kind, game_id=game_id, created_at=datetime.utcnow()))
+        _mark_dashboard(user_id, 'game_stats')
+        _forget_user_games(user_id)
+        return result.rowcount == 1
+
+    @staticmethod
+    def remove(user_id, kind, game_id):
+        """Clear a flag. Returns True if it was set."""
+        result = db.session.execute(db.delete(UserGameFlag).where(
+            UserGameFlag.user_id == int(user_id),
+            UserGameFlag.kind == kind,
+            UserGameFlag.game_id == game_id))
+        _mark_dashboard(user_id, 'game_stats')
+        _forget_user_games(user_id)
+        return result.rowcount > 0
+
+    @staticmethod
+    def has(user_id, kind, game_id):
+        return db.session.get(UserGameFlag, (int(user_id), kind, game_id)) is not None
+
+    @staticmethod
+    def game_ids(user_id, kind):
+        """A user's games with this flag, oldest first."""
+        return db.session.scalars(
+            db.select(UserGameFlag.game_id)
+            .where(UserGameFlag.user_id == int(user_id), UserGameFlag.kind == kind)
+            .order_by(UserGameFlag.created_at, UserGameFlag.game_id)
+        ).all()
+
+    @staticmethod
+    def game_lists(user_id, session=None):
+        """All of a user's flags in one query: {kind: [game ids, oldest first]}."""
+        session = session or db.session
+        lists = {kind: [] for kind in GAME_FLAG_KINDS}
+        for kind, game_id in session.execute(
+                db.select(UserGameFlag.kind, UserGameFlag.game_id)
+                .where(UserGameFlag.user_id == int(user_id))
+                .order_by(UserGameFlag.created_at, UserGameFlag.game_id)):
+            lists.setdefault(kind, []).append(game_id)
+        return lists
+
+    @staticmethod
+    def user_ids(game_id, kind='favorite'):
+        """Users who have this flag on a game (e.g. who favorited it)."""
+        return db.session.scalars(
+            db.select(UserGameFlag.user_id)
+            .where(UserGameFlag.game_id == game_id, UserGameFlag.kind == kind)
+        ).all()
+
+    def __repr__(self):
+        return f'<UserGameFlag {self.kind} {self.game_id} for user {self.user_id}>'
+
+
 # ===================================
 # GAME SESSION MODEL - INDIVIDUAL PLAYS
 # ===================================
@@ -492,6 +640,11 @@ class GameSession(db.Model):
     completed = db.Column(db.Boolean, default=False)
     played_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Recent sessions / history windows (ORDER BY played_at, id)
+        db.Index('ix_game_sessions_user_played_at', 'user_id', 'played_at', 'id'),
+    )
+
     @staticmethod
     def record_session(user_id, game_id, score=0, duration_minutes=0, xp_earned=10, completed=False):
         """
@@ -506,7 +659,31 @@ class GameSession(db.Model):
             completed: Whether they finished the game
 
         Returns:
-            dict with session data and updated stats
+            dict with session data and updated stats (including a
+            'user_stats' block, so callers don't need to reload the user)
+        """
+        from api.session_ingest import ingest_session, supports_single_round_trip
+
+        # ⚡ Fast path: one batch of INSERT/UPSERT ... RETURNING statements
+        if supports_single_round_trip():
+            return ingest_session(
+                user_id=user_id,
+                game_id=game_id,
+                score=score,
+                duration_minutes=duration_minutes,
+                xp_earned=xp_earned,
+                completed=completed
+            )
+
+        return GameSession.record_session_orm(
+            user_id, game_id, score, duration_minutes, xp_earned, completed)
+
+    @staticmethod
+    def record_session_orm(user_id, game_id, score=0, duration_minutes=0, xp_earned=10, completed=False):
+        """
+        ORM version of record_session (load, mutate, commit).
+        Used on databases without INSERT ... ON CONFLICT ... RETURNING
+        support, and as the baseline for `flask benchmark-session-ingest`.
         """
         from api.models import User, UserProgress, UserGameStats, Game
 
@@ -520,6 +697,13 @@ class GameSession(db.Model):
             completed=completed
         )
         db.session.add(session)
+        GameSessionDaily.add_sessions(user_id, [{
+            'game_id': game_id,
+            'score': score,
+            'duration_minutes': duration_minutes,
+            'xp_earned': xp_earned,
+            'completed': completed
+        }])
 
         # Update user stats
         user = User.query.get(user_id)
@@ -532,14 +716,15 @@ class GameSession(db.Model):
         # Update progress
         progress = UserProgress.query.filter_by(user_id=user_id).first()
         if not progress:
-            progress = UserProgress(user_id=user_id)
+            progress = UserProgress(user_id=user_id, total_games_played=0)
             db.session.add(progress)
-        progress.record_game_played(xp_earned)
+        # XP was already awarded above, so only bump the counter here
+        progress.record_game_played()
 
         # Update game stats
         game_stats = UserGameStats.query.filter_by(user_id=user_id).first()
         if not game_stats:
-            game_stats = UserGameStats(user_id=user_id)
+            game_stats = UserGameStats(user_id=user_id, total_games_played=0)
             db.session.add(game_stats)
         game_stats.total_games_played += 1
 
@@ -555,9 +740,9 @@ class GameSession(db.Model):
             if score > game.personal_best:
                 game.personal_best = score
 
-        db.session.commit()
+        db.session.flush()
 
-        return {
+        result = {
             'session_id': session.id,
             'score': score,
             'xp_earned': xp_earned,
@@ -565,9 +750,112 @@ class GameSession(db.Model):
             'new_level': new_level,
             'coins_earned': coins,
             'total_games_played': progress.total_games_played,
-            'streak_days': user.streak_days if user else 0
+            'streak_days': user.streak_days if user else 0,
+            'user_stats': {
+                'level': user.level,
+                'xp': user.xp,
+                'coins': user.coins,
+                'streak_days': user.streak_days,
+                'total_games_played': progress.total_games_played
+            } if user else None
+        }
+
+        db.session.commit()
+
+        return result
+
+    @staticmethod
+    def record_sessions(user_id, sessions):
+        """
+        Record several game sessions for one user in a single transaction.
+        XP, coins, level, games played and personal bests are folded so each
+        affected row is written once.
+
+        Args:
+            user_id: User ID
+            sessions: list of dicts with game_id, score, duration_minutes,
+                      xp_earned and completed
+
+        Returns:
+            dict with folded rewards and 'user_stats'
+        """
+        from api.session_ingest import ingest_sessions, supports_single_round_trip
+
+        if supports_single_round_trip():
+            return ingest_sessions(user_id, sessions)
+
+        return GameSession.record_sessions_orm(user_id, sessions)
+
+    @staticmethod
+    def record_sessions_orm(user_id, sessions):
+        """ORM version of record_sessions (load once, mutate, commit once)."""
+        from api.models import User, UserProgress, UserGameStats, Game
+
+        new_sessions = [GameSession(user_id=user_id, **s) for s in sessions]
+        db.session.add_all(new_sessions)
+        GameSessionDaily.add_sessions(user_id, sessions)
+
+        # Award the summed XP once (same result as one add_xp per session)
+        total_xp = sum(s['xp_earned'] for s in sessions)
+        user = User.query.get(user_id)
+        if user:
+            leveled_up, new_level, coins = user.add_xp(total_xp, source="game")
+        else:
+            leveled_up, new_level, coins = False, 1, 0
+
+        progress = UserProgress.query.filter_by(user_id=user_id).first()
+        if not progress:
+            progress = UserProgress(user_id=user_id, total_games_played=0)
+            db.session.add(progress)
+        progress.total_games_played += len(sessions)
+        progress.updated_at = datetime.utcnow()
+        _stage_leaderboard(user_id, total_games_played=progress.total_games_played)
+        emit(GamePlayed(user_id, progress.total_games_played))
+
+        game_stats = UserGameStats.query.filter_by(user_id=user_id).first()
+        if not game_stats:
+            game_stats = UserGameStats(user_id=user_id, total_games_played=0)
+            db.session.add(game_stats)
+        game_stats.total_games_played += len(sessions)
+
+        games = {g.name: g for g in Game.query.filter(
+            Game.user_id == user_id,
+            Game.name.in_({s['game_id'] for s in sessions})
+        ).all()}
+
+        for s in sessions:
+            if s['completed']:
+                game_stats.complete_game(s['game_id'])
+            game = games.get(s['game_id'])
+            if game:
+                game.times_played += 1
+                game.last_played = datetime.utcnow()
+                if s['score'] > game.personal_best:
+                    game.personal_best = s['score']
+
+        db.session.flush()
+
+        result = {
+            'sessions_recorded': len(sessions),
+            'xp_earned': total_xp,
+            'leveled_up': leveled_up,
+            'new_level': new_level,
+            'coins_earned': coins,
+            'total_games_played': progress.total_games_played,
+            'streak_days': user.streak_days if user else 0,
+            'user_stats': {
+                'level': user.level,
+                'xp': user.xp,
+                'coins': user.coins,
+                'streak_days': user.streak_days,
+                'total_games_played': progress.total_games_played
+            } if user else None
         }
 
+        db.session.commit()
+
+        return result
+
     def serialize(self):
         return {
             'id': self.id,
@@ -584,6 +872,212 @@ class GameSession(db.Model):
         return f'<GameSession {self.game_id} by user {self.user_id}>'
 
 
+# ===================================
+# COIN LEDGER MODEL
+# ===================================
+class CoinTransaction(db.Model):
+    """
+    Append-only record of every coin balance change (see api/coins.py).
+    amount is signed (+ earned, - spent); balance_after is users.coins right
+    after the change. idempotency_key makes a mutation apply at most once.
+    """
+    __tablename__ = 'coin_ledger'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    amount = db.Column(db.Integer, nullable=False)
+    balance_after = db.Column(db.Integer, nullable=False)
+    source = db.Column(db.String(50), nullable=False)
+    idempotency_key = db.Column(db.String(100), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'idempotency_key', name='unique_coin_idempotency_key'),
+        db.Index('ix_coin_ledger_user_created', 'user_id', 'created_at'),
+    )
+
+    def serialize(self):
+        return {
+            'id': self.id,
+            'amount': self.amount,
+            'balance_after': self.balance_after,
+            'source': self.source,
+            'idempotency_key': self.idempotency_key,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+    def __repr__(self):
+        return f'<CoinTransaction {self.amount:+d} ({self.source}) for user {self.user_id}>'
+
+
+# ===================================
+# IDEMPOTENCY KEY MODEL
+# ===================================
+class IdempotencyKey(db.Model):
+    """
+    Stored response for a request sent with an Idempotency-Key header
+    (see api/idempotency.py). A retry with the same key gets this response
+    replayed instead of running the endpoint again. status_code is NULL
+    while the first request is still in progress.
+    """
+    __tablename__ = 'idempotency_keys'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    key = db.Column(db.String(255), nullable=False)
+    # sha256 of method + path + body, so a key can't be reused for another request
+    fingerprint = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer, nullable=True)
+    response_body = db.Column(db.LargeBinary, nullable=True)
+    content_type = db.Column(db.String(100), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'key', name='unique_user_idempotency_key'),
+        db.Index('ix_idempotency_keys_expires_at', 'expires_at'),
+    )
+
+    def __repr__(self):
+        return f'<IdempotencyKey {self.key} for user {self.user_id}>'
+
+
+# ===================================
+# REVOKED TOKEN MODEL
+# ===================================
+class RevokedToken(db.Model):
+    """
+    A JWT revoked before it expired (logout), keyed by its jti
+    (see api/revocation.py). Rows are purged once the token would have
+    expired anyway.
+    """
+    __tablename__ = 'revoked_tokens'
+
+    jti = db.Column(db.String(64), primary_key=True)
+    user_id = db.Column(db.Integer, nullable=True)
+    token_type = db.Column(db.String(10), nullable=False, default='access')
+    revoked_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        # Incremental sync of the per-worker Bloom filters
+        db.Index('ix_revoked_tokens_revoked_at', 'revoked_at'),
+        db.Index('ix_revoked_tokens_expires_at', 'expires_at'),
+    )
+
+    def __repr__(self):
+        return f'<RevokedToken {self.jti} ({self.token_type})>'
+
+
+# ===================================
+# GAME SESSION DAILY ROLLUP MODEL
+# ===================================
+class GameSessionDaily(db.Model):
+    """
+    Per-day totals of a user's game sessions, one row per (user, game, day).
+    Written alongside every GameSession, so analytics read one row per day
+    instead of every play. Rebuild with `flask backfill-session-rollup`.
+    """
+    __tablename__ = 'game_session_daily'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    game_id = db.Column(db.String(100), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+
+    sessions = db.Column(db.Integer, default=0, nullable=False)
+    xp_earned = db.Column(db.Integer, default=0, nullable=False)
+    minutes_played = db.Column(db.Integer, default=0, nullable=False)
+    score_sum = db.Column(db.Integer, default=0, nullable=False)
+    score_max = db.Column(db.Integer, default=0, nullable=False)
+    completions = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @staticmethod
+    def fold(user_id, sessions, day):
+        """
+        Fold session dicts (game_id, score, duration_minutes, xp_earned,
+        completed) into one rollup delta per game.
+        Returns: list of dicts keyed like the table columns
+        """
+        rows = {}
+        for s in sessions:
+            row = rows.setdefault(s['game_id'], {
+                'user_id': user_id,
+                'game_id': s['game_id'],
+                'day': day,
+                'sessions': 0,
+                'xp_earned': 0,
+                'minutes_played': 0,
+                'score_sum': 0,
+                'score_max': 0,
+                'completions': 0
+            })
+            row['sessions'] += 1
+            row['xp_earned'] += s['xp_earned'] or 0
+            row['minutes_played'] += s['duration_minutes'] or 0
+            row['score_sum'] += s['score'] or 0
+            row['score_max'] = max(row['score_max'], s['score'] or 0)
+            row['completions'] += 1 if s['completed'] else 0
+        return list(rows.values())
+
+    @staticmethod
+    def add_sessions(user_id, sessions, day=None):
+        """ORM version of the rollup write (get-or-create per game, no commit)."""
+        now = datetime.utcnow()
+        for delta in GameSessionDaily.fold(user_id, sessions, day or now.date()):
+            row = db.session.get(
+                GameSessionDaily, (user_id, delta['game_id'], delta['day']))
+            if not row:
+                row = GameSessionDaily(
+                    user_id=user_id, game_id=delta['game_id'], day=delta['day'],
+                    sessions=0, xp_earned=0, minutes_played=0,
+                    score_sum=0, score_max=0, completions=0)
+                db.session.add(row)
+            row.sessions += delta['sessions']
+            row.xp_earned += delta['xp_earned']
+            row.minutes_played += delta['minutes_played']
+            row.score_sum += delta['score_sum']
+            row.score_max = max(row.score_max, delta['score_max'])
+            row.completions += delta['completions']
+            row.updated_at = now
+
+    def serialize(self):
+        return {
+            'user_id': self.user_id,
+            'game_id': self.game_id,
+            'day': self.day.isoformat(),
+            'sessions': self.sessions,
+            'xp_earned': self.xp_earned,
+            'minutes_played': self.minutes_played,
+            'score_sum': self.score_sum,
+            'score_max': self.score_max,
+            'completions': self.completions
+        }
+
+    def __repr__(self):
+        return f'<GameSessionDaily {self.game_id} {self.day} for user {self.user_id}>'
+
+
+# ===================================
+# USER DASHBOARD SNAPSHOT MODEL
+# ===================================
+class UserDashboardSnapshot(db.Model):
+    """
+    Materialized /api/dashboard/stats payload, one row per user.
+    Kept up to date by api/dashboard.py whenever the stats it shows change,
+    so the dashboard is a single primary-key read.
+    """
+    __tablename__ = 'user_dashboard_snapshots'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    # {'user': {...}, 'progress': {...}, 'game_stats': {...}, 'recent_sessions': [...]}
+    payload = db.Column(JSON, nullable=False, default=dict)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<UserDashboardSnapshot user={self.user_id}>'
+
+
 # ===================================
 # TASK MODEL
 # ===================================
@@ -641,6 +1135,10 @@ class Game(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow,
                            onupdate=datetime.utcnow, nullable=False)
 
+    __table_args__ = (
+        db.Index('ix_games_user_name', 'user_id', 'name'),
+    )
+
     def __init__(self, name, user_id, progress=0):
         self.name = name
         self.user_id = user_id
@@ -667,6 +1165,38 @@ class Game(db.Model):
         return f'<Game {self.name} for user {self.user_id}>'
 
 
+# ===================================
+# GAME CATALOG MODEL
+# ===================================
+class GameCatalog(db.Model):
+    """Master list of the games shown in GameHub (id is the game's slug)."""
+    __tablename__ = 'game_catalog'
+
+    id = db.Column(db.String(100), primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    description = db.Column(db.String(255), default='')
+    category = db.Column(db.String(50), default='')
+    icon = db.Column(db.String(20), default='🎮')
+    min_level = db.Column(db.Integer, default=1, nullable=False)
+    xp_reward = db.Column(db.String(20), default='')
+    sort_order = db.Column(db.Integer, default=0, nullable=False)
+    is_active = db.Column(db.Boolean, default=True, nullable=False)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'description': self.description,
+            'category': self.category,
+            'icon': self.icon,
+            'min_level': self.min_level,
+            'xp_reward': self.xp_reward
+        }
+
+    def __repr__(self):
+        return f'<GameCatalog {self.id}>'
+
+
 # ===================================
 # USER INVENTORY MODEL
 # ===================================
@@ -715,6 +1245,11 @@ class UserAchievement(db.Model):
     completed_date = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # One progress row per achievement (upserted by api/achievements.py)
+        db.Index('ix_user_achievements_user_name', 'user_id', 'achievement_name', unique=True),
+    )
+
     def serialize(self):
         return {
             'id': self.id,
@@ -758,6 +1293,14 @@ class UserAvatar(db.Model):
     updated_at = db.Column(
         db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_user_avatars_user_current', 'user_id', 'is_current'),
+        # A user can only have one current avatar
+        db.Index('uq_user_avatars_one_current', 'user_id', unique=True,
+                 postgresql_where=db.text('is_current'),
+                 sqlite_where=db.text('is_current')),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -795,6 +1338,7 @@ class UnlockedItem(db.Model):
     __table_args__ = (
         db.UniqueConstraint('user_id', 'item_category', 'item_value', 'avatar_style',
                             name='unique_user_unlocked_item'),
+        db.Index('ix_unlocked_items_user_catalog', 'user_id', 'item_catalog_id'),
     )
 
     def to_dict(self):
@@ -901,8 +1445,9 @@ def init_user_data(user_id):
     game_stats = UserGameStats(user_id=user_id)
     db.session.add(game_stats)
 
-    # Unlock default items
-    default_items = ItemCatalog.query.filter_by(is_default=True).all()
+    # Unlock default items (from the in-memory catalog)
+    from api.item_catalog import catalog
+    default_items = catalog().defaults
     for item in default_items:
         unlocked = UnlockedItem(
             user_id=user_id,
@@ -933,6 +1478,8 @@ def init_user_data(user_id):
         avatar_options=json.dumps(default_options),
         is_current=True
     )
+    # Only one avatar can be current (uq_user_avatars_one_current)
+    UserAvatar.query.filter_by(user_id=user_id, is_current=True).update({'is_current': False})
     db.session.add(avatar)
     progress.create_avatar()
 
@@ -977,6 +1524,7 @@ def create_default_avatar_for_user(user_id, style='avataaars'):
         avatar_options=json.dumps(default_options),
         is_current=True
     )
+    UserAvatar.query.filter_by(user_id=user_id, is_current=True).update({'is_current': False})
     db.session.add(avatar)
     db.session.commit()
     return avatar
@@ -0,0 +1,203 @@
+# src/api/ownership.py
+"""
+Item ownership bitmaps for PixelPlay.
+Each user carries two bitmaps: bit n of owned_catalog_items is set when they
+own ItemCatalog item n, and bit n of owned_shop_items when they own shop
+item n (DEFAULT_ITEMS in inventory_routes). "Owned?" is then a bit test on
+the already-loaded user instead of loading every UnlockedItem row.
+
+- Bits are set automatically whenever an UnlockedItem is added (before_flush),
+  so every unlock/purchase path stays in sync
+- Users whose bitmaps were never built (NULL) get them computed from their
+  UnlockedItem rows: in memory on reads (owned_bitmaps), saved by write
+  paths (ensure_ownership) and by `flask backfill-ownership-bitmaps`
+- Both paths read the bitmaps with SELECT ... FOR UPDATE on the user's row
+  and write them back with a Core UPDATE in the same transaction, so
+  concurrent unlocks (or an unlock racing a first build) for the same user
+  are serialized instead of overwriting each other's bits
+- Bitmaps are stored as little-endian bytes: bit n is bit n & 7 of byte
+  n >> 3, so "owned?" reads one byte
+- Bits are keyed by ItemCatalog.id rather than a dense ordinal: ids never
+  change, so deleting or adding catalog items never means rewriting every
+  user's bitmap, and the catalog is small enough that id gaps cost a few
+  bytes per user
+"""
+
+from sqlalchemy import event, select, update
+from sqlalchemy.orm.attributes import set_committed_value
+from api.models import db, User, UnlockedItem
+
+BITMAP_COLUMNS = ('owned_catalog_items', 'owned_shop_items')
+
+
+# ===============================
+# 🧮 BITMAP HELPERS
+# ===============================
+
+def to_int(bitmap):
+    return int.from_bytes(bitmap or b'', 'little')
+
+
+def to_bytes(bits):
+    return bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+
+
+def has_bit(bitmap, ordinal):
+    """Bit test on the stored bytes (O(1), no conversion of the whole bitmap)."""
+    if ordinal is None or ordinal < 0 or not bitmap or ordinal >> 3 >= len(bitmap):
+        return False
+    return bool(bitmap[ordinal >> 3] >> (ordinal & 7) & 1)
+
+
+def set_bits(bitmap, ordinals):
+    bits = to_int(bitmap)
+    for ordinal in ordinals:
+        bits |= 1 << ordinal
+    return to_bytes(bits)
+
+
+def ordinals(bitmap):
+    """Every set bit, lowest first."""
+    bits, ordinal = to_int(bitmap), 0
+    while bits:
+        if bits & 1:
+            yield ordinal
+        bits >>= 1
+        ordinal += 1
+
+
+# ===============================
+# 🎒 OWNERSHIP
+# ===============================
+
+def _item_bit(item):
+    """
+    (bitmap column, ordinal) for an UnlockedItem.
+    Avatar items (style/category/value set) map to their catalog id; the
+    rest are shop purchases keyed by item_catalog_id.
+    """
+    if item.avatar_style or item.item_category:
+        ordinal = item.item_catalog_id
+        if ordinal is None:
+            from api.item_catalog import catalog
+            catalog_item = catalog().find(item.avatar_style, item.item_category, item.item_value)
+            ordinal = catalog_item.id if catalog_item else None
+        return 'owned_catalog_items', ordinal
+    return 'owned_shop_items', item.item_catalog_id
+
+
+def _lock_bitmaps(session, user_id):
+    """The user's stored bitmaps, with their row locked until commit (None if no row)."""
+    return session.execute(
+        select(User.owned_catalog_items, User.owned_shop_items)
+        .where(User.id == user_id)
+        .with_for_update()
+    ).first()
+
+
+def _store_bitmaps(session, user, values):
+    """UPDATE the bitmap columns and mirror them on the loaded user without dirtying it."""
+    session.execute(update(User).where(User.id == user.id).values(**values))
+    for column, value in values.items():
+        set_committed_value(user, column, value)
+
+
+def _is_built(user):
+    return all(getattr(user, column) is not None for column in BITMAP_COLUMNS)
+
+
+def _build_bitmaps(session, user_id):
+    """{column: bitmap} from the user's UnlockedItem rows (one query)."""
+    rows = session.query(
+        UnlockedItem.item_catalog_id, UnlockedItem.avatar_style,
+        UnlockedItem.item_category, UnlockedItem.item_value
+    ).filter(UnlockedItem.user_id == user_id).all()
+
+    bits = {column: set() for column in BITMAP_COLUMNS}
+    for row in rows:
+        column, ordinal = _item_bit(row)
+        if ordinal is not None:
+            bits[column].add(ordinal)
+    return {column: set_bits(b'', bits[column]) for column in BITMAP_COLUMNS}
+
+
+def owned_bitmaps(user):
+    """
+    The user's bitmaps for reading: {column: bitmap}. Bitmaps that were
+    never built are computed in memory and not saved (no lock, no write).
+    """
+    if _is_built(user):
+        return {column: getattr(user, column) for column in BITMAP_COLUMNS}
+    return _build_bitmaps(db.session, user.id)
+
+
+def ensure_ownership(user):
+    """
+    Build and save the user's bitmaps if they don't exist yet (for write
+    paths). They are written in the caller's transaction and committed
+    with it.
+    """
+    if _is_built(user):
+        return user
+
+    session = db.session
+    # Lock the user first: an unlock committing meanwhile is either seen by
+    # the rows query below or waits and sets its bit on the built bitmap
+    stored = _lock_bitmaps(session, user.id)
+    if stored is None:
+        return user
+    if _is_built(stored):
+        # Built by another request since this user was loaded
+        for column in BITMAP_COLUMNS:
+            set_committed_value(user, column, getattr(stored, column))
+        return user
+
+    _store_bitmaps(session, user, _build_bitmaps(session, user.id))
+    return user
+
+
+def owns_catalog_item(user, item_id):
+    return has_bit(ensure_ownership(user).owned_catalog_items, item_id)
+
+
+def owns_shop_item(user, item_id):
+    return has_bit(ensure_ownership(user).owned_shop_items, item_id)
+
+
+def owned_shop_item_ids(user):
+    return set(ordinals(owned_bitmaps(user)['owned_shop_items']))
+
+
+@event.listens_for(db.session, 'before_flush')
+def _sync_new_unlocks(session, flush_context, instances):
+    new_items = [obj for obj in session.new if isinstance(obj, UnlockedItem)]
+    if not new_items:
+        return
+
+    # New bits per user: {user_id: {column: {ordinal, ...}}}
+    new_bits = {}
+    with session.no_autoflush:
+        for item in new_items:
+            column, ordinal = _item_bit(item)
+            if ordinal is not None:
+                user_bits = new_bits.setdefault(int(item.user_id), {})
+                user_bits.setdefault(column, set()).add(ordinal)
+
+        for user_id, columns in new_bits.items():
+            user = session.get(User, user_id)
+            if user is None:
+                continue
+            if user in session.new:
+                # Inserted by this same flush: nobody else can see the row yet
+                for column, new_ordinals in columns.items():
+                    setattr(user, column, set_bits(getattr(user, column), new_ordinals))
+                continue
+
+            # Read-modify-write under the row lock (see ensure_ownership)
+            stored = _lock_bitmaps(session, user_id)
+            values = {column: set_bits(getattr(stored, column), new_ordinals)
+                      for column, new_ordinals in columns.items()
+                      # Bitmaps not built yet will pick this row up when they are
+                      if stored is not None and getattr(stored, column) is not None}
+            if values:
+                _store_bitmaps(session, user, values)
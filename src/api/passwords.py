@@ -0,0 +1,294 @@
+# src/api/passwords.py
+"""
+Password hashing service for PixelPlay.
+Password hashes are deliberately slow (scrypt by default), so how many run
+at once is capped for the whole host, not per app worker:
+
+- PASSWORD_HASH_CONCURRENCY (default: half the CPUs) hashes run at once
+  across every gunicorn worker on the machine. The slots are lock files in
+  PASSWORD_HASH_LOCK_DIR held with flock, so the limit holds whatever the
+  worker count, and a crashed worker's slot is released by the kernel. A
+  login storm can't take every CPU away from the other endpoints
+- A request that can't get a slot within PASSWORD_HASH_WAIT_SECONDS fails
+  fast with HashingBusy (the routes answer 503) instead of piling up, and at
+  most PASSWORD_HASH_MAX_PENDING requests per worker wait at all
+- The hash itself runs in a small per-worker process pool. Its default size
+  is the host limit divided by WEB_CONCURRENCY (gunicorn's worker count), so
+  the host runs about PASSWORD_HASH_CONCURRENCY hashing processes in total
+- This assumes threaded workers (gunicorn --worker-class gthread): the
+  request thread waits for its hash while the worker's other threads keep
+  serving. Sync workers are blocked for the whole hash whatever we do; there
+  the host limit is what protects the other endpoints
+- The algorithm and cost come from PASSWORD_HASH_METHOD (any werkzeug
+  method string, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:1000000")
+- Hashes made with other parameters still verify; verify_and_update()
+  rehashes them with the current ones on the next successful login
+- stats() reports hash/verify latency, time spent waiting for the pool and
+  the current/peak queue depth. It's operational data, so it isn't served
+  over HTTP; `flask password-hashing-stats` measures the configured pool
+
+PASSWORD_HASH_WORKERS=0 hashes inline (no pool), e.g. for CLI scripts.
+"""
+
+import math
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from werkzeug.security import (generate_password_hash, check_password_hash,
+                               DEFAULT_PBKDF2_ITERATIONS)
+
+try:
+    import fcntl
+except ImportError:  # Windows: the limit falls back to per-process
+    fcntl = None
+
+
+class HashingBusy(Exception):
+    """Too many password hashes queued; the client should retry shortly."""
+
+
+def normalize_method(method):
+    """A werkzeug method string with its defaults filled in, as stored in hashes."""
+    name, *args = method.split(':')
+    if name == 'scrypt':
+        return 'scrypt:' + ':'.join(args or ['32768', '8', '1'])
+    if name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = args[1] if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{iterations}'
+    raise ValueError(f"Unsupported password hash method '{method}'")
+
+
+# ===============================
+# ⚙️ WORKER FUNCTIONS
+# ===============================
+# Run in the pool processes; each returns (result, seconds spent hashing)
+
+def _hash(password, method, salt_length):
+    started = time.perf_counter()
+    result = generate_password_hash(password, method=method, salt_length=salt_length)
+    return result, time.perf_counter() - started
+
+
+def _verify(password_hash, password):
+    started = time.perf_counter()
+    result = check_password_hash(password_hash, password)
+    return result, time.perf_counter() - started
+
+
+# ===============================
+# 🚦 HOST-WIDE SLOTS
+# ===============================
+
+class HostSlots:
+    """
+    At most `size` holders at once across every process on this host: slot
+    n is an exclusive flock on <directory>/slot-n.
+    """
+
+    POLL_SECONDS = 0.01
+
+    def __init__(self, size, directory):
+        self.size = size
+        self.directory = directory
+        self._local = threading.BoundedSemaphore(size) if fcntl is None else None
+
+    def acquire(self, timeout):
+        """A slot handle, or None if none freed up within timeout seconds."""
+        if self._local is not None:
+            return self if self._local.acquire(timeout=timeout) else None
+
+        os.makedirs(self.directory, exist_ok=True)
+        deadline = time.monotonic() + timeout
+        while True:
+            # Random start, so waiting processes don't all fight over slot 0
+            start = random.randrange(self.size)
+            for i in range(self.size):
+                path = os.path.join(self.directory, f'slot-{(start + i) % self.size}')
+                # A fresh descriptor per attempt: flock is per open file, so
+                # two threads sharing one would both "hold" the slot
+                fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o600)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return fd
+                except BlockingIOError:
+                    os.close(fd)
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(self.POLL_SECONDS)
+
+    def release(self, handle):
+        if self._local is not None:
+            self._local.release()
+            return
+        fcntl.flock(handle, fcntl.LOCK_UN)
+        os.close(handle)
+
+
+# ===============================
+# 🔐 HASHING SERVICE
+# ===============================
+
+class _Timings:
+    """Count / total / max of one kind of measurement."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            'max_ms': round(self.max * 1000, 2)
+        }
+
+
+class PasswordHasher:
+    """Bounded process pool for password hashing, with metrics."""
+
+    def __init__(self, method='scrypt', salt_length=16, workers=2, max_pending=16,
+                 wait_seconds=5.0, host_slots=None):
+        self.method = normalize_method(method)
+        self.salt_length = salt_length
+        self.workers = workers
+        self.max_pending = max_pending
+        self.wait_seconds = wait_seconds
+        self.host_slots = host_slots
+
+        self._slots = threading.BoundedSemaphore(workers + max_pending if workers else max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._timings = {name: _Timings() for name in ('hash', 'verify', 'wait')}
+        self._rejected = 0
+        self._rehashed = 0
+
+    def _pool(self):
+        # Created on first use, and again in a forked worker process
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def _reset_pool(self):
+        with self._lock:
+            self._executor = None
+
+    def _busy(self, reason):
+        with self._lock:
+            self._rejected += 1
+        print(f"⚠️ Password hashing busy ({reason})")
+        return HashingBusy('Too many login attempts right now, please try again')
+
+    def _run(self, kind, function, *args):
+        queued = time.perf_counter()
+        if not self._slots.acquire(timeout=self.wait_seconds):
+            raise self._busy(f'{self.max_pending} requests waiting in this worker')
+
+        host_slot = None
+        if self.host_slots is not None:
+            remaining = max(self.wait_seconds - (time.perf_counter() - queued), 0)
+            host_slot = self.host_slots.acquire(remaining)
+            if host_slot is None:
+                self._slots.release()
+                raise self._busy(f'all {self.host_slots.size} host slots in use')
+
+        with self._lock:
+            self._in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        try:
+            if self.workers:
+                try:
+                    result, seconds = self._pool().submit(function, *args).result()
+                except BrokenProcessPool:
+                    # A pool process died; start a fresh pool for the next call
+                    self._reset_pool()
+                    raise
+            else:
+                result, seconds = function(*args)
+            waited = time.perf_counter() - queued - seconds
+            with self._lock:
+                self._timings[kind].add(seconds)
+                self._timings['wait'].add(max(waited, 0.0))
+            return result
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            if host_slot is not None:
+                self.host_slots.release(host_slot)
+            self._slots.release()
+
+    def hash(self, password):
+        """Hash a password with the current method."""
+        return self._run('hash', _hash, password, self.method, self.salt_length)
+
+    def verify(self, password_hash, password):
+        """Check a password against a stored hash (any supported method)."""
+        if not password_hash:
+            return False
+        return self._run('verify', _verify, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True if the hash wasn't made with the current method and cost."""
+        return password_hash.split('$', 1)[0] != self.method
+
+    def verify_and_update(self, user, password):
+        """
+        Check a user's password; if it's right but hashed with old
+        parameters, store a fresh hash (the caller commits).
+        """
+        if not self.verify(user.password_hash, password):
+            return False
+        if self.needs_rehash(user.password_hash):
+            user.password_hash = self.hash(password)
+            with self._lock:
+                self._rehashed += 1
+            print(f"🔐 Rehashed password for user {user.id} with {self.method}")
+        return True
+
+    def stats(self):
+        """Latency and queue counters for this worker."""
+        with self._lock:
+            return {
+                'method': self.method,
+                'workers': self.workers,
+                'host_slots': self.host_slots.size if self.host_slots else None,
+                'max_pending': self.max_pending,
+                'in_flight': self._in_flight,
+                'queue_depth': max(self._in_flight - self.workers, 0) if self.workers else 0,
+                'peak_in_flight': self._peak_in_flight,
+                'rejected': self._rejected,
+                'rehashed': self._rehashed,
+                'hash': self._timings['hash'].to_dict(),
+                'verify': self._timings['verify'].to_dict(),
+                'wait': self._timings['wait'].to_dict()
+            }
+
+
+# Hashes running at once on this host, and gunicorn's worker count
+HOST_CONCURRENCY = int(os.getenv('PASSWORD_HASH_CONCURRENCY', max(1, (os.cpu_count() or 1) // 2)))
+WEB_WORKERS = max(1, int(os.getenv('WEB_CONCURRENCY', 1)))
+
+# Process-wide hasher used by User.set_password / check_password and the auth routes
+password_hasher = PasswordHasher(
+    method=os.getenv('PASSWORD_HASH_METHOD', 'scrypt'),
+    salt_length=int(os.getenv('PASSWORD_HASH_SALT_LENGTH', 16)),
+    workers=int(os.getenv('PASSWORD_HASH_WORKERS', math.ceil(HOST_CONCURRENCY / WEB_WORKERS))),
+    max_pending=int(os.getenv('PASSWORD_HASH_MAX_PENDING', 16)),
+    wait_seconds=float(os.getenv('PASSWORD_HASH_WAIT_SECONDS', 5)),
+    host_slots=HostSlots(HOST_CONCURRENCY, os.getenv(
+        'PASSWORD_HASH_LOCK_DIR', os.path.join(tempfile.gettempdir(), 'pixelplay-password-slots'))))
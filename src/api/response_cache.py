@@ -0,0 +1,199 @@
+# src/api/response_cache.py
+"""
+Response cache for PixelPlay's public, identical-for-everyone endpoints.
+Stores pre-serialized JSON bytes plus an ETag, so a cache hit never touches
+the database or the JSON encoder.
+
+- Entries expire after a TTL and can be invalidated explicitly when the
+  underlying data changes (invalidate() bumps a generation counter, so old
+  entries are simply never read again)
+- Backends are pluggable: an in-process LRU by default, or Redis when
+  CACHE_REDIS_URL is set and the redis package is installed (shared by all
+  gunicorn workers, so one worker's invalidation clears it for everyone)
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+# ===============================
+# 🗄️ BACKENDS
+# ===============================
+
+class InProcessLRUBackend:
+    """Thread-safe LRU with per-entry expiry, private to this worker."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._generations = {}
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.evictions += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def generation(self, namespace):
+        with self._lock:
+            return self._generations.get(namespace, 0)
+
+    def bump_generation(self, namespace):
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            # Old generations can never be read again, drop them right away
+            stale = [key for key in self._entries if key.startswith(f'{namespace}:')]
+            for key in stale:
+                del self._entries[key]
+            self.evictions += len(stale)
+
+    def size(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class RedisBackend:
+    """Shared backend; expiry and eviction are handled by Redis itself."""
+
+    def __init__(self, client):
+        self.client = client
+        self.evictions = None  # Tracked by Redis (INFO stats: evicted_keys)
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl):
+        self.client.set(key, value, ex=max(int(ttl), 1))
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def generation(self, namespace):
+        return int(self.client.get(f'{namespace}:generation') or 0)
+
+    def bump_generation(self, namespace):
+        self.client.incr(f'{namespace}:generation')
+
+    def size(self):
+        return None
+
+
+def create_backend(max_entries=256):
+    """
+    Pick the cache backend from the environment.
+    Falls back to the in-process LRU if Redis isn't configured or reachable.
+    """
+    redis_url = os.getenv('CACHE_REDIS_URL')
+    if redis_url:
+        try:
+            import redis
+            client = redis.Redis.from_url(redis_url)
+            client.ping()
+            print("✅ Response cache: using Redis")
+            return RedisBackend(client)
+        except Exception as e:
+            print(f"⚠️ Response cache: Redis unavailable ({e}), using in-process LRU")
+    return InProcessLRUBackend(max_entries=max_entries)
+
+
+# ===============================
+# ⚡ RESPONSE CACHE
+# ===============================
+
+class ResponseCache:
+    """
+    Caches serialized responses under a namespace.
+    Each entry is stored as b'<etag>\\n<body>'.
+    """
+
+    def __init__(self, namespace, ttl=30, backend=None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.backend = backend or InProcessLRUBackend()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'invalidations': 0, 'not_modified': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _key(self, parts):
+        generation = self.backend.generation(self.namespace)
+        return f"{self.namespace}:{generation}:" + ':'.join(str(part) for part in parts)
+
+    @staticmethod
+    def make_etag(body):
+        return hashlib.sha1(body).hexdigest()
+
+    def get_or_build(self, parts, build):
+        """
+        Return (etag, body) for the key parts, calling build() to produce the
+        body bytes on a miss.
+        """
+        key = self._key(parts)
+        try:
+            cached = self.backend.get(key)
+        except Exception as e:
+            print(f"⚠️ Response cache read failed: {e}")
+            cached = None
+
+        if cached is not None:
+            self._count('hits')
+            etag, body = cached.split(b'\n', 1)
+            return etag.decode(), body
+
+        self._count('misses')
+        body = build()
+        etag = self.make_etag(body)
+        try:
+            self.backend.set(key, etag.encode() + b'\n' + body, self.ttl)
+        except Exception as e:
+            print(f"⚠️ Response cache write failed: {e}")
+        return etag, body
+
+    def record_not_modified(self):
+        self._count('not_modified')
+
+    def invalidate(self):
+        """Drop every entry in this namespace (called when the data changes)."""
+        try:
+            self.backend.bump_generation(self.namespace)
+        except Exception as e:
+            print(f"⚠️ Response cache invalidation failed: {e}")
+        self._count('invalidations')
+
+    def stats(self):
+        """Hit/miss/evict counters for this worker."""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        stats['evictions'] = self.backend.evictions
+        stats['entries'] = self.backend.size()
+        stats['backend'] = type(self.backend).__name__
+        stats['ttl_seconds'] = self.ttl
+        return stats
@@ -0,0 +1,193 @@
+# src/api/revocation.py
+"""
+JWT revocation store for PixelPlay.
+Revoked tokens (logout) are stored in the revoked_tokens table by jti until
+the token would have expired, so revocation survives restarts and applies to
+every gunicorn worker.
+
+Every authenticated request asks "is this jti revoked?", so each worker keeps
+a Bloom filter of the revoked jtis in front of the table:
+
+- Not in the filter (nearly every request): not revoked, answered in
+  memory in microseconds
+- In the filter: confirmed with one primary key lookup (the filter has a
+  small false positive rate, never false negatives)
+- Every REVOKED_TOKEN_SYNC_SECONDS the filter picks up tokens revoked by
+  other workers (one indexed query on revoked_at)
+- Every REVOKED_TOKEN_REBUILD_SECONDS the filter is rebuilt from the live
+  rows, so it stays bounded (a fixed-size bit array sized by
+  REVOKED_TOKEN_BLOOM_CAPACITY). Checking a token never writes: expired rows
+  are purged as new tokens are revoked, or with `flask purge-revoked-tokens`
+"""
+
+import hashlib
+import itertools
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from api.models import db, RevokedToken
+
+# Re-read this far behind the last sync, so rows committed late (or stamped
+# by a server with a slightly different clock) aren't missed
+SYNC_OVERLAP = timedelta(seconds=30)
+
+# Expired rows are purged once every this many revocations (per worker)
+PURGE_EVERY = 100
+_revocations = itertools.count(1)
+
+
+# ===============================
+# 🌸 BLOOM FILTER
+# ===============================
+
+class BloomFilter:
+    """Fixed-size Bloom filter of strings."""
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        step = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * step) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self._bits[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(item))
+
+    def memory_bytes(self):
+        return len(self._bits)
+
+
+# ===============================
+# 🚫 REVOCATION STORE
+# ===============================
+
+class RevocationStore:
+    """revoked_tokens table with a per-worker Bloom filter in front of it."""
+
+    def __init__(self, capacity=100000, error_rate=0.001, sync_seconds=2, rebuild_seconds=3600):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_seconds = sync_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self.built_at = None
+        self._synced_at = None
+        self._watermark = None
+        self._lock = threading.Lock()
+        self._filter = BloomFilter(capacity, error_rate)
+        self._stats = {'checks': 0, 'filter_hits': 0, 'false_positives': 0, 'revoked': 0}
+
+    def rebuild(self):
+        """Reload the filter from the live (unexpired) rows."""
+        now = datetime.utcnow()
+        jtis = db.session.scalars(select(RevokedToken.jti).where(RevokedToken.expires_at > now)).all()
+        bloom = BloomFilter(max(self.capacity, len(jtis)), self.error_rate)
+        for jti in jtis:
+            bloom.add(jti)
+
+        with self._lock:
+            self._filter = bloom
+            self._watermark = now
+            self.built_at = self._synced_at = time.monotonic()
+
+    def sync(self):
+        """Add tokens revoked (by any worker) since the last sync."""
+        now = datetime.utcnow()
+        jtis = db.session.scalars(select(RevokedToken.jti).where(
+            RevokedToken.revoked_at >= self._watermark - SYNC_OVERLAP)).all()
+        with self._lock:
+            for jti in jtis:
+                if jti not in self._filter:
+                    self._filter.add(jti)
+            self._watermark = now
+            self._synced_at = time.monotonic()
+
+    def ensure_fresh(self):
+        now = time.monotonic()
+        if self.built_at is None or now - self.built_at > self.rebuild_seconds:
+            self.rebuild()
+        elif now - self._synced_at > self.sync_seconds:
+            self.sync()
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def is_revoked(self, jti):
+        """True if the token with this jti was revoked."""
+        self.ensure_fresh()
+        self._count('checks')
+        if jti not in self._filter:
+            return False
+
+        self._count('filter_hits')
+        revoked = db.session.get(RevokedToken, jti) is not None
+        if not revoked:
+            self._count('false_positives')
+        return revoked
+
+    def revoke(self, jwt_payload):
+        """Revoke a decoded token until it expires (commits)."""
+        jti = jwt_payload['jti']
+        expires = jwt_payload.get('exp')
+        expires_at = (datetime.utcfromtimestamp(expires) if expires
+                      else datetime.utcnow() + timedelta(days=30))
+        subject = jwt_payload.get('sub')
+
+        dialect = postgresql if db.session.get_bind().dialect.name == 'postgresql' else sqlite
+        db.session.execute(dialect.insert(RevokedToken).values(
+            jti=jti,
+            user_id=int(subject) if str(subject).isdigit() else None,
+            token_type=jwt_payload.get('type', 'access'),
+            revoked_at=datetime.utcnow(),
+            expires_at=expires_at
+        ).on_conflict_do_nothing(index_elements=[RevokedToken.jti]))
+        db.session.commit()
+
+        with self._lock:
+            self._filter.add(jti)
+            self._stats['revoked'] += 1
+
+        if next(_revocations) % PURGE_EVERY == 0:
+            purge_expired()
+
+    def stats(self):
+        with self._lock:
+            bloom = self._filter
+            return dict(self._stats,
+                        filter_entries=bloom.count,
+                        filter_bytes=bloom.memory_bytes(),
+                        filter_hashes=bloom.hashes)
+
+
+def purge_expired(now=None):
+    """
+    Delete rows for tokens that have expired anyway.
+    Returns: number of rows deleted
+    """
+    result = db.session.execute(delete(RevokedToken).where(
+        RevokedToken.expires_at <= (now or datetime.utcnow())))
+    db.session.commit()
+    return result.rowcount
+
+
+# Process-wide store used by the JWT blocklist loader and /logout
+revocation_store = RevocationStore(
+    capacity=int(os.getenv('REVOKED_TOKEN_BLOOM_CAPACITY', 100000)),
+    sync_seconds=int(os.getenv('REVOKED_TOKEN_SYNC_SECONDS', 2)),
+    rebuild_seconds=int(os.getenv('REVOKED_TOKEN_REBUILD_SECONDS', 3600)))
@@ -4,10 +4,17 @@ Main API routes for PixelPlay application - UPDATED with Centralized Stat Tracki
 General endpoints for stats, dashboard, and user data using the new system.
 """
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime, date
-from api.models import db, User, UserProgress, UserGameStats, GameSession, UserAchievement
+from sqlalchemy import func, select
+from datetime import datetime, date, timedelta
+from api.models import db, UserProgress, GameSessionDaily, UserAchievement
+from api.leaderboard import leaderboard, leaderboard_cache, LEADERBOARD_TYPES, CACHE_WINDOW
+from api.dashboard import get_snapshot, build_stats, check_consistency
+from api.idempotency import idempotent
+from api.identity import current_user
+from api.stats_token import issue_stats_token, read_stats_token
+from api.user_search import normalize, find_users, MIN_QUERY_LENGTH, MAX_QUERY_LENGTH
 
 # Create main API blueprint
 api = Blueprint('api', __name__)
@@ -23,58 +30,37 @@ def get_dashboard_stats():
     """
     🎯 MAIN DASHBOARD ENDPOINT
     Get all stats for displaying on dashboard/homepage.
-    Returns comprehensive data from User, UserProgress, and UserGameStats.
+    Served from the user's dashboard snapshot (one primary-key read), which
+    is kept up to date whenever User, UserProgress, UserGameStats or their
+    game sessions change.
+
+    Query params:
+        - verify: true to also compare the snapshot against a full recompute
     """
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user_id = int(get_jwt_identity())
+        payload = get_snapshot(user_id)
 
-        if not user:
+        if payload is None:
             return jsonify({
                 'success': False,
                 'message': 'User not found'
             }), 404
 
-        # Get related stats
-        progress = user.progress or UserProgress(user_id=user_id)
-        game_stats = user.game_stats or UserGameStats(user_id=user_id)
-
-        # Get recent game sessions
-        recent_sessions = GameSession.query.filter_by(user_id=user_id)\
-            .order_by(GameSession.played_at.desc())\
-            .limit(5)\
-            .all()
-
-        return jsonify({
+        response = {
             'success': True,
-            'stats': {
-                # 👤 User stats (PRIMARY)
-                'level': user.level,
-                'xp': user.xp,
-                'coins': user.coins,
-                'streak_days': user.streak_days,
-                'last_activity': user.last_activity.isoformat() if user.last_activity else None,
-                'last_activity_date': user.last_activity_date.isoformat() if user.last_activity_date else None,
-
-                # 📊 Activity counts
-                'total_games_played': progress.total_games_played,
-                'workouts_completed': progress.workouts_completed,
-                'items_unlocked': progress.items_unlocked,
-                'avatars_created': progress.avatars_created,
-
-                # 🎮 Game-specific
-                'completed_games': game_stats.completed_games or [],
-                'favorite_games': game_stats.favorite_games or [],
-                'unlocked_games': game_stats.unlocked_games or [],
-
-                # 🎁 Daily rewards
-                'can_claim_daily_reward': progress.can_claim_daily_reward(),
-                'daily_reward_streak': progress.daily_reward_streak,
-
-                # 📈 Recent activity
-                'recent_sessions': [s.serialize() for s in recent_sessions]
+            'stats': build_stats(payload)
+        }
+
+        # 🔍 Consistency check mode
+        if request.args.get('verify', '').lower() in ('1', 'true', 'yes'):
+            mismatches = check_consistency(user_id)
+            response['consistency'] = {
+                'consistent': not mismatches,
+                'mismatches': mismatches
             }
-        }), 200
+
+        return jsonify(response), 200
 
     except Exception as e:
         print(f"❌ Error fetching dashboard stats: {e}")
@@ -90,10 +76,20 @@ def get_stats_summary():
     """
     Get a quick summary of user stats.
     Useful for displaying in headers/navbars.
+
+    With a valid X-Stats-Token the navbar stats (level, xp, coins,
+    streak_days) are answered from the token without reading the database.
     """
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        stats = read_stats_token(user_id)
+        if stats is not None:
+            return jsonify({
+                'success': True,
+                'summary': stats
+            }), 200
+
+        user = current_user()
 
         if not user:
             return jsonify({
@@ -106,7 +102,8 @@ def get_stats_summary():
 
         return jsonify({
             'success': True,
-            'summary': stats
+            'summary': stats,
+            'stats_token': issue_stats_token(user)
         }), 200
 
     except Exception as e:
@@ -127,7 +124,7 @@ def get_profile():
     """Get current user's complete profile."""
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = current_user()
 
         if not user:
             return jsonify({
@@ -183,8 +180,7 @@ def get_profile():
 def update_profile():
     """Update user profile information."""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = current_user()
 
         if not user:
             return jsonify({
@@ -230,59 +226,142 @@ def update_profile():
 # 📊 LEADERBOARD ENDPOINTS
 # ===============================
 
+# Most neighbors (above and below) returned by /leaderboard/me
+MAX_LEADERBOARD_NEIGHBORS = 25
+
+
+def format_leaderboard_entry(entry):
+    """Public leaderboard row for an index entry."""
+    return {
+        'rank': entry['rank'],
+        'username': entry['username'] or f"User{entry['user_id']}",
+        'level': entry['level'],
+        'xp': entry['xp'],
+        'streak_days': entry['streak_days'],
+        'total_games_played': entry['total_games_played'] or 0,
+        'workouts_completed': entry['workouts_completed']
+    }
+
+
 @api.route('/leaderboard', methods=['GET'])
 def get_leaderboard():
     """
     Get leaderboard of top users.
     Public endpoint (no auth required).
+    Served from the in-memory leaderboard index (no users table sort), with
+    the serialized response cached per (type, limit) and an ETag so clients
+    can revalidate with If-None-Match and get a 304.
     """
     try:
         # Get leaderboard type from query params
         leaderboard_type = request.args.get(
             'type', 'level')  # level, xp, streak, games
         limit = request.args.get('limit', 10, type=int)
-        limit = min(limit, 100)  # Max 100 users
-
-        # Query based on type
-        if leaderboard_type == 'level':
-            users = User.query.order_by(
-                User.level.desc(), User.xp.desc()).limit(limit).all()
-        elif leaderboard_type == 'xp':
-            users = User.query.order_by(User.xp.desc()).limit(limit).all()
-        elif leaderboard_type == 'streak':
-            users = User.query.order_by(
-                User.streak_days.desc()).limit(limit).all()
-        elif leaderboard_type == 'games':
-            # Join with UserProgress to get games played
-            users = db.session.query(User).join(UserProgress)\
-                .order_by(UserProgress.total_games_played.desc())\
-                .limit(limit).all()
+        limit = max(1, min(limit, CACHE_WINDOW))  # 1 to 100 users
+
+        # Unknown types fall back to the level board (and share its cache entries)
+        board = leaderboard_type if leaderboard_type in LEADERBOARD_TYPES else 'level'
+
+        # Rebuilding (if due) invalidates the cache, so do it before the lookup
+        leaderboard.ensure_fresh()
+
+        def build_body():
+            leaderboard_rows = [format_leaderboard_entry(entry)
+                                for entry in leaderboard.top(board, limit)]
+            return current_app.json.dumps({
+                'success': True,
+                'leaderboard': leaderboard_rows,
+                'type': board,
+                'total_users': len(leaderboard_rows)
+            }).encode()
+
+        etag, body = leaderboard_cache.get_or_build((board, limit), build_body)
+
+        if etag in request.if_none_match:
+            leaderboard_cache.record_not_modified()
+            response = Response(status=304)
         else:
-            users = User.query.order_by(User.level.desc()).limit(limit).all()
+            response = Response(body, status=200, mimetype='application/json')
+
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.no_cache = True  # Always revalidate (cheap 304s)
+        return response
+
+    except Exception as e:
+        print(f"❌ Error fetching leaderboard: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'Error: {str(e)}'
+        }), 500
+
+
+@api.route('/leaderboard/cache-stats', methods=['GET'])
+def get_leaderboard_cache_stats():
+    """
+    Hit/miss/evict counters for the leaderboard response cache (this worker).
+    Public endpoint (no auth required).
+    """
+    try:
+        return jsonify({
+            'success': True,
+            'cache': leaderboard_cache.stats()
+        }), 200
 
-        # Format leaderboard
-        leaderboard = []
-        for rank, user in enumerate(users, start=1):
-            progress = user.progress or UserProgress(user_id=user.id)
-            leaderboard.append({
+    except Exception as e:
+        print(f"❌ Error fetching cache stats: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'Error: {str(e)}'
+        }), 500
+
+
+@api.route('/leaderboard/me', methods=['GET'])
+@jwt_required()
+def get_my_rank():
+    """
+    Get the current user's rank plus the users right above and below them.
+    Covers every leaderboard type unless ?type= is given.
+    Uses the order-statistic leaderboard index (O(log n), no table scan).
+
+    Query params:
+        - type: level, xp, streak or games (default: all)
+        - neighbors: users to include above and below (default 2, max 25)
+    """
+    try:
+        user_id = int(get_jwt_identity())
+        leaderboard_type = request.args.get('type')
+        neighbors = request.args.get('neighbors', 2, type=int)
+        neighbors = max(0, min(neighbors, MAX_LEADERBOARD_NEIGHBORS))
+
+        if leaderboard_type and leaderboard_type not in LEADERBOARD_TYPES:
+            return jsonify({
+                'success': False,
+                'message': f"type must be one of: {', '.join(LEADERBOARD_TYPES)}"
+            }), 400
+
+        leaderboard.ensure_fresh()
+
+        boards = {}
+        for board in ([leaderboard_type] if leaderboard_type else LEADERBOARD_TYPES):
+            rank, entries = leaderboard.around(board, user_id, neighbors)
+            boards[board] = {
                 'rank': rank,
-                'username': user.username or f'User{user.id}',
-                'level': user.level,
-                'xp': user.xp,
-                'streak_days': user.streak_days,
-                'total_games_played': progress.total_games_played,
-                'workouts_completed': progress.workouts_completed
-            })
+                'total_users': leaderboard.size(board),
+                'neighbors': [
+                    dict(format_leaderboard_entry(entry),
+                         is_me=entry['user_id'] == user_id)
+                    for entry in entries
+                ]
+            }
 
         return jsonify({
             'success': True,
-            'leaderboard': leaderboard,
-            'type': leaderboard_type,
-            'total_users': len(leaderboard)
+            'leaderboards': boards
         }), 200
 
     except Exception as e:
-        print(f"❌ Error fetching leaderboard: {e}")
+        print(f"❌ Error fetching rank: {e}")
         return jsonify({
             'success': False,
             'message': f'Error: {str(e)}'
@@ -295,6 +374,7 @@ def get_leaderboard():
 
 @api.route('/rewards/daily', methods=['POST'])
 @jwt_required()
+@idempotent
 def claim_daily_reward():
     """
     Claim daily login reward.
@@ -302,7 +382,7 @@ def claim_daily_reward():
     """
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = current_user()
         progress = user.progress or UserProgress(user_id=user_id)
         if not progress.user_id:
             db.session.add(progress)
@@ -343,7 +423,7 @@ def get_reward_status():
     """Check if daily reward can be claimed."""
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = current_user()
         progress = user.progress or UserProgress(user_id=user_id)
 
         return jsonify({
@@ -365,46 +445,119 @@ def get_reward_status():
 # 📈 ANALYTICS ENDPOINTS
 # ===============================
 
+# Supported ?days= windows for /analytics/activity
+ANALYTICS_WINDOWS = (7, 30, 90, 365)
+
+# Windows this long (or longer) are streamed instead of built in memory
+STREAM_WINDOW_DAYS = 90
+
+
+def daily_activity(user_id, since):
+    """
+    Per-day session totals for a user, read from the game_session_daily
+    rollup (one row per game per day, so cost scales with days, not plays).
+    Yields: (day 'YYYY-MM-DD', sessions, xp_earned, minutes_played, score_sum)
+    """
+    rows = db.session.execute(
+        select(
+            GameSessionDaily.day,
+            func.sum(GameSessionDaily.sessions),
+            func.sum(GameSessionDaily.xp_earned),
+            func.sum(GameSessionDaily.minutes_played),
+            func.sum(GameSessionDaily.score_sum)
+        )
+        .where(GameSessionDaily.user_id == user_id, GameSessionDaily.day >= since)
+        .group_by(GameSessionDaily.day)
+        .order_by(GameSessionDaily.day)
+        .execution_options(stream_results=True, yield_per=100)
+    )
+    for day, sessions, xp_earned, minutes_played, score_sum in rows:
+        yield day.isoformat(), sessions, xp_earned, minutes_played, score_sum
+
+
+def stream_activity_analytics(user_id, since, days):
+    """
+    Stream the /analytics/activity JSON one day at a time.
+    Totals are accumulated while the days go out and written at the end.
+    """
+    dumps = current_app.json.dumps
+    totals = {'sessions': 0, 'xp': 0, 'minutes': 0, 'score': 0}
+
+    yield '{"analytics": {"activity_by_date": {'
+    rows = daily_activity(user_id, since)
+    for i, (day, sessions, xp_earned, minutes_played, score_sum) in enumerate(rows):
+        totals['sessions'] += sessions
+        totals['xp'] += xp_earned
+        totals['minutes'] += minutes_played
+        totals['score'] += score_sum
+        yield ('' if i == 0 else ', ') + dumps(day) + ': ' + dumps({
+            'sessions': sessions,
+            'xp_earned': xp_earned,
+            'minutes_played': minutes_played
+        })
+
+    average_score = totals['score'] / totals['sessions'] if totals['sessions'] else 0
+    # Close activity_by_date, then splice the totals object's members in
+    yield '}, ' + dumps({
+        'days': days,
+        'total_sessions': totals['sessions'],
+        'total_xp_earned': totals['xp'],
+        'total_minutes_played': totals['minutes'],
+        'average_score': round(average_score, 2)
+    })[1:] + ', "success": true}'
+
+
 @api.route('/analytics/activity', methods=['GET'])
 @jwt_required()
 def get_activity_analytics():
-    """Get user activity analytics."""
+    """
+    Get user activity analytics.
+    Reads the daily session rollup; totals are added up from the daily rows.
+
+    Query params:
+        - days: window size, one of 7, 30, 90, 365 (default 30).
+          Windows of 90+ days are streamed.
+    """
     try:
         user_id = get_jwt_identity()
+        days = request.args.get('days', 30, type=int)
 
-        # Get sessions from last 30 days
-        from datetime import timedelta
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
+        if days not in ANALYTICS_WINDOWS:
+            return jsonify({
+                'success': False,
+                'message': f"days must be one of: {', '.join(str(w) for w in ANALYTICS_WINDOWS)}"
+            }), 400
 
-        sessions = GameSession.query.filter(
-            GameSession.user_id == user_id,
-            GameSession.played_at >= thirty_days_ago
-        ).order_by(GameSession.played_at.desc()).all()
+        # Whole days: today plus the days - 1 before it
+        since = datetime.utcnow().date() - timedelta(days=days - 1)
 
-        # Calculate stats
-        total_sessions = len(sessions)
-        total_xp = sum(s.xp_earned for s in sessions)
-        total_minutes = sum(s.duration_minutes for s in sessions)
-        avg_score = sum(s.score for s in sessions) / \
-            total_sessions if total_sessions > 0 else 0
+        # 🌊 Long windows: stream day by day
+        if days >= STREAM_WINDOW_DAYS:
+            return Response(
+                stream_with_context(stream_activity_analytics(user_id, since, days)),
+                status=200,
+                mimetype='application/json'
+            )
 
-        # Group by date
         activity_by_date = {}
-        for session in sessions:
-            date_key = session.played_at.date().isoformat()
-            if date_key not in activity_by_date:
-                activity_by_date[date_key] = {
-                    'sessions': 0,
-                    'xp_earned': 0,
-                    'minutes_played': 0
-                }
-            activity_by_date[date_key]['sessions'] += 1
-            activity_by_date[date_key]['xp_earned'] += session.xp_earned
-            activity_by_date[date_key]['minutes_played'] += session.duration_minutes
+        total_sessions = total_xp = total_minutes = total_score = 0
+        for day, sessions, xp_earned, minutes_played, score_sum in daily_activity(user_id, since):
+            activity_by_date[day] = {
+                'sessions': sessions,
+                'xp_earned': xp_earned,
+                'minutes_played': minutes_played
+            }
+            total_sessions += sessions
+            total_xp += xp_earned
+            total_minutes += minutes_played
+            total_score += score_sum
+
+        avg_score = total_score / total_sessions if total_sessions > 0 else 0
 
         return jsonify({
             'success': True,
             'analytics': {
+                'days': days,
                 'total_sessions': total_sessions,
                 'total_xp_earned': total_xp,
                 'total_minutes_played': total_minutes,
@@ -458,29 +611,28 @@ def health_check():
 @api.route('/search/users', methods=['GET'])
 @jwt_required()
 def search_users():
-    """Search for users by username."""
+    """
+    Search for users by username (case-insensitive).
+    Ranked exact > prefix > substring match; limit is capped at 50.
+    Uses indexes / an in-memory index and caches recent queries (api/user_search.py).
+    """
     try:
-        query = request.args.get('q', '')
+        query = normalize(request.args.get('q', ''))
         limit = request.args.get('limit', 10, type=int)
 
-        if not query or len(query) < 2:
+        if len(query) < MIN_QUERY_LENGTH:
             return jsonify({
                 'success': False,
                 'message': 'Query must be at least 2 characters'
             }), 400
+        if len(query) > MAX_QUERY_LENGTH:
+            return jsonify({
+                'success': False,
+                'message': f'Query must be at most {MAX_QUERY_LENGTH} characters'
+            }), 400
 
         # Search users
-        users = User.query.filter(
-            User.username.ilike(f'%{query}%')
-        ).limit(limit).all()
-
-        results = [{
-            'id': user.id,
-            'username': user.username,
-            'level': user.level,
-            'avatar_seed': user.avatar_seed,
-            'avatar_style': user.avatar_style
-        } for user in users]
+        results = find_users(query, limit)
 
         return jsonify({
             'success': True,
@@ -506,6 +658,8 @@ def search_users():
 1. Get dashboard stats:
    GET /api/dashboard/stats
    Returns: Complete stats for homepage/dashboard
+   GET /api/dashboard/stats?verify=true
+   Returns: Same, plus a snapshot vs. full recompute consistency report
 
 2. Get quick summary:
    GET /api/stats/summary
@@ -521,11 +675,14 @@ def search_users():
 
 5. View leaderboard:
    GET /api/leaderboard?type=level&limit=10
-   Returns: Top 10 users by level
+   Returns: Top 10 users by level (send If-None-Match with the ETag to get a 304)
+
+   GET /api/leaderboard/me?type=xp&neighbors=3
+   Returns: Your XP rank + the 3 users above and below you
 
 6. Get activity analytics:
-   GET /api/analytics/activity
-   Returns: 30-day activity breakdown
+   GET /api/analytics/activity?days=90
+   Returns: Day-by-day activity breakdown (days: 7, 30, 90 or 365; default 30)
 
 All endpoints use the centralized stat tracking system from models_updated.py
 """
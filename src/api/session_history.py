@@ -0,0 +1,139 @@
+# src/api/session_history.py
+"""
+Game session history for PixelPlay.
+Sessions are read newest first in keyset pages over (played_at, id): each
+page continues strictly after the last (played_at, id) of the previous one,
+so it is one range scan of ix_game_sessions_user_played_at however deep the
+client has paged (no OFFSET, and nothing loaded beyond the page).
+
+The cursor handed to clients is that last (played_at, id) pair, base64
+encoded. iter_history() walks the same pages as a generator, for streaming a
+user's whole history one page at a time.
+"""
+
+import base64
+from collections import namedtuple
+from datetime import datetime
+from sqlalchemy import select, tuple_
+from api.models import db, GameSession
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+HistoryFilters = namedtuple('HistoryFilters', ['game_id', 'since', 'until', 'completed'])
+NO_FILTERS = HistoryFilters(None, None, None, None)
+
+_COLUMNS = (GameSession.id, GameSession.user_id, GameSession.game_id, GameSession.score,
+            GameSession.duration_minutes, GameSession.xp_earned, GameSession.completed,
+            GameSession.played_at)
+
+
+# ===============================
+# 🔧 CURSORS & PARAMETERS
+# ===============================
+
+def page_size(limit):
+    """Clamp a requested page size to 1..MAX_PAGE_SIZE."""
+    return max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+
+
+def encode_cursor(played_at, session_id):
+    raw = f'{played_at.isoformat()}|{session_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(played_at, id) from a cursor. Raises ValueError if it's malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        played_at, session_id = raw.split('|')
+        return datetime.fromisoformat(played_at), int(session_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def parse_filters(args):
+    """
+    HistoryFilters from query params: game_id, from / to (ISO dates or
+    datetimes; a plain `to` date includes that whole day) and completed
+    (true/false). Raises ValueError for values that don't parse.
+    """
+    since = until = completed = None
+    if args.get('from'):
+        since = datetime.fromisoformat(args['from'])
+    if args.get('to'):
+        until = datetime.fromisoformat(args['to'])
+        if len(args['to']) == 10:
+            until = until.replace(hour=23, minute=59, second=59, microsecond=999999)
+    if args.get('completed'):
+        value = args['completed'].lower()
+        if value not in ('true', 'false'):
+            raise ValueError('completed must be true or false')
+        completed = value == 'true'
+    return HistoryFilters(args.get('game_id') or None, since, until, completed)
+
+
+# ===============================
+# 📜 PAGES
+# ===============================
+
+def _serialize(row):
+    """Same shape as GameSession.serialize(), from a column row."""
+    return {
+        'id': row.id,
+        'user_id': row.user_id,
+        'game_id': row.game_id,
+        'score': row.score,
+        'duration_minutes': row.duration_minutes,
+        'xp_earned': row.xp_earned,
+        'completed': row.completed,
+        'played_at': row.played_at.isoformat()
+    }
+
+
+def history_query(user_id, filters=NO_FILTERS, after=None):
+    """Newest-first sessions for a user, continuing after an (played_at, id) key."""
+    query = (
+        select(*_COLUMNS)
+        .where(GameSession.user_id == user_id, GameSession.played_at.is_not(None))
+        .order_by(GameSession.played_at.desc(), GameSession.id.desc())
+    )
+    if filters.game_id is not None:
+        query = query.where(GameSession.game_id == filters.game_id)
+    if filters.since is not None:
+        query = query.where(GameSession.played_at >= filters.since)
+    if filters.until is not None:
+        query = query.where(GameSession.played_at <= filters.until)
+    if filters.completed is not None:
+        query = query.where(GameSession.completed.is_(filters.completed))
+    if after is not None:
+        query = query.where(tuple_(GameSession.played_at, GameSession.id) < tuple_(*after))
+    return query
+
+
+def history_page(user_id, filters=NO_FILTERS, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    One page of a user's session history.
+    Returns: (sessions, next_cursor) - next_cursor is None on the last page
+    """
+    limit = page_size(limit)
+    after = decode_cursor(cursor) if cursor else None
+    # One extra row tells us whether there is a next page
+    rows = db.session.execute(history_query(user_id, filters, after).limit(limit + 1)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].played_at, rows[-1].id)
+    return [_serialize(row) for row in rows], next_cursor
+
+
+def iter_history(user_id, filters=NO_FILTERS, limit=MAX_PAGE_SIZE):
+    """Yield a user's whole (filtered) history, one page of sessions at a time."""
+    cursor = None
+    while True:
+        sessions, cursor = history_page(user_id, filters, cursor, limit)
+        if sessions:
+            yield sessions
+        if cursor is None:
+            return
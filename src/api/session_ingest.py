@@ -0,0 +1,345 @@
+# src/api/session_ingest.py
+"""
+Game session ingest engine for PixelPlay.
+Records a finished game session and every stat it touches (User, UserProgress,
+UserGameStats, Game) as one batch of INSERT ... ON CONFLICT / UPDATE ...
+RETURNING statements, so the end-of-round write path never SELECTs first.
+
+The leveling and streak rules are the same ones used by User.add_xp and
+User.update_streak, just expressed as SQL so the database applies them
+atomically against the current row values.
+"""
+
+import sqlite3
+from datetime import datetime, date, timedelta
+from sqlalchemy import insert, update, case, bindparam
+from sqlalchemy.dialects import postgresql, sqlite
+from api.models import (db, User, UserProgress, UserGameStats, UserGameFlag, GameSession,
+                        Game, GameSessionDaily)
+from api.leaderboard import stage_update
+from api.dashboard import mark_dirty, patch_snapshot, progress_section
+from api.game_catalog import forget_user_games
+from api.coins import record_change
+from api.events import emit, GamePlayed, LevelUp, StreakChanged
+
+
+# ===============================
+# 🔧 DIALECT HELPERS
+# ===============================
+
+def _dialect_name():
+    return db.session.get_bind().dialect.name
+
+
+def supports_single_round_trip():
+    """
+    Check if the current database supports INSERT ... ON CONFLICT ... RETURNING.
+    PostgreSQL always does; SQLite needs 3.35+.
+    """
+    name = _dialect_name()
+    if name == 'postgresql':
+        return True
+    if name == 'sqlite':
+        return sqlite3.sqlite_version_info >= (3, 35, 0)
+    return False
+
+
+def _upsert(model):
+    """Dialect-specific INSERT that supports on_conflict_do_update()."""
+    if _dialect_name() == 'postgresql':
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
+# ===============================
+# 🎯 STAT RULES AS SQL
+# ===============================
+
+def user_xp_update(user_id, xp_amount, today=None, now=None):
+    """
+    Build the UPDATE users ... RETURNING statement for an XP award.
+    Same rules as User.add_xp() + User.update_streak(), evaluated in SQL.
+    """
+    today = today or date.today()
+    now = now or datetime.utcnow()
+
+    new_xp = User.xp + xp_amount
+    earned_level = new_xp // User.XP_PER_LEVEL + 1
+    leveled = earned_level > User.level
+
+    new_streak = case(
+        (User.last_activity_date.is_(None), 1),
+        (User.last_activity_date == today, User.streak_days),
+        (User.last_activity_date == today - timedelta(days=1), User.streak_days + 1),
+        else_=1
+    )
+
+    return update(User).where(User.id == user_id).values(
+        xp=new_xp,
+        level=case((leveled, earned_level), else_=User.level),
+        coins=User.coins + case(
+            (leveled, (earned_level - User.level) * User.COINS_PER_LEVEL), else_=0),
+        streak_days=new_streak,
+        last_activity_date=today,
+        last_activity=now,
+        updated_at=now
+    ).returning(User.level, User.xp, User.coins, User.streak_days)
+
+
+def level_up_result(row, xp_amount):
+    """
+    Turn a RETURNING row from user_xp_update() into add_xp()'s return values.
+    The previous level is derived from the previous XP, which holds because
+    add_xp() keeps level == xp // XP_PER_LEVEL + 1 once any XP is earned.
+    """
+    if row is None:
+        return False, 1, 0
+    previous_level = min(row.level, (row.xp - xp_amount) // User.XP_PER_LEVEL + 1)
+    if row.level > previous_level:
+        return True, row.level, (row.level - previous_level) * User.COINS_PER_LEVEL
+    return False, row.level, 0
+
+
+# ===============================
+# ⚡ SESSION INGEST
+# ===============================
+
+def ingest_sessions(user_id, sessions, return_ids=False):
+    """
+    Record a batch of game sessions for one user and fold all of their stat
+    changes into a single write per affected row.
+
+    Args:
+        user_id: User ID
+        sessions: list of dicts with game_id, score, duration_minutes,
+                  xp_earned and completed
+        return_ids: also return the new session ids (adds RETURNING, which
+                    SQLite can only do row by row)
+
+    Statements (no SELECTs):
+        1. INSERT game_sessions (executemany)
+        2. UPDATE users (xp, level, coins, streak) ... RETURNING stats
+           (+ a coin_ledger row when the user levels up)
+        3. INSERT user_progress ... ON CONFLICT DO UPDATE ... RETURNING progress
+        4. INSERT user_game_stats ... ON CONFLICT DO UPDATE
+           (+ INSERT user_game_flags ... ON CONFLICT DO NOTHING for completions)
+        5. UPDATE games (executemany, one row per game played)
+        6. INSERT game_session_daily ... ON CONFLICT DO UPDATE (executemany)
+        At commit the dashboard snapshot is patched from the values above
+        (one primary-key read + one UPDATE, see api/dashboard.py)
+
+    Returns:
+        dict with folded rewards and 'user_stats' (+ 'session_ids')
+    """
+    now = datetime.utcnow()
+    today = date.today()
+    played = len(sessions)
+
+    # Fold the batch: total XP, completed games and best score per game
+    total_xp = sum(s['xp_earned'] for s in sessions)
+    completed_games = []
+    games = {}
+    for s in sessions:
+        if s['completed'] and s['game_id'] not in completed_games:
+            completed_games.append(s['game_id'])
+        plays, best = games.get(s['game_id'], (0, 0))
+        games[s['game_id']] = (plays + 1, max(best, s['score']))
+
+    # 1. Session rows (one executemany; RETURNING only when ids are wanted)
+    session_rows = [{
+        'user_id': user_id,
+        'game_id': s['game_id'],
+        'score': s['score'],
+        'duration_minutes': s['duration_minutes'],
+        'xp_earned': s['xp_earned'],
+        'completed': s['completed'],
+        'played_at': now
+    } for s in sessions]
+    if return_ids:
+        session_ids = db.session.scalars(
+            insert(GameSession).returning(GameSession.id, sort_by_parameter_order=True),
+            session_rows
+        ).all()
+    else:
+        db.session.execute(insert(GameSession), session_rows)
+        session_ids = None
+
+    # 2. XP, level, coins and streak on the user (add_xp rules, summed XP)
+    user_row = db.session.execute(user_xp_update(user_id, total_xp, today=today, now=now)).first()
+    leveled_up, new_level, coins = level_up_result(user_row, total_xp)
+    balance = user_row.coins if user_row else 0
+    if coins:
+        # Level-up coins were added by the UPDATE above; record them (a level
+        # that already paid out gets its coins taken back)
+        payout = record_change(user_id, coins, balance, 'level_up', f'level_up:{new_level}', now)
+        balance = payout.balance
+        if payout.replayed:
+            coins = 0
+
+    # 3. Games played counter (the whole row comes back for the dashboard)
+    progress_insert = _upsert(UserProgress).values(
+        user_id=user_id, total_games_played=played, created_at=now, updated_at=now)
+    progress_row = db.session.execute(
+        progress_insert.on_conflict_do_update(
+            index_elements=[UserProgress.user_id],
+            set_={
+                'total_games_played': UserProgress.total_games_played + played,
+                'updated_at': now
+            }
+        ).returning(UserProgress.total_games_played, UserProgress.workouts_completed,
+                    UserProgress.items_unlocked, UserProgress.avatars_created,
+                    UserProgress.daily_reward_streak, UserProgress.last_daily_reward)
+    ).one()
+    total_games_played = progress_row.total_games_played
+
+    # 4. Game stats (legacy counter) + completed games (one flag row each)
+    stats_insert = _upsert(UserGameStats).values(
+        user_id=user_id,
+        total_games_played=played,
+        created_at=now,
+        updated_at=now
+    )
+    db.session.execute(
+        stats_insert.on_conflict_do_update(
+            index_elements=[UserGameStats.user_id],
+            set_={
+                'total_games_played': UserGameStats.total_games_played + played,
+                'updated_at': now
+            }
+        )
+    )
+    if completed_games:
+        db.session.execute(
+            UserGameFlag.insert_ignore(),
+            [{'user_id': user_id, 'kind': 'completed', 'game_id': game_id, 'created_at': now}
+             for game_id in completed_games]
+        )
+
+    # 5. Per-game records (only the ones the user has)
+    games_table = Game.__table__
+    db.session.execute(
+        update(games_table)
+        .where(
+            games_table.c.user_id == user_id,
+            games_table.c.name == bindparam('game_name')
+        )
+        .values(
+            times_played=games_table.c.times_played + bindparam('plays'),
+            last_played=now,
+            personal_best=case(
+                (games_table.c.personal_best < bindparam('best'), bindparam('best')),
+                else_=games_table.c.personal_best
+            ),
+            updated_at=now
+        ),
+        [{'game_name': game_id, 'plays': plays, 'best': best}
+         for game_id, (plays, best) in games.items()]
+    )
+
+    # 6. Daily rollup (one row per game played today)
+    rollup_insert = _upsert(GameSessionDaily)
+    excluded = rollup_insert.excluded
+    db.session.execute(
+        rollup_insert.on_conflict_do_update(
+            index_elements=[GameSessionDaily.user_id, GameSessionDaily.game_id,
+                            GameSessionDaily.day],
+            set_={
+                'sessions': GameSessionDaily.sessions + excluded.sessions,
+                'xp_earned': GameSessionDaily.xp_earned + excluded.xp_earned,
+                'minutes_played': GameSessionDaily.minutes_played + excluded.minutes_played,
+                'score_sum': GameSessionDaily.score_sum + excluded.score_sum,
+                'score_max': case(
+                    (GameSessionDaily.score_max < excluded.score_max, excluded.score_max),
+                    else_=GameSessionDaily.score_max
+                ),
+                'completions': GameSessionDaily.completions + excluded.completions,
+                'updated_at': now
+            }
+        ),
+        [dict(row, updated_at=now) for row in GameSessionDaily.fold(user_id, sessions, now.date())]
+    )
+
+    if user_row:
+        stage_update(
+            user_id,
+            level=user_row.level,
+            xp=user_row.xp,
+            streak_days=user_row.streak_days,
+            total_games_played=total_games_played
+        )
+        emit(GamePlayed(user_id, total_games_played))
+        emit(StreakChanged(user_id, user_row.streak_days))
+        if leveled_up:
+            emit(LevelUp(user_id, new_level))
+    # Core statements skip the mapper events, so hand the dashboard what was
+    # just written (no recompute) and drop the cached GameHub progress
+    patch_snapshot(
+        user_id,
+        user={
+            'level': user_row.level,
+            'xp': user_row.xp,
+            'coins': balance,
+            'streak_days': user_row.streak_days,
+            'last_activity': now.isoformat(),
+            'last_activity_date': today.isoformat()
+        } if user_row else None,
+        progress=progress_section(progress_row._mapping),
+        new_sessions=[dict(row, id=session_id, played_at=now.isoformat())
+                      for row, session_id in zip(session_rows, session_ids)] if return_ids else (),
+        completed_games=completed_games
+    )
+    if not return_ids:
+        # Without ids the new sessions can't be listed; reload the recent ones
+        mark_dirty(user_id, 'recent_sessions')
+    forget_user_games(user_id)
+
+    db.session.commit()
+
+    result = {
+        'sessions_recorded': played,
+        'xp_earned': total_xp,
+        'leveled_up': leveled_up,
+        'new_level': new_level,
+        'coins_earned': coins,
+        'total_games_played': total_games_played,
+        'streak_days': user_row.streak_days if user_row else 0,
+        'user_stats': {
+            'level': user_row.level,
+            'xp': user_row.xp,
+            'coins': balance,
+            'streak_days': user_row.streak_days,
+            'total_games_played': total_games_played
+        } if user_row else None
+    }
+    if return_ids:
+        result['session_ids'] = session_ids
+
+    return result
+
+
+def ingest_session(user_id, game_id, score=0, duration_minutes=0, xp_earned=10, completed=False):
+    """
+    Record one game session (see ingest_sessions).
+
+    Returns:
+        Same dict as GameSession.record_session(), including 'user_stats'
+    """
+    result = ingest_sessions(user_id, [{
+        'game_id': game_id,
+        'score': score,
+        'duration_minutes': duration_minutes,
+        'xp_earned': xp_earned,
+        'completed': completed
+    }], return_ids=True)
+
+    return {
+        'session_id': result['session_ids'][0],
+        'score': score,
+        'xp_earned': xp_earned,
+        'leveled_up': result['leveled_up'],
+        'new_level': result['new_level'],
+        'coins_earned': result['coins_earned'],
+        'total_games_played': result['total_games_played'],
+        'streak_days': result['streak_days'],
+        'user_stats': result['user_stats']
+    }
@@ -0,0 +1,120 @@
+# src/api/stats_token.py
+"""
+Stats tokens for PixelPlay.
+The navbar polls /api/auth/verify-token and /api/stats/summary just to show
+level, xp, coins and streak. A stats token is a short-lived signed snapshot
+of those four numbers that the client sends back in the X-Stats-Token
+header, so those polls are answered without reading the database.
+
+- Issued next to the access token by /register, /login, /refresh and the
+  Google callback, and by verify-token / stats summary whenever they had to
+  read the database
+- Whenever a request changes the caller's stats, the response carries a
+  fresh token in the X-Stats-Token header. The new values come from the
+  dashboard snapshot refresh that already runs before the commit
+  (api/dashboard.py), so this costs no extra query
+- Signed with the JWT secret (itsdangerous, salt "stats-token") and only
+  accepted for the access token's own user, for STATS_TOKEN_SECONDS, and with
+  the current STATS_TOKEN_VERSION
+- Each worker remembers when it last committed a stats change for a user
+  and rejects tokens issued before that. A change committed by another
+  worker is picked up when the token expires at the latest.
+  STATS_TOKEN_SECONDS=0 turns stats tokens off
+"""
+
+import os
+import time
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from sqlalchemy import event
+from api.models import db
+from api.dashboard import COMMITTED_KEY
+from api.response_cache import InProcessLRUBackend
+
+HEADER = 'X-Stats-Token'
+SALT = 'stats-token'
+
+# Bump when the payload changes shape, so old tokens stop being accepted
+STATS_TOKEN_VERSION = 1
+STATS_FIELDS = ('level', 'xp', 'coins', 'streak_days')
+
+STATS_TOKEN_TTL = int(os.getenv('STATS_TOKEN_SECONDS', 120))
+
+# user id -> time.time() of the last stats change this worker committed
+changed_at = InProcessLRUBackend(max_entries=int(os.getenv('STATS_TOKEN_TRACKED_USERS', 10000)))
+
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.config['JWT_SECRET_KEY'], salt=SALT)
+
+
+def _sign(user_id, stats):
+    return _serializer().dumps({
+        'v': STATS_TOKEN_VERSION,
+        'sub': str(user_id),
+        'at': time.time(),
+        'stats': {field: stats[field] for field in STATS_FIELDS}
+    })
+
+
+def issue_stats_token(user):
+    """A stats token for a loaded User (None when stats tokens are off)."""
+    if not STATS_TOKEN_TTL:
+        return None
+    return _sign(user.id, {field: getattr(user, field) for field in STATS_FIELDS})
+
+
+def read_stats_token(user_id):
+    """
+    The stats from the request's X-Stats-Token, if it's valid, current and
+    belongs to user_id. Returns: {'level', 'xp', 'coins', 'streak_days'} or None
+    """
+    token = request.headers.get(HEADER)
+    if not token or not STATS_TOKEN_TTL:
+        return None
+    try:
+        payload = _serializer().loads(token, max_age=STATS_TOKEN_TTL)
+    except BadSignature:
+        return None
+
+    if payload.get('v') != STATS_TOKEN_VERSION or payload.get('sub') != str(user_id):
+        return None
+    # Issued before a stats change this worker committed: stale
+    if payload.get('at', 0) < (changed_at.get(str(user_id)) or 0):
+        return None
+    return payload['stats']
+
+
+def attach_stats_token(response):
+    """after_request: send a fresh token if this request changed the caller's stats."""
+    fresh = g.pop('_fresh_stats', None)
+    if not fresh:
+        return response
+    try:
+        user_id = get_jwt_identity()
+    except RuntimeError:
+        # Route without JWT verification
+        return response
+    stats = fresh.get(str(user_id)) if user_id is not None else None
+    if stats is not None:
+        response.headers[HEADER] = _sign(user_id, stats)
+    return response
+
+
+# ===============================
+# 🔄 TRACKING STAT CHANGES
+# ===============================
+
+@event.listens_for(db.session, 'after_commit')
+def _stats_committed(session):
+    committed = session.info.pop(COMMITTED_KEY, None)
+    if not committed or not STATS_TOKEN_TTL:
+        return
+
+    now = time.time()
+    for user_id in committed:
+        changed_at.set(str(user_id), now, STATS_TOKEN_TTL)
+    if has_request_context():
+        fresh = g.setdefault('_fresh_stats', {})
+        fresh.update((str(user_id), section) for user_id, section in committed.items())
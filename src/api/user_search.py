@@ -0,0 +1,297 @@
+# src/api/user_search.py
+"""
+Username search for PixelPlay (/api/search/users).
+Case-insensitive; results are ranked exact match > prefix match > substring
+match, then alphabetically, and capped at MAX_RESULTS.
+
+- Postgres: lower(username) is indexed twice (migration 9d4b6e2a7c15):
+  a "C" collated btree for the exact/prefix tiers (an ordered range scan
+  that stops at the limit) and a pg_trgm GIN index for the substring tier
+- SQLite (and any other database): an in-process sorted index of every
+  lowercased username plus every suffix of it, so prefix and substring
+  matches are both a bisect into a sorted list. Built at startup, kept up to
+  date after commit by the User mapper events and rebuilt every
+  USER_SEARCH_REBUILD_SECONDS for writes made by other workers
+- Recent queries are cached for USER_SEARCH_CACHE_SECONDS. A search box
+  sends one query per keystroke, so when a shorter query's cached result was
+  already complete (fewer than MAX_RESULTS matches) the longer query is
+  answered by filtering it, without touching the database or the index
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from sqlalchemy import event, func
+from sqlalchemy.orm import object_session
+from api.models import db, User
+from api.response_cache import InProcessLRUBackend
+
+MIN_QUERY_LENGTH = 2
+MAX_QUERY_LENGTH = 100
+MAX_RESULTS = 50
+# Substring candidates looked at before ranking (in-process index)
+MAX_CANDIDATES = 1000
+
+# Username changes for the current transaction: {user_id: new username or None}
+PENDING_KEY = 'user_search_pending'
+
+# Highest code point, used as the upper bound of a prefix range
+_END = '\U0010ffff'
+
+EXACT, PREFIX, SUBSTRING = 0, 1, 2
+
+
+def normalize(query):
+    return (query or '').strip().lower()
+
+
+def match_rank(name, query):
+    """EXACT/PREFIX/SUBSTRING for a lowercased name containing the query."""
+    if name == query:
+        return EXACT
+    return PREFIX if name.startswith(query) else SUBSTRING
+
+
+def _rank_key(name, query):
+    return (match_rank(name, query), name)
+
+
+def _like_escape(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+# ===============================
+# 🗂️ IN-PROCESS INDEX (SQLite)
+# ===============================
+
+class UsernameIndex:
+    """
+    Sorted (name, user_id) pairs for every lowercased username, and sorted
+    (suffix, user_id) pairs for every proper suffix of them.
+    """
+
+    def __init__(self, rebuild_seconds=300):
+        self.rebuild_seconds = rebuild_seconds
+        self.built_at = None
+        self._lock = threading.RLock()
+        self._names = {}
+        self._prefixes = []
+        self._suffixes = []
+
+    @staticmethod
+    def _suffixes_of(name, user_id):
+        return [(name[i:], user_id) for i in range(1, len(name))]
+
+    def rebuild(self):
+        """Reload every username from the database."""
+        rows = db.session.query(User.id, User.username).filter(User.username.is_not(None)).all()
+        names = {row.id: row.username.lower() for row in rows}
+        prefixes = sorted((name, user_id) for user_id, name in names.items())
+        suffixes = sorted(pair for user_id, name in names.items()
+                          for pair in self._suffixes_of(name, user_id))
+        with self._lock:
+            self._names, self._prefixes, self._suffixes = names, prefixes, suffixes
+            self.built_at = time.monotonic()
+
+    def ensure_fresh(self):
+        """Rebuild if never built or older than rebuild_seconds."""
+        if self.built_at is None or time.monotonic() - self.built_at > self.rebuild_seconds:
+            self.rebuild()
+
+    @staticmethod
+    def _remove(pairs, pair):
+        i = bisect_left(pairs, pair)
+        if i < len(pairs) and pairs[i] == pair:
+            del pairs[i]
+
+    @staticmethod
+    def _add(pairs, pair):
+        pairs.insert(bisect_left(pairs, pair), pair)
+
+    def apply(self, changes):
+        """Apply committed username changes: {user_id: username or None}."""
+        with self._lock:
+            for user_id, username in changes.items():
+                old = self._names.pop(user_id, None)
+                if old is not None:
+                    self._remove(self._prefixes, (old, user_id))
+                    for pair in self._suffixes_of(old, user_id):
+                        self._remove(self._suffixes, pair)
+                if username:
+                    name = username.lower()
+                    self._names[user_id] = name
+                    self._add(self._prefixes, (name, user_id))
+                    for pair in self._suffixes_of(name, user_id):
+                        self._add(self._suffixes, pair)
+
+    @staticmethod
+    def _range(pairs, query):
+        """Slice bounds of the pairs whose text starts with query."""
+        return bisect_left(pairs, (query,)), bisect_left(pairs, (query + _END,))
+
+    def search(self, query, limit):
+        """
+        Ranked user ids whose username contains query.
+        Returns: [user_id, ...]
+        """
+        with self._lock:
+            start, end = self._range(self._prefixes, query)
+            # Exact and prefix matches; in name order the exact match comes first
+            ranked = [user_id for _, user_id in self._prefixes[start:min(end, start + limit)]]
+            if len(ranked) >= limit:
+                return ranked
+
+            seen = set(ranked)
+            start, end = self._range(self._suffixes, query)
+            candidates = set()
+            for _, user_id in self._suffixes[start:end]:
+                if user_id not in seen:
+                    candidates.add(user_id)
+                    if len(candidates) >= MAX_CANDIDATES:
+                        break
+            ranked += sorted(candidates, key=self._names.get)[:limit - len(ranked)]
+            return ranked
+
+    def size(self):
+        with self._lock:
+            return len(self._names)
+
+
+# Process-wide index used when the database isn't Postgres
+username_index = UsernameIndex(
+    rebuild_seconds=int(os.getenv('USER_SEARCH_REBUILD_SECONDS', 300)))
+
+
+# ===============================
+# 🐘 POSTGRES SEARCH
+# ===============================
+
+def _postgres_search(query, limit):
+    """Ranked user ids, using the lower(username) btree and trigram indexes."""
+    name = func.lower(User.username)
+    # Byte order, as in ix_users_username_lower (so LIKE 'q%' is a range scan)
+    ordered = name.collate('C')
+    prefix = _like_escape(query) + '%'
+
+    # Exact + prefix: btree range scan in name order (exact match first),
+    # stops at the limit
+    ranked = [user_id for user_id, in db.session.query(User.id).filter(
+        ordered.like(prefix, escape='\\')
+    ).order_by(ordered).limit(limit)]
+    if len(ranked) >= limit:
+        return ranked
+
+    # Substring (not at the start): trigram index
+    substring_rows = db.session.query(User.id).filter(
+        name.like('%' + prefix, escape='\\'),
+        ~ordered.like(prefix, escape='\\')
+    ).order_by(ordered).limit(limit - len(ranked)).all()
+    return ranked + [user_id for user_id, in substring_rows]
+
+
+# ===============================
+# 🔍 SEARCH + CACHE
+# ===============================
+
+search_cache = InProcessLRUBackend(
+    max_entries=int(os.getenv('USER_SEARCH_CACHE_SIZE', 1024)))
+SEARCH_CACHE_TTL = int(os.getenv('USER_SEARCH_CACHE_SECONDS', 30))
+_NAMESPACE = 'user_search'
+
+
+def _cache_key(query):
+    return f'{_NAMESPACE}:{search_cache.generation(_NAMESPACE)}:{query}'
+
+
+def _load_results(user_ids):
+    """Result dicts for ranked user ids (one primary key lookup)."""
+    if not user_ids:
+        return []
+    users = {user.id: user for user in db.session.query(
+        User.id, User.username, User.level, User.avatar_seed, User.avatar_style
+    ).filter(User.id.in_(user_ids))}
+    return [{
+        'id': users[user_id].id,
+        'username': users[user_id].username,
+        'level': users[user_id].level,
+        'avatar_seed': users[user_id].avatar_seed,
+        'avatar_style': users[user_id].avatar_style
+    } for user_id in user_ids if user_id in users]
+
+
+def _from_shorter_query(query):
+    """
+    Results for query filtered out of a cached, complete result of one of
+    its prefixes (every username containing query also contains them).
+    """
+    for length in range(len(query) - 1, MIN_QUERY_LENGTH - 1, -1):
+        cached = search_cache.get(_cache_key(query[:length]))
+        if cached is not None and len(cached) < MAX_RESULTS:
+            matches = [result for result in cached if query in (result['username'] or '').lower()]
+            return sorted(matches, key=lambda result: _rank_key(result['username'].lower(), query))
+    return None
+
+
+def find_users(query, limit=10):
+    """
+    Ranked users whose username contains query (case-insensitive).
+    query must already be normalized; limit is capped at MAX_RESULTS.
+    Returns: [{'id', 'username', 'level', 'avatar_seed', 'avatar_style'}, ...]
+    """
+    limit = max(1, min(limit, MAX_RESULTS))
+    key = _cache_key(query)
+    results = search_cache.get(key)
+    if results is not None:
+        return results[:limit]
+
+    results = _from_shorter_query(query)
+    if results is None:
+        if db.session.get_bind().dialect.name == 'postgresql':
+            user_ids = _postgres_search(query, MAX_RESULTS)
+        else:
+            username_index.ensure_fresh()
+            user_ids = username_index.search(query, MAX_RESULTS)
+        results = _load_results(user_ids)
+    search_cache.set(key, results, SEARCH_CACHE_TTL)
+    return results[:limit]
+
+
+# ===============================
+# 🔄 KEEPING THE INDEX IN SYNC
+# ===============================
+
+def _stage(user):
+    session = object_session(user) or db.session
+    session.info.setdefault(PENDING_KEY, {})[user.id] = user.username
+
+
+@event.listens_for(User, 'after_insert')
+def _user_created(mapper, connection, user):
+    _stage(user)
+
+
+@event.listens_for(User, 'after_update')
+def _user_updated(mapper, connection, user):
+    if db.inspect(user).attrs.username.history.has_changes():
+        _stage(user)
+
+
+@event.listens_for(User, 'after_delete')
+def _user_deleted(mapper, connection, user):
+    session = object_session(user) or db.session
+    session.info.setdefault(PENDING_KEY, {})[user.id] = None
+
+
+@event.listens_for(db.session, 'after_commit')
+def _apply_pending(session):
+    pending = session.info.pop(PENDING_KEY, None)
+    if pending:
+        if username_index.built_at is not None:
+            username_index.apply(pending)
+        search_cache.bump_generation(_NAMESPACE)
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _discard_pending(session, previous_transaction):
+    session.info.pop(PENDING_KEY, None)
@@ -25,6 +25,13 @@ from api.routes import api
 from api.admin import setup_admin
 from api.commands import setup_commands
 from api.auth import auth, init_oauth
+from api.leaderboard import leaderboard
+from api.item_catalog import item_catalog
+from api.game_catalog import game_catalog, seed_defaults
+from api.user_search import username_index
+from api.revocation import revocation_store
+from api.identity import identity_for
+from api.stats_token import attach_stats_token
 
 # Import all blueprints (different sections of your app)
 from api.game_routes import game_bp
@@ -157,10 +164,13 @@ def create_app():
                      "Authorization", 
                      "Accept", 
                      "X-Requested-With",
-                     "X-CSRF-Token"
+                     "X-CSRF-Token",
+                     "Idempotency-Key",
+                     "X-Stats-Token"
                  ],
                  "supports_credentials": True,
-                 "expose_headers": ["Content-Type", "Authorization"],
+                 "expose_headers": ["Content-Type", "Authorization", "Idempotent-Replayed",
+                                    "X-Stats-Token"],
                  "max_age": 3600,  # Cache preflight requests for 1 hour
                  "send_wildcard": False,
                  "always_send": True
@@ -233,6 +243,35 @@ def create_app():
         db.create_all()
         print("✅ Database tables created/verified")
 
+        # Load the in-memory leaderboard index
+        try:
+            leaderboard.rebuild()
+            print("✅ Leaderboard index built")
+        except Exception as e:
+            print(f"⚠️ Leaderboard index not built yet: {e}")
+
+        # Load the in-memory item catalog
+        try:
+            print(f"✅ Item catalog loaded ({len(item_catalog.load())} items)")
+        except Exception as e:
+            print(f"⚠️ Item catalog not loaded yet: {e}")
+
+        # Build the in-memory username search index (Postgres uses its own indexes)
+        if db.engine.dialect.name != 'postgresql':
+            try:
+                username_index.rebuild()
+                print(f"✅ Username search index built ({username_index.size()} users)")
+            except Exception as e:
+                print(f"⚠️ Username search index not built yet: {e}")
+
+        # Load the in-memory game catalog (seeding the default games if it's empty)
+        try:
+            if not len(game_catalog.load()):
+                print(f"🎮 Seeded {seed_defaults()} default games")
+            print(f"✅ Game catalog loaded ({len(game_catalog.snapshot())} games)")
+        except Exception as e:
+            print(f"⚠️ Game catalog not loaded yet: {e}")
+
     # Setup admin panel and custom commands
     setup_admin(app)
     setup_commands(app)
@@ -302,6 +341,25 @@ def create_app():
             'error': 'authorization_required'
         }), 401
 
+    @jwt.token_in_blocklist_loader
+    def check_if_token_revoked(jwt_header, jwt_payload):
+        """🔍 Has this ticket been canceled? (Bloom filter + revoked_tokens)"""
+        return revocation_store.is_revoked(jwt_payload['jti'])
+
+    @jwt.user_lookup_loader
+    def lookup_token_user(jwt_header, jwt_data):
+        """🪪 Who is this ticket for? (cached identity, None if the account is gone)"""
+        return identity_for(jwt_data['sub'])
+
+    @jwt.user_lookup_error_loader
+    def user_lookup_error_callback(jwt_header, jwt_data):
+        """👻 What to do when the ticket's account no longer exists"""
+        return jsonify({
+            'success': False,
+            'message': 'Account not found. Please login again. 👻',
+            'error': 'user_not_found'
+        }), 401
+
     @jwt.revoked_token_loader
     def revoked_token_callback(jwt_header, jwt_payload):
         """❌ What to do when ticket has been canceled"""
@@ -311,6 +369,11 @@ def create_app():
             'error': 'token_revoked'
         }), 401
 
+    @app.after_request
+    def send_fresh_stats_token(response):
+        """📊 Hand the caller a new stats token when this request changed their stats"""
+        return attach_stats_token(response)
+
     # ===============================
     # ⚠️ ERROR HANDLERS
     # ===============================
@@ -0,0 +1,36 @@
+"""Add username search indexes (Postgres)
+
+Revision ID: 9d4b6e2a7c15
+Revises: c7e3d5a1f284
+Create Date: 2026-10-17 16:52:37.208114
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4b6e2a7c15'
+down_revision = 'c7e3d5a1f284'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite searches usernames with an in-process index (api/user_search.py)
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # Exact / prefix matches: LIKE 'q%' range scans, already in name order
+    op.execute('CREATE INDEX ix_users_username_lower ON users ((lower(username) COLLATE "C"))')
+    # Substring matches: LIKE '%q%'
+    op.execute('CREATE INDEX ix_users_username_trgm ON users '
+               'USING gin (lower(username) gin_trgm_ops)')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('DROP INDEX IF EXISTS ix_users_username_trgm')
+    op.execute('DROP INDEX IF EXISTS ix_users_username_lower')
@@ -0,0 +1,74 @@
+"""One user_achievements row per user and achievement
+
+Revision ID: a6d93e1f5b72
+Revises: f3a7c2d18e54
+Create Date: 2026-10-17 14:32:07.118943
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6d93e1f5b72'
+down_revision = 'f3a7c2d18e54'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    achievements = sa.table('user_achievements',
+                            sa.column('id', sa.Integer),
+                            sa.column('user_id', sa.Integer),
+                            sa.column('achievement_name', sa.String),
+                            sa.column('is_completed', sa.Boolean))
+
+    # first_workout was the inventory routes' id for first_steps: merge it
+    def users_with(name, claimed_only=False):
+        query = sa.select(achievements.c.user_id).where(achievements.c.achievement_name == name)
+        if claimed_only:
+            query = query.where(achievements.c.is_completed == sa.true())
+        return query.scalar_subquery()
+
+    op.execute(
+        achievements.update()
+        .where(achievements.c.achievement_name == 'first_steps',
+               achievements.c.user_id.in_(users_with('first_workout', claimed_only=True)))
+        .values(is_completed=True)
+    )
+    op.execute(
+        achievements.update()
+        .where(achievements.c.achievement_name == 'first_workout',
+               achievements.c.user_id.not_in(users_with('first_steps')))
+        .values(achievement_name='first_steps')
+    )
+    op.execute(achievements.delete().where(achievements.c.achievement_name == 'first_workout'))
+
+    # Keep one row per (user, achievement): the claimed one, else the newest
+    other = achievements.alias('other')
+    op.execute(achievements.delete().where(sa.exists().where(
+        other.c.user_id == achievements.c.user_id,
+        other.c.achievement_name == achievements.c.achievement_name,
+        sa.or_(
+            sa.and_(other.c.is_completed == sa.true(),
+                    sa.or_(achievements.c.is_completed.is_(None),
+                           achievements.c.is_completed == sa.false())),
+            sa.and_(sa.func.coalesce(other.c.is_completed, sa.false())
+                    == sa.func.coalesce(achievements.c.is_completed, sa.false()),
+                    other.c.id > achievements.c.id)
+        )
+    )))
+
+    with op.batch_alter_table('user_achievements', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_achievements_user_name')
+        batch_op.create_index('ix_user_achievements_user_name',
+                              ['user_id', 'achievement_name'], unique=True)
+
+    # Progress rows for existing users are seeded on their next achievements read
+
+
+def downgrade():
+    with op.batch_alter_table('user_achievements', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_achievements_user_name')
+        batch_op.create_index('ix_user_achievements_user_name',
+                              ['user_id', 'achievement_name'], unique=False)
@@ -0,0 +1,74 @@
+"""Add composite and partial indexes for hot queries
+
+Revision ID: c93f1d27b6e4
+Revises: a41c6e83f2d7
+Create Date: 2026-10-17 11:48:05.931264
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c93f1d27b6e4'
+down_revision = 'a41c6e83f2d7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep only the newest current avatar per user so the partial unique
+    # index below can be built
+    user_avatars = sa.table('user_avatars',
+                            sa.column('id', sa.Integer),
+                            sa.column('user_id', sa.Integer),
+                            sa.column('is_current', sa.Boolean))
+    newest_current = sa.select(sa.func.max(user_avatars.c.id))\
+        .where(user_avatars.c.is_current == sa.true())\
+        .group_by(user_avatars.c.user_id)
+    op.execute(
+        user_avatars.update()
+        .where(user_avatars.c.is_current == sa.true(),
+               user_avatars.c.id.not_in(newest_current.scalar_subquery()))
+        .values(is_current=False)
+    )
+
+    with op.batch_alter_table('game_sessions', schema=None) as batch_op:
+        batch_op.create_index('ix_game_sessions_user_played_at',
+                              ['user_id', 'played_at', 'id'], unique=False)
+
+    with op.batch_alter_table('unlocked_items', schema=None) as batch_op:
+        batch_op.create_index('ix_unlocked_items_user_catalog',
+                              ['user_id', 'item_catalog_id'], unique=False)
+
+    with op.batch_alter_table('user_avatars', schema=None) as batch_op:
+        batch_op.create_index('ix_user_avatars_user_current',
+                              ['user_id', 'is_current'], unique=False)
+        batch_op.create_index('uq_user_avatars_one_current', ['user_id'], unique=True,
+                              postgresql_where=sa.text('is_current'),
+                              sqlite_where=sa.text('is_current'))
+
+    with op.batch_alter_table('user_achievements', schema=None) as batch_op:
+        batch_op.create_index('ix_user_achievements_user_name',
+                              ['user_id', 'achievement_name'], unique=False)
+
+    with op.batch_alter_table('games', schema=None) as batch_op:
+        batch_op.create_index('ix_games_user_name', ['user_id', 'name'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('games', schema=None) as batch_op:
+        batch_op.drop_index('ix_games_user_name')
+
+    with op.batch_alter_table('user_achievements', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_achievements_user_name')
+
+    with op.batch_alter_table('user_avatars', schema=None) as batch_op:
+        batch_op.drop_index('uq_user_avatars_one_current')
+        batch_op.drop_index('ix_user_avatars_user_current')
+
+    with op.batch_alter_table('unlocked_items', schema=None) as batch_op:
+        batch_op.drop_index('ix_unlocked_items_user_catalog')
+
+    with op.batch_alter_table('game_sessions', schema=None) as batch_op:
+        batch_op.drop_index('ix_game_sessions_user_played_at')
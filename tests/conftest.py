@@ -0,0 +1,90 @@
+"""
+Shared fixtures for PixelPlay's API tests.
+The app is imported once against a throwaway SQLite database; each test
+makes its own users, so tests don't depend on each other.
+
+    $ pipenv install --dev && pipenv run pytest
+"""
+
+import os
+import sys
+import tempfile
+import uuid
+from contextlib import contextmanager
+
+import pytest
+
+_db_dir = tempfile.mkdtemp(prefix='pixelplay-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+# Hash passwords inline and cheaply; no background revocation syncs mid-test
+os.environ.setdefault('PASSWORD_HASH_WORKERS', '0')
+os.environ.setdefault('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000')
+os.environ.setdefault('PASSWORD_HASH_LOCK_DIR', os.path.join(_db_dir, 'password-slots'))
+os.environ.setdefault('REVOKED_TOKEN_SYNC_SECONDS', '3600')
+os.environ.setdefault('JWT_SECRET_KEY', 'pixelplay-tests-secret-key-32-bytes!')
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sqlalchemy import event  # noqa: E402
+from flask_jwt_extended import create_access_token  # noqa: E402
+from app import app as flask_app  # noqa: E402
+from api.models import db, User  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def app():
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    """Create a user; returns (user_id, auth headers)."""
+    def make(**fields):
+        with app.app_context():
+            user = User(email=f'{uuid.uuid4().hex[:12]}@test.com', password='password123')
+            for field, value in fields.items():
+                setattr(user, field, value)
+            db.session.add(user)
+            db.session.commit()
+            token = create_access_token(identity=str(user.id))
+            return user.id, {'Authorization': f'Bearer {token}'}
+    return make
+
+
+class StatementCounter:
+    """SQL statements sent to the database while active."""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def touching(self, table):
+        return [statement for statement in self.statements if table in statement]
+
+
+@pytest.fixture
+def count_statements(app):
+    """with count_statements() as counter: ... -> counter.count, counter.statements"""
+    with app.app_context():
+        engine = db.engine
+
+    @contextmanager
+    def counting():
+        counter = StatementCounter()
+        event.listen(engine, 'before_cursor_execute', counter)
+        try:
+            yield counter
+        finally:
+            event.remove(engine, 'before_cursor_execute', counter)
+    return counting
@@ -0,0 +1,50 @@
+"""Achievement reads (api/achievements.py) don't write; claims seed what they need."""
+
+from api.achievements import stage_progress
+from api.models import db, UserAchievement, UserProgress
+
+
+def _stored(app, user_id):
+    with app.app_context():
+        return UserAchievement.query.filter_by(user_id=user_id).count()
+
+
+def test_reading_achievements_writes_nothing(app, client, make_user, count_statements):
+    user_id, headers = make_user(level=10)
+    with count_statements() as counter:
+        response = client.get('/api/achievements', headers=headers)
+    assert response.status_code == 200
+    legend = next(a for a in response.get_json()['achievements'] if a['id'] == 'legend_status')
+    assert legend['unlocked'] and not legend['claimed']
+    assert all(statement.lstrip().upper().startswith('SELECT')
+               for statement in counter.touching('user_achievements'))
+    assert _stored(app, user_id) == 0
+
+
+def test_claim_seeds_and_saves_progress(app, client, make_user):
+    user_id, headers = make_user(level=10)
+    with app.app_context():
+        db.session.add(UserProgress(user_id=user_id, total_games_played=0))
+        db.session.commit()
+
+    response = client.post('/api/achievements/claim/legend_status', headers=headers)
+    assert response.status_code == 200, response.get_json()
+    assert _stored(app, user_id) > 0
+    with app.app_context():
+        claimed = UserAchievement.query.filter_by(user_id=user_id,
+                                                  achievement_name='legend_status').one()
+        assert claimed.is_completed
+
+
+def test_streak_progress_follows_the_current_streak(app, make_user):
+    user_id, _ = make_user()
+    with app.app_context():
+        stage_progress(user_id, streak_days=7, workouts_completed=5)
+        db.session.commit()
+        stage_progress(user_id, streak_days=1, workouts_completed=3)
+        db.session.commit()
+
+        progress = dict(db.session.query(UserAchievement.achievement_name, UserAchievement.progress)
+                        .filter_by(user_id=user_id))
+        assert progress['week_warrior'] == 1
+        assert progress['first_steps'] == 1 and progress['strength_supreme'] == 5
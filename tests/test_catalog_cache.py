@@ -0,0 +1,28 @@
+"""Catalog snapshots (api/catalog_cache.py) swap only after a committed change."""
+
+from api.models import db, GameCatalog
+from api.game_catalog import game_catalog
+
+
+def test_committed_change_reloads_snapshot(app):
+    with app.app_context():
+        before = game_catalog.snapshot()
+        db.session.add(GameCatalog(id='test-game', name='Test Game', sort_order=99))
+        db.session.commit()
+        try:
+            after = game_catalog.snapshot()
+            assert after is not before
+            assert after.get('test-game').name == 'Test Game'
+        finally:
+            db.session.delete(db.session.get(GameCatalog, 'test-game'))
+            db.session.commit()
+        assert game_catalog.snapshot().get('test-game') is None
+
+
+def test_rolled_back_change_keeps_snapshot(app):
+    with app.app_context():
+        before = game_catalog.snapshot()
+        db.session.add(GameCatalog(id='rolled-back', name='Rolled Back'))
+        db.session.flush()
+        db.session.rollback()
+        assert game_catalog.snapshot() is before
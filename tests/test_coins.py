@@ -0,0 +1,35 @@
+"""The coin ledger (api/coins.py): no negative balances, each payout once."""
+
+import pytest
+
+from api.coins import spend
+from api.models import db, User, CoinTransaction
+from api.session_ingest import ingest_session, supports_single_round_trip
+
+
+def test_unsaved_user_cannot_overspend(app):
+    with app.app_context():
+        user = User(email='overspend@test.com', password='password123')
+        user.coins = 5
+        result = spend(user, 10)
+        assert not result.ok
+        assert user.coins == 5
+
+
+def test_replayed_level_up_pays_nothing(app, make_user):
+    user_id, _ = make_user(coins=0, xp=0, level=1)
+    with app.app_context():
+        if not supports_single_round_trip():
+            pytest.skip('needs INSERT ... ON CONFLICT ... RETURNING')
+        # Level 2 was already paid out (e.g. by User.add_xp)
+        db.session.add(CoinTransaction(user_id=user_id, amount=User.COINS_PER_LEVEL,
+                                       balance_after=0, source='level_up',
+                                       idempotency_key='level_up:2'))
+        db.session.commit()
+
+        result = ingest_session(user_id, 'memory-match', xp_earned=User.XP_PER_LEVEL)
+        assert result['leveled_up'] and result['new_level'] == 2
+        assert result['coins_earned'] == 0
+        assert result['user_stats']['coins'] == 0
+        assert db.session.get(User, user_id).coins == 0
+        assert CoinTransaction.query.filter_by(user_id=user_id).count() == 1
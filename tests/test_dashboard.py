@@ -0,0 +1,23 @@
+"""Dashboard snapshots (api/dashboard.py): reads never write them."""
+
+from api.models import db, UserDashboardSnapshot
+
+
+def test_first_read_computes_without_saving(app, client, make_user, count_statements):
+    user_id, headers = make_user(level=3)
+    with count_statements() as counter:
+        response = client.get('/api/dashboard/stats', headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()['stats']['level'] == 3
+    assert all(statement.lstrip().upper().startswith('SELECT')
+               for statement in counter.touching('user_dashboard_snapshots'))
+    with app.app_context():
+        assert db.session.get(UserDashboardSnapshot, user_id) is None
+
+
+def test_check_command_saves_missing_snapshots(app, make_user):
+    user_id, _ = make_user()
+    result = app.test_cli_runner().invoke(args=['check-dashboard-snapshots', '--fix'])
+    assert result.exit_code == 0, result.output
+    with app.app_context():
+        assert db.session.get(UserDashboardSnapshot, user_id) is not None
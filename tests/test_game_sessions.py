@@ -0,0 +1,41 @@
+"""Request validation for /api/games/complete-session(s)."""
+
+import pytest
+
+BAD_SESSIONS = [
+    ({'score': 'abc'}, 'score'),
+    ({'score': -5}, 'score'),
+    ({'duration_minutes': 2.5}, 'duration_minutes'),
+    ({'base_xp': True}, 'base_xp'),
+    ({'completed': 'yes'}, 'completed'),
+]
+
+
+@pytest.mark.parametrize('fields, field', BAD_SESSIONS)
+def test_bad_batch_session_is_rejected(client, make_user, fields, field):
+    _, headers = make_user()
+    sessions = [{'game_id': 'memory-match', 'score': 10},
+                dict({'game_id': 'memory-match'}, **fields)]
+    response = client.post('/api/api/games/complete-sessions', json={'sessions': sessions},
+                           headers=headers)
+    assert response.status_code == 400
+    assert response.get_json()['message'].startswith(f'Session 1: {field}')
+
+
+@pytest.mark.parametrize('fields, field', BAD_SESSIONS)
+def test_bad_session_is_rejected(client, make_user, fields, field):
+    _, headers = make_user()
+    response = client.post('/api/api/games/complete-session',
+                           json=dict({'game_id': 'memory-match'}, **fields), headers=headers)
+    assert response.status_code == 400
+    assert response.get_json()['message'].startswith(field)
+
+
+def test_valid_batch_is_recorded(client, make_user):
+    _, headers = make_user()
+    sessions = [{'game_id': 'memory-match', 'score': 120, 'duration_minutes': 3,
+                 'completed': True, 'base_xp': 10}, {'game_id': 'ninja'}]
+    response = client.post('/api/api/games/complete-sessions', json={'sessions': sessions},
+                           headers=headers)
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['result']['xp_earned'] == 10 + 12 + 10
@@ -0,0 +1,29 @@
+"""The query-plan regression check: every hot query is served by an index."""
+
+from api.models import db, Game
+
+
+def _explain(app):
+    return app.test_cli_runner().invoke(args=['explain-hot-queries'])
+
+
+def test_hot_queries_use_an_index(app):
+    result = _explain(app)
+    assert result.exit_code == 0, result.output
+    assert 'All hot queries use an index' in result.output
+
+
+def test_missing_index_fails_the_check(app):
+    index = next(index for index in Game.__table__.indexes if index.name == 'ix_games_user_name')
+    with app.app_context():
+        index.drop(db.engine)
+        # sqlite3 caches prepared statements per connection, plans included
+        db.engine.dispose()
+    try:
+        result = _explain(app)
+        assert result.exit_code != 0, result.output
+        assert '❌ game by name' in result.output
+    finally:
+        with app.app_context():
+            index.create(db.engine)
+            db.engine.dispose()
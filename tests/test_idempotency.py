@@ -0,0 +1,28 @@
+"""Idempotency-Key handling (api/idempotency.py)."""
+
+from flask import jsonify
+from flask_jwt_extended import verify_jwt_in_request
+
+from api.idempotency import idempotent
+from api.models import db, User
+
+
+def test_rejected_request_saves_nothing_but_its_key(app, make_user):
+    user_id, headers = make_user(level=1)
+
+    @idempotent
+    def reject():
+        # Stage a change, then refuse the request without committing
+        db.session.get(User, user_id).level = 99
+        return jsonify({'success': False}), 400
+
+    for attempt in range(2):
+        with app.test_request_context('/reject', method='POST',
+                                      headers=dict(headers, **{'Idempotency-Key': 'reject-1'})):
+            verify_jwt_in_request()
+            response = reject()
+            assert response.status_code == 400
+            assert (response.headers.get('Idempotent-Replayed') == 'true') == (attempt == 1)
+
+    with app.app_context():
+        assert db.session.get(User, user_id).level == 1
@@ -0,0 +1,72 @@
+"""The in-memory leaderboard index (api/leaderboard.py) follows committed user changes."""
+
+from api.models import db, User
+from api.leaderboard import leaderboard, LeaderboardIndex
+from api.response_cache import ResponseCache, InProcessLRUBackend
+
+
+def _entry(user_id):
+    rank = leaderboard.rank_of('xp', user_id)
+    return leaderboard.around('xp', user_id, 0)[1][0] if rank else None
+
+
+def test_renamed_user_shows_new_name(app, make_user):
+    user_id, _ = make_user(username='before_rename')
+    with app.app_context():
+        leaderboard.rebuild()
+        db.session.get(User, user_id).username = 'after_rename'
+        db.session.commit()
+        assert _entry(user_id)['username'] == 'after_rename'
+
+
+def test_deleted_user_leaves_every_board(app, make_user):
+    user_id, _ = make_user(xp=10 ** 6, level=10 ** 4)
+    with app.app_context():
+        leaderboard.rebuild()
+        assert leaderboard.top('xp', 1)[0]['user_id'] == user_id
+
+        db.session.delete(db.session.get(User, user_id))
+        db.session.commit()
+        assert _entry(user_id) is None
+        assert all(leaderboard.rank_of(kind, user_id) is None
+                   for kind in ('level', 'xp', 'streak', 'games'))
+        assert user_id not in [entry['user_id'] for entry in leaderboard.top('xp', 100)]
+
+
+def _user(user_id, xp):
+    return {user_id: {'username': f'user{user_id}', 'level': 1, 'xp': xp,
+                      'streak_days': 0, 'total_games_played': 0}}
+
+
+def test_cache_dropped_only_for_changes_in_the_window():
+    cache = ResponseCache('test-leaderboard', backend=InProcessLRUBackend())
+    index = LeaderboardIndex(cache=cache, cache_window=2)
+    for user_id, xp in ((1, 300), (2, 200), (3, 100), (4, 50)):
+        index.apply(_user(user_id, xp))
+
+    def generation():
+        return cache.backend.generation('test-leaderboard')
+
+    before = generation()
+    index.apply({4: {'xp': 60}})          # 4th -> 4th
+    index.apply({3: {'username': 'x'}})   # renamed outside the top 2
+    index.apply(_user(5, 10))             # new user at the bottom
+    assert generation() == before
+
+    index.apply({3: {'xp': 250}})         # 3rd -> 2nd
+    assert generation() == before + 1
+    index.apply({1: {'username': 'leader'}})
+    assert generation() == before + 2
+    index.apply({4: None})                # deleted from 4th place
+    assert generation() == before + 2
+    index.apply({3: None})                # deleted from 2nd place
+    assert generation() == before + 3
+
+
+def test_junk_query_values_share_the_normalised_cache_entry(client):
+    level = client.get('/api/leaderboard?type=level&limit=1')
+    junk = client.get('/api/leaderboard?type=no-such-board&limit=-5')
+    assert junk.status_code == 200
+    assert junk.get_json()['type'] == 'level'
+    assert junk.headers['ETag'] == level.headers['ETag']
+    assert len(junk.get_json()['leaderboard']) <= 1
@@ -0,0 +1,44 @@
+"""Item ownership bitmaps (api/ownership.py)."""
+
+from api.models import db, User, UnlockedItem
+from api.ownership import has_bit, set_bits, ordinals
+
+
+def test_bit_test_matches_the_stored_bits():
+    bitmap = set_bits(b'', [0, 7, 8, 63, 200])
+    assert list(ordinals(bitmap)) == [0, 7, 8, 63, 200]
+    owned = [n for n in range(-1, 260) if has_bit(bitmap, n)]
+    assert owned == [0, 7, 8, 63, 200]
+    assert not has_bit(None, 0) and not has_bit(b'', 0) and not has_bit(bitmap, None)
+
+
+def _unbuilt_user_owning(app, make_user, shop_item_id):
+    user_id, headers = make_user(owned_catalog_items=None, owned_shop_items=None)
+    with app.app_context():
+        db.session.add(UnlockedItem(user_id=user_id, item_catalog_id=shop_item_id,
+                                    unlock_method='purchase'))
+        db.session.commit()
+        # The unlock above doesn't build bitmaps that don't exist yet
+        assert db.session.get(User, user_id).owned_shop_items is None
+    return user_id, headers
+
+
+def test_reads_compute_unbuilt_bitmaps_without_writing(app, client, make_user, count_statements):
+    user_id, headers = _unbuilt_user_owning(app, make_user, 1)
+    with count_statements() as counter:
+        inventory = client.get('/api/inventory/my-items', headers=headers)
+        catalog = client.get('/api/items/catalog', headers=headers)
+    assert inventory.status_code == 200 and catalog.status_code == 200
+    assert [item['id'] for item in inventory.get_json()['items']] == [1]
+    assert not [statement for statement in counter.statements
+                if 'FOR UPDATE' in statement or 'UPDATE users' in statement]
+    with app.app_context():
+        assert db.session.get(User, user_id).owned_shop_items is None
+
+
+def test_backfill_builds_bitmaps(app, make_user):
+    user_id, _ = _unbuilt_user_owning(app, make_user, 2)
+    result = app.test_cli_runner().invoke(args=['backfill-ownership-bitmaps'])
+    assert result.exit_code == 0, result.output
+    with app.app_context():
+        assert list(ordinals(db.session.get(User, user_id).owned_shop_items)) == [2]
@@ -0,0 +1,14 @@
+"""Password hashing metrics (api/passwords.py) are for operators, not users."""
+
+
+def test_stats_are_not_served_over_http(client, make_user):
+    _, headers = make_user()
+    assert client.get('/api/auth/password-hashing/stats', headers=headers).status_code == 404
+
+
+def test_stats_command_measures_the_hasher(app):
+    result = app.test_cli_runner().invoke(
+        args=['password-hashing-stats', '--samples', '4', '--threads', '2'])
+    assert result.exit_code == 0, result.output
+    assert '4/4 hashes verified' in result.output
+    assert '"hash"' in result.output
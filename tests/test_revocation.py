@@ -0,0 +1,27 @@
+"""The JWT revocation store (api/revocation.py) keeps token checks read-only."""
+
+import uuid
+from datetime import datetime, timedelta
+
+from api.models import db, RevokedToken
+from api.revocation import revocation_store
+
+
+def test_rebuilding_the_filter_writes_nothing(app, count_statements):
+    jti = uuid.uuid4().hex
+    with app.app_context():
+        db.session.add(RevokedToken(jti=jti, token_type='access',
+                                    revoked_at=datetime.utcnow() - timedelta(days=2),
+                                    expires_at=datetime.utcnow() - timedelta(days=1)))
+        db.session.commit()
+
+        with count_statements() as counter:
+            revocation_store.rebuild()
+        assert all(statement.lstrip().upper().startswith('SELECT')
+                   for statement in counter.statements)
+        assert db.session.get(RevokedToken, jti) is not None
+
+    result = app.test_cli_runner().invoke(args=['purge-revoked-tokens'])
+    assert result.exit_code == 0, result.output
+    with app.app_context():
+        assert db.session.get(RevokedToken, jti) is None
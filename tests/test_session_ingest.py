@@ -0,0 +1,70 @@
+"""
+The single-round-trip session ingest (api/session_ingest.py) against the ORM
+path it replaced: fewer statements per session, and no SELECTs of its own.
+"""
+
+import uuid
+
+import pytest
+
+from api.models import db, User, GameSession, UserProgress
+from api.session_ingest import ingest_session, supports_single_round_trip
+
+SESSIONS = 20
+
+
+@pytest.fixture(autouse=True)
+def single_round_trip(app):
+    with app.app_context():
+        if not supports_single_round_trip():
+            pytest.skip('needs INSERT ... ON CONFLICT ... RETURNING')
+
+
+def _record(app, count_statements, record):
+    """Statements per session for `record(user_id, n)`, on a fresh user."""
+    with app.app_context():
+        user = User(email=f'{record.__name__}_{uuid.uuid4().hex[:8]}@test.com', password='benchmark')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        # First write creates the progress/stats/snapshot rows; measure steady state
+        record(user_id, 0)
+
+        with count_statements() as counter:
+            for n in range(1, SESSIONS + 1):
+                record(user_id, n)
+        return user_id, counter
+
+
+def orm_path(user_id, n):
+    GameSession.record_session_orm(user_id, 'benchmark', score=n, xp_earned=10)
+    user = db.session.get(User, user_id)
+    return user.level, user.progress.total_games_played
+
+
+def ingest_path(user_id, n):
+    return ingest_session(user_id, 'benchmark', score=n, xp_earned=10)['user_stats']
+
+
+def test_ingest_needs_fewer_statements_than_orm(app, count_statements):
+    _, orm = _record(app, count_statements, orm_path)
+    _, ingest = _record(app, count_statements, ingest_path)
+    assert ingest.count < orm.count, (orm.count, ingest.count)
+
+
+def test_ingest_reads_nothing_but_the_dashboard_snapshot(app, count_statements):
+    user_id, ingest = _record(app, count_statements, ingest_path)
+    selects = [s for s in ingest.statements if s.lstrip().upper().startswith('SELECT')]
+    # The only read is the snapshot patched at commit (one per session)
+    assert len(selects) == SESSIONS
+    assert all('user_dashboard_snapshots' in s for s in selects)
+
+    with app.app_context():
+        progress = db.session.get(UserProgress, user_id)
+        assert progress.total_games_played == SESSIONS + 1
+
+
+def test_benchmark_command_runs(app):
+    result = app.test_cli_runner().invoke(args=['benchmark-session-ingest', '5'])
+    assert result.exit_code == 0, result.output
+    assert 'after (ingest)' in result.output
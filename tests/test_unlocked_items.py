@@ -0,0 +1,37 @@
+"""GET /api/items/unlocked loads a user's items in one query, however many they own."""
+
+from api.models import db, UnlockedItem
+
+
+def _unlock(app, user_id, count):
+    with app.app_context():
+        db.session.add_all(UnlockedItem(
+            user_id=user_id, avatar_style='adventurer', item_category='hair',
+            item_value=f'style{n:03d}', unlock_method='purchase'
+        ) for n in range(count))
+        db.session.commit()
+
+
+def _statements_for_unlocked(client, headers, count_statements):
+    # Warm-up: identity cache and revocation filter, which every route pays once
+    assert client.get('/api/items/unlocked', headers=headers).status_code == 200
+    with count_statements() as counter:
+        response = client.get('/api/items/unlocked', headers=headers)
+    assert response.status_code == 200
+    return counter, response.get_json()
+
+
+def test_unlocked_items_query_count_is_independent_of_item_count(
+        app, client, make_user, count_statements):
+    few_id, few_headers = make_user()
+    many_id, many_headers = make_user()
+    _unlock(app, few_id, 1)
+    _unlock(app, many_id, 200)
+
+    few, few_body = _statements_for_unlocked(client, few_headers, count_statements)
+    many, many_body = _statements_for_unlocked(client, many_headers, count_statements)
+
+    assert few_body['total_items'] == 1
+    assert many_body['total_items'] == 200
+    assert many.count == few.count
+    assert len(many.touching('unlocked_items')) == 1